@@ -0,0 +1,79 @@
+"""
+Microbenchmark: compiled Categorizer against a per-rule `in` loop.
+
+    cd backend && python -m benchmarks.bench_categorize --rules 50 500 2000 --rows 100000
+
+Descriptions mimic statement text: a small set of merchants and rails with
+unique reference numbers mixed in, so some repeat exactly and most don't.
+
+`speedup` is naive / compiled: the matcher alone. `memo` adds
+Categorizer.categorize()'s cache of exact repeats on top, and `w/ memo` is
+naive / memo, listed separately since it depends on how often rows repeat.
+"""
+import argparse
+import json
+import random
+import time
+
+import config
+from services.categorize import Categorizer
+
+
+def synthetic_rules(n_rules, keywords_per_rule=5, seed=1):
+    # The shipped rules first, then generated merchant names up to n_rules
+    with open(config.CATEGORY_RULES) as f:
+        rules = json.load(f)["rules"]
+    r = random.Random(seed)
+    for i in range(len(rules), n_rules):
+        keywords = [f"MERCH{i:05d}{chr(65 + r.randrange(26))}{k}" for k in range(keywords_per_rule)]
+        rules.append({"category": f"Merchant {i}", "keywords": keywords})
+    return rules[:max(n_rules, 1)]
+
+
+def synthetic_descriptions(rules, n_rows, seed=1):
+    r = random.Random(seed)
+    keywords = [k for rule in rules for k in rule["keywords"]]
+    templates = ["UPI/DR/{ref}/{kw}/PAYTM", "TO TRANSFER-{kw} {ref}", "BY NEFT {kw} LTD", "POS {ref} {kw} KOCHI", "{kw}"]
+    rows = []
+    for _ in range(n_rows):
+        ref = r.randint(10**9, 10**11) if r.random() < 0.7 else 0
+        rows.append(r.choice(templates).format(ref=ref, kw=r.choice(keywords)))
+    return rows
+
+
+def naive_categorize(rules, description):
+    upper = description.upper()
+    for rule in rules:
+        if any(k in upper for k in rule["keywords"]):
+            return rule["category"]
+    return "Other"
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rules", type=int, nargs="+", default=[50, 500, 2000])
+    ap.add_argument("--rows", type=int, default=100_000)
+    args = ap.parse_args()
+
+    print(f"{'rules':>6} {'compile':>9} {'naive':>9} {'compiled':>9} {'speedup':>8} {'memo':>9} {'w/ memo':>8}")
+    for n_rules in args.rules:
+        rules = synthetic_rules(n_rules)
+        descriptions = synthetic_descriptions(rules, args.rows)
+
+        compile_s, categorizer = timed(lambda: Categorizer(rules))
+        naive_s, _ = timed(lambda: [naive_categorize(rules, d) for d in descriptions])
+        compiled_s, _ = timed(lambda: [categorizer._match(d) for d in descriptions])
+        memo_s, _ = timed(lambda: [categorizer.categorize(d) for d in descriptions])
+
+        print(f"{n_rules:>6} {compile_s * 1000:>7.1f}ms {naive_s * 1000:>7.0f}ms {compiled_s * 1000:>7.0f}ms "
+              f"{naive_s / compiled_s:>7.1f}x {memo_s * 1000:>7.0f}ms {naive_s / memo_s:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Payload size and encode/decode time: JSON rows against MessagePack columns.
+
+    cd backend && python -m benchmarks.bench_formats --rows 1000 10000 50000
+
+Encodes a consolidated-style result (SIB + SBI rows, bank on every row)
+the way /parse-batch does for each Accept type, and reports the raw and
+gzipped size, encode time, and decode time. Decoding is timed with the
+stdlib json module and msgpack's C unpacker; the browser's JSON.parse and
+@msgpack/msgpack decode at different speeds, but the size ratio holds.
+"""
+import argparse
+import gzip
+import json
+import time
+
+import msgpack
+
+from benchmarks.synthetic import sbi_pages, sib_pages
+from services.analytics import compute_analytics
+from services.analytics_engine import compute_insights
+from services.categorize import categorize_batch
+from services.responses import dumps, msgpack_response
+from services.sbi_parser import parse_sbi_batch
+from services.sib_parser import parse_sib_batch
+from services.transactions import TransactionBatch
+
+
+def synthetic_result(n_rows, per_page=30):
+    pages = -(-n_rows // (2 * per_page))
+    sib = parse_sib_batch(sib_pages(pages, per_page)).with_bank("SIB")
+    sbi = parse_sbi_batch(sbi_pages(pages, per_page)).with_bank("SBI")
+    batch = TransactionBatch.concat([sib, sbi]).renumber()
+    categorize_batch(batch)
+    return {
+        "banks": ["SBI", "SIB"],
+        "transactions": batch,
+        "analytics": compute_analytics(batch),
+        "insights": compute_insights(batch),
+    }
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 50000])
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    print(f"{'rows':>7} {'format':<16} {'size':>9} {'gzip':>9} {'encode':>9} {'decode':>9}")
+    for n_rows in args.rows:
+        result = synthetic_result(n_rows)
+        formats = [
+            ("json rows", lambda: dumps(result), json.loads),
+            ("msgpack columns", lambda: msgpack_response(result).body, msgpack.unpackb),
+        ]
+        for name, encode, decode in formats:
+            encode_s, payload = best_of(encode, args.repeat)
+            decode_s, _ = best_of(lambda: decode(payload), args.repeat)
+            print(f"{len(result['transactions']):>7} {name:<16} {len(payload) / 1024:>7.0f}KB "
+                  f"{len(gzip.compress(payload, 6)) / 1024:>7.0f}KB {encode_s * 1000:>7.1f}ms {decode_s * 1000:>7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
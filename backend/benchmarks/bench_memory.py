@@ -0,0 +1,108 @@
+"""
+Peak RSS of /parse on long synthetic statements, full response and stream.
+
+    cd backend && python -m benchmarks.bench_memory --pages 100 400
+    cd backend && python -m benchmarks.bench_memory --pages 400 --max-growth-mb 128 --out memory.json
+
+Each case runs in a fresh interpreter, because ru_maxrss is a high-water
+mark that can't be reset in-process. The child starts the app under
+TestClient, notes its RSS once warmed up, posts the statement (a full JSON
+response, or stream=ndjson) and reports how far the peak grew past that
+baseline. Parsing and extraction stay in the measured process
+(PARSE_WORKERS=0, EXTRACT_WORKERS=1); the result cache and the memory
+budget are off, so every case really parses.
+
+Exits non-zero when a case grows by more than --max-growth-mb. Growth per
+page of the full cases is what pipeline.FULL_PARSE_BYTES_PER_PAGE estimates.
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ["full", "stream"]
+
+
+def max_rss_mb():
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2**20 if sys.platform == "darwin" else 2**10)
+
+
+def child(pdf_path, mode):
+    # Runs in the fresh interpreter
+    import main
+    from fastapi.testclient import TestClient
+    with open(pdf_path, "rb") as f:
+        content = f.read()
+    files = {"file": ("statement.pdf", content, "application/pdf")}
+    with TestClient(main.app) as client:
+        baseline = max_rss_mb()
+        response = client.post("/parse", files=files, data={"stream": "ndjson"} if mode == "stream" else {})
+        peak = max_rss_mb()
+    result = {"baselineMb": round(baseline, 1), "peakMb": round(peak, 1), "growthMb": round(peak - baseline, 1)}
+    if response.status_code != 200:
+        result["error"] = f"HTTP {response.status_code}"
+    elif mode == "full":
+        result["transactions"] = len(response.json()["transactions"])
+    else:
+        result["transactions"] = response.text.count('"type":"transaction"')
+    print(json.dumps(result))
+
+
+def run_child(pdf_path, mode):
+    env = {**os.environ, "WARMUP": "blocking", "PARSE_WORKERS": "0", "EXTRACT_WORKERS": "1", "CACHE_MAX_BYTES": "0",
+           "PARSE_MEMORY_BUDGET": "0", "LOG_LEVEL": "WARNING"}
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_memory", "--child", pdf_path, mode],
+        cwd=BACKEND, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--banks", nargs="+", choices=["sbi", "sib"], default=["sbi", "sib"])
+    ap.add_argument("--pages", type=int, nargs="+", default=[100])
+    ap.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    ap.add_argument("--rows", type=int, default=30, help="transactions per page")
+    ap.add_argument("--max-growth-mb", type=float, default=256, help="peak RSS growth that fails the run")
+    ap.add_argument("--out", help="write results as JSON")
+    ap.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        return child(*args.child)
+
+    from benchmarks.pdfgen import statement_pdf
+    results, failures = [], 0
+    print(f"{'case':<18} {'txns':>7} {'baseline':>9} {'peak':>9} {'growth':>9} {'per page':>9}")
+    for bank in args.banks:
+        for n_pages in args.pages:
+            fd, pdf_path = tempfile.mkstemp(suffix=".pdf")
+            with os.fdopen(fd, "wb") as f:
+                f.write(statement_pdf(bank, n_pages, args.rows))
+            try:
+                for mode in args.modes:
+                    case = {"case": f"{bank}-{n_pages}p-{mode}", "pages": n_pages, **run_child(pdf_path, mode)}
+                    results.append(case)
+                    failed = "error" in case or case["growthMb"] > args.max_growth_mb
+                    failures += failed
+                    print(f"{case['case']:<18} {case.get('transactions', 0):>7} {case['baselineMb']:>7.0f}MB "
+                          f"{case['peakMb']:>7.0f}MB {case['growthMb']:>7.1f}MB {case['growthMb'] * 1024 / n_pages:>7.0f}KB"
+                          + (f"  FAIL {case.get('error', f'> {args.max_growth_mb:g}MB')}" if failed else ""))
+            finally:
+                os.remove(pdf_path)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"maxGrowthMb": args.max_growth_mb, "results": results}, f, indent=2)
+        print(f"\nwrote {args.out}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
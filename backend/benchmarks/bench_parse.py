@@ -0,0 +1,211 @@
+"""
+End-to-end /parse benchmark on synthetic statement PDFs, stage by stage.
+
+    cd backend && python -m benchmarks.bench_parse --pages 1 10 100 --out results.json
+    cd backend && python -m benchmarks.bench_parse --pages 500 --banks sib --compare results.json
+
+Each case (bank x page count x variant) is generated with benchmarks.pdfgen
+and run through the same stages as services.pipeline.parse_pdf_bytes:
+open, detect, extract, parse (incl. validation and categories), analytics
+and serialize. Times are medians over --repeat runs. One extra run under
+tracemalloc records each stage's peak of Python-allocated memory; work
+done in the extraction and OCR worker processes isn't traced.
+
+Variants: "plain", "password" (encrypted, opened with the password) and
+"image" (every page rasterized, so extraction goes through OCR; capped
+at --image-max-pages).
+
+--out writes the results as JSON, with the commit, parser version and
+relevant config, so runs can be diffed later; --compare prints the change
+against an earlier file and exits non-zero when a case got slower than
+--threshold.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import config
+from benchmarks.pdfgen import statement_pdf
+from services import banks
+from services.analytics import compute_analytics
+from services.analytics_engine import compute_insights
+from services.categorize import categorize_batch
+from services.pdf_loader import StatementDocument, TABLES
+from services.pipeline import PARSER_VERSION
+from services.transactions import TransactionBatch
+
+STAGES = ["open", "detect", "extract", "parse", "analytics", "serialize"]
+PASSWORD = "bench"
+
+
+def run_stages(content, password, clock):
+    # Mirrors parse_pdf_bytes; clock(stage) is called as each stage completes
+    doc = StatementDocument(io.BytesIO(content), password=password)
+    clock("open")
+    with doc:
+        bank = banks.detect(doc.page_text(0)) if len(doc) else None
+        clock("detect")
+        pages = doc.extract_page_texts(bank.strategy if bank else TABLES)
+        clock("extract")
+    transactions = bank.parse_batch(pages) if bank else TransactionBatch()
+    categorize_batch(transactions)
+    clock("parse")
+    analytics = compute_analytics(transactions)
+    insights = compute_insights(transactions) if transactions else None
+    clock("analytics")
+    body = json.dumps({
+        "bank": bank.code if bank else banks.UNKNOWN,
+        "transactions": transactions.to_dicts(),
+        "analytics": analytics,
+        "insights": insights,
+    })
+    clock("serialize")
+    return len(transactions), len(body)
+
+
+def timed_run(content, password):
+    times = {}
+    last = [time.perf_counter()]
+
+    def clock(stage):
+        now = time.perf_counter()
+        times[stage] = now - last[0]
+        last[0] = now
+
+    count, size = run_stages(content, password, clock)
+    return times, count, size
+
+
+def traced_run(content, password):
+    peaks = {}
+    tracemalloc.start()
+
+    def clock(stage):
+        peaks[stage] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+
+    try:
+        run_stages(content, password, clock)
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def run_case(bank, n_pages, variant, args):
+    password = PASSWORD if variant == "password" else ""
+    content = statement_pdf(bank, n_pages, args.rows, password=password, image_every=1 if variant == "image" else 0)
+    case = {"case": f"{bank}-{n_pages}p-{variant}", "bank": bank, "pages": n_pages, "variant": variant, "bytes": len(content)}
+
+    runs = []
+    try:
+        for _ in range(args.repeat):
+            runs.append(timed_run(content, password))
+        peaks = traced_run(content, password) if args.memory else {}
+    except Exception as e:
+        case["error"] = f"{type(e).__name__}: {e}"
+        return case
+
+    case["transactions"] = runs[0][1]
+    case["responseBytes"] = runs[0][2]
+    case["stagesMs"] = {s: round(statistics.median(r[0][s] for r in runs) * 1000, 3) for s in STAGES}
+    case["totalMs"] = round(statistics.median(sum(r[0].values()) for r in runs) * 1000, 3)
+    if peaks:
+        case["peakMb"] = {s: round(peaks[s] / 2**20, 2) for s in STAGES}
+    return case
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare(results, path, threshold):
+    with open(path) as f:
+        previous = {c["case"]: c for c in json.load(f)["results"] if "totalMs" in c}
+    regressions = 0
+    print(f"\nvs {path}")
+    for case in results:
+        before = previous.get(case["case"])
+        if before is None or "totalMs" not in case:
+            continue
+        change = case["totalMs"] / before["totalMs"] - 1 if before["totalMs"] else 0.0
+        slower = change > threshold
+        regressions += slower
+        print(f"{case['case']:<22} {before['totalMs']:>10.1f}ms -> {case['totalMs']:>10.1f}ms {change:>+7.1%}"
+              + ("  REGRESSION" if slower else ""))
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--banks", nargs="+", choices=["sbi", "sib"], default=["sbi", "sib"])
+    ap.add_argument("--pages", type=int, nargs="+", default=[1, 10, 100])
+    ap.add_argument("--variants", nargs="+", choices=["plain", "password", "image"], default=["plain", "password", "image"])
+    ap.add_argument("--rows", type=int, default=30, help="transactions per page")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--image-max-pages", type=int, default=10, help="OCR is slow; larger image cases are skipped")
+    ap.add_argument("--no-memory", dest="memory", action="store_false", help="skip the tracemalloc run")
+    ap.add_argument("--out", help="write results as JSON")
+    ap.add_argument("--compare", help="earlier --out file to compare against")
+    ap.add_argument("--threshold", type=float, default=0.10, help="slowdown that counts as a regression")
+    args = ap.parse_args()
+
+    results = []
+    print(f"{'case':<22} {'txns':>6} " + " ".join(f"{s:>10}" for s in STAGES) + f" {'total':>10} {'peak':>8}")
+    for bank in args.banks:
+        for n_pages in args.pages:
+            for variant in args.variants:
+                if variant == "image" and n_pages > args.image_max_pages:
+                    continue
+                case = run_case(bank, n_pages, variant, args)
+                results.append(case)
+                if "error" in case:
+                    print(f"{case['case']:<22} ERROR {case['error']}")
+                    continue
+                peak = max(case["peakMb"].values()) if "peakMb" in case else 0
+                print(f"{case['case']:<22} {case['transactions']:>6} "
+                      + " ".join(f"{case['stagesMs'][s]:>8.1f}ms" for s in STAGES)
+                      + f" {case['totalMs']:>8.1f}ms {peak:>6.1f}MB")
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "parserVersion": PARSER_VERSION,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "repeat": args.repeat,
+            "rowsPerPage": args.rows,
+            "config": {
+                "EXTRACT_WORKERS": config.EXTRACT_WORKERS,
+                "PARALLEL_MIN_PAGES": config.PARALLEL_MIN_PAGES,
+                "OCR_PROFILE": config.OCR_PROFILE,
+            },
+            # ru_maxrss is KiB on Linux, bytes on macOS
+            "maxRssMb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2**20 if sys.platform == "darwin" else 2**10), 1),
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nwrote {args.out}")
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Microbenchmark: encoding a /parse response, previous path against the new ones.
+
+    cd backend && python -m benchmarks.bench_serialize --rows 1000 10000 50000
+
+  encoder   FastAPI's default for a plain dict: jsonable_encoder, then
+            json.dumps in Starlette's JSONResponse (the previous /parse path)
+  model     validation against ParseResponse, then Pydantic's JSON dump
+            (response_model, or VALIDATE_RESPONSES=1)
+  orjson    services.responses.dumps straight from the parser output (the
+            bypass /parse now takes)
+
+to_dicts (building row dicts from the columnar batch) is needed by every
+path and is shown separately.
+"""
+import argparse
+import json
+import time
+
+from fastapi.encoders import jsonable_encoder
+
+from benchmarks.synthetic import sib_pages
+from models.schemas import ParseResponse
+from services.analytics import compute_analytics
+from services.analytics_engine import compute_insights
+from services.categorize import categorize_batch
+from services.responses import dumps
+from services.sib_parser import parse_sib_batch
+
+
+def synthetic_result(n_rows, per_page=30):
+    batch = parse_sib_batch(sib_pages(-(-n_rows // per_page), per_page))
+    categorize_batch(batch)
+    return batch, {"bank": "SIB", "analytics": compute_analytics(batch), "insights": compute_insights(batch)}
+
+
+def previous_path(result):
+    return json.dumps(jsonable_encoder(result), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def model_path(result):
+    return ParseResponse.model_validate(result).model_dump_json(exclude_unset=True).encode()
+
+
+def best_of(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 50000])
+    ap.add_argument("--repeat", type=int, default=3)
+    args = ap.parse_args()
+
+    print(f"{'rows':>7} {'to_dicts':>9} {'encoder':>9} {'model':>9} {'orjson':>9} {'speedup':>8} {'size':>9}")
+    for n_rows in args.rows:
+        batch, result = synthetic_result(n_rows)
+        rows_s, rows = best_of(batch.to_dicts, args.repeat)
+        result = {**result, "transactions": rows}
+
+        encoder_s, encoded = best_of(lambda: previous_path(result), args.repeat)
+        model_s, _ = best_of(lambda: model_path(result), args.repeat)
+        orjson_s, fast = best_of(lambda: dumps(result), args.repeat)
+        assert json.loads(fast) == json.loads(encoded)
+
+        print(f"{len(batch):>7} {rows_s * 1000:>7.1f}ms {encoder_s * 1000:>7.1f}ms {model_s * 1000:>7.1f}ms "
+              f"{orjson_s * 1000:>7.1f}ms {encoder_s / orjson_s:>7.1f}x {len(fast) / 1024:>7.0f}KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Microbenchmark: parse_sib against the previous per-pattern implementation.
+
+    cd backend && python -m benchmarks.bench_sib_parser --pages 200
+"""
+import argparse
+import re
+import time
+
+from benchmarks.synthetic import sib_pages
+from services.sib_parser import parse_sib, guess_debit_credit_fallback
+
+
+def legacy_parse_sib(text: str):
+    # Previous implementation, kept verbatim for comparison: every pattern is
+    # looked up per line / per chunk and parse_amt is redefined per chunk.
+    transactions = []
+    text = re.sub(r'([A-Z])\1{2,}', r'\1', text)
+    clean_lines = []
+    raw_lines = text.splitlines()
+    LINE_NOISE_PATTERNS = [
+        r"Page\s+Total", r"Grand\s+Total", r"Statement\s+of\s+Account",
+        r"Account\s+Summary", r"Opening\s+Balance", r"Closing\s+Balance",
+        r"Page\s+\d+\s+of\s+\d+", r"Customer\s+ID", r"Branch\s+Code",
+        r"Visit\s+us\s+at", r"System\s+Generated", r"IFSC\s*:",
+        r"DATE\s+PARTICULARS", r"WITHDRAWALS\s+DEPOSITS"
+    ]
+    for line in raw_lines:
+        clean_line = " ".join(line.split())
+        is_noise = False
+        for pat in LINE_NOISE_PATTERNS:
+            if re.search(pat, clean_line, re.IGNORECASE):
+                is_noise = True
+                break
+        if not is_noise:
+            clean_lines.append(line)
+    cleaned_text = "\n".join(clean_lines)
+    chunk_pattern = r"(?m)^\s*(?=\d{2}-\d{2}-\d{2}(?!\d))"
+    chunks = re.split(chunk_pattern, cleaned_text)
+    txn_id = 1
+    previous_balance = None
+    amount_pattern = re.compile(r"[\d,]+\.\d{2}(?:[Cc][Rr]|[Dd][Rr])?")
+    for chunk in chunks:
+        if not chunk.strip(): continue
+        date_match = re.match(r"^\s*(\d{2}-\d{2}-\d{2})", chunk)
+        if not date_match: continue
+        date_str = date_match.group(1)
+        money_matches = amount_pattern.findall(chunk)
+        if len(money_matches) < 2: continue
+        balance_str = money_matches[-1]
+        amount_str = money_matches[-2]
+        def parse_amt(val):
+            val = val.upper().replace(",", "").replace("CR", "").replace("DR", "").strip()
+            try: return float(val)
+            except: return 0.0
+        balance = parse_amt(balance_str)
+        amount = parse_amt(amount_str)
+        is_debit = None
+        if previous_balance is not None:
+            diff_if_debit = abs(previous_balance - amount - balance)
+            diff_if_credit = abs(previous_balance + amount - balance)
+            if diff_if_debit < diff_if_credit and diff_if_debit < 5.0:
+                is_debit = True
+            elif diff_if_credit < diff_if_debit and diff_if_credit < 5.0:
+                is_debit = False
+        if is_debit is None:
+            is_debit = guess_debit_credit_fallback(chunk)
+        if is_debit:
+            debit = amount
+            credit = None
+        else:
+            debit = None
+            credit = amount
+        flat_chunk = chunk.replace("\n", " ")
+        temp_text = flat_chunk.replace(date_str, "").replace(balance_str, "").replace(amount_str, "")
+        FOOTER_TRIGGERS = [
+            r"IFSC\s*:", r"PIN\s*:\s*\d{6}", r"Ph\s*:\s*\d+", r"\S+@\S+\.\S+",
+            r"GATE\s+NO", r"DATE\s*:", r"PAGE\s*:", r"Date/Time\s*:",
+            r"This\s+is\s+a", r"C/O\s", r"Br\.\s*mail\s*id", r"Statement\s+of",
+            r"Account\s+Summary", r"Period\s+From", r"-{3,}"
+        ]
+        cut_index = len(temp_text)
+        for trigger in FOOTER_TRIGGERS:
+            match = re.search(trigger, temp_text, re.IGNORECASE)
+            if match:
+                if match.start() < cut_index:
+                    cut_index = match.start()
+        clean_desc_text = temp_text[:cut_index]
+        chq_no = ""
+        chq_match = re.search(r"\b(\d{6,12})\b", clean_desc_text)
+        if chq_match:
+            chq_no = chq_match.group(1)
+            clean_desc_text = clean_desc_text.replace(chq_no, "")
+        description = clean_desc_text.strip()
+        description = description.replace("|", "").strip()
+        description = description.replace("RRN-", "")
+        description = description.replace("//", "/")
+        description = " ".join(description.split())
+        if description.endswith("/"):
+            description = description[:-1]
+        transactions.append({
+            "id": txn_id, "txn_date": date_str, "description": description,
+            "ref_no": chq_no if chq_no else None, "debit": debit, "credit": credit,
+            "balance": balance, "confidence": 1.0, "is_flagged": False
+        })
+        previous_balance = balance
+        txn_id += 1
+    return transactions
+
+
+def best_of(fn, arg, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", type=int, default=100)
+    ap.add_argument("--per-page", type=int, default=30)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    text = "".join(sib_pages(args.pages, args.per_page))
+    legacy_s, expected = best_of(legacy_parse_sib, text, args.repeat)
+    current_s, actual = best_of(parse_sib, text, args.repeat)
+    assert actual == expected, "parse_sib output differs from the legacy implementation"
+
+    print(f"{len(actual)} transactions, {len(text) / 1e6:.2f} MB of text")
+    print(f"legacy   : {legacy_s * 1000:8.1f} ms")
+    print(f"current  : {current_s * 1000:8.1f} ms")
+    print(f"speedup  : {legacy_s / current_s:8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
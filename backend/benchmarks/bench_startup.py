@@ -0,0 +1,133 @@
+"""
+Cold-start benchmark: import time of main and first-request latency.
+
+    cd backend && python -m benchmarks.bench_startup --runs 5 --out startup.json
+
+Every measurement runs in a fresh interpreter, because a warm process
+can't show import costs. Reports:
+
+  import     `import main` wall time (median over --runs), plus the modules
+             with the largest cumulative time from -X importtime
+  per WARMUP mode (off, background, blocking):
+    startup  time for the app lifespan to start (when uvicorn begins serving)
+    health   first GET /
+    first    first POST /parse of a synthetic statement (result cache off)
+    second   the same upload again, for the warm baseline
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ["off", "background", "blocking"]
+
+
+def child(pdf_path):
+    # Runs in the fresh interpreter: times the lifespan and the first requests
+    start = time.perf_counter()
+    import main
+    from fastapi.testclient import TestClient
+    result = {"import": time.perf_counter() - start}
+    with open(pdf_path, "rb") as f:
+        content = f.read()
+
+    start = time.perf_counter()
+    with TestClient(main.app) as client:
+        result["startup"] = time.perf_counter() - start
+        for name, request in [
+            ("health", lambda: client.get("/")),
+            ("first", lambda: client.post("/parse", files={"file": ("s.pdf", content, "application/pdf")})),
+            ("second", lambda: client.post("/parse", files={"file": ("s.pdf", content, "application/pdf")})),
+        ]:
+            start = time.perf_counter()
+            response = request()
+            result[name] = time.perf_counter() - start
+            if response.status_code != 200:
+                result["error"] = f"{name}: HTTP {response.status_code}"
+    print(json.dumps(result))
+
+
+def run_child(args, env):
+    out = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_startup", "--child", *args],
+        cwd=BACKEND, env={**os.environ, **env}, capture_output=True, text=True, check=True,
+    )
+    return out
+
+
+def import_time():
+    code = "import time; t = time.perf_counter(); import main; print(time.perf_counter() - t)"
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def top_imports(n):
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"],
+                         cwd=BACKEND, capture_output=True, text=True, check=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.strip() != "main":
+            rows.append((int(cumulative) / 1000, name.strip()))
+    # Top-level packages only; their children are already in the cumulative figure
+    top = {}
+    for ms, name in rows:
+        root = name.split(".")[0]
+        top[root] = max(top.get(root, 0), ms)
+    return sorted(top.items(), key=lambda kv: -kv[1])[:n]
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--pages", type=int, default=3, help="pages in the synthetic statement")
+    ap.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    ap.add_argument("--out", help="write results as JSON")
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.child:
+        return child(args.child)
+
+    from benchmarks.pdfgen import statement_pdf
+    fd, pdf_path = tempfile.mkstemp(suffix=".pdf")
+    with os.fdopen(fd, "wb") as f:
+        f.write(statement_pdf("sbi", args.pages))
+
+    try:
+        imports = [import_time() for _ in range(args.runs)]
+        report = {"importMs": round(statistics.median(imports) * 1000, 1), "topImportsMs": dict(top_imports(10)), "modes": {}}
+        print(f"import main: {report['importMs']:.0f}ms (median of {args.runs})")
+        for name, ms in report["topImportsMs"].items():
+            print(f"  {name:<20} {ms:>7.1f}ms")
+
+        print(f"\n{'WARMUP':<12} {'startup':>9} {'health':>9} {'first':>9} {'second':>9}")
+        for mode in args.modes:
+            runs = []
+            for _ in range(args.runs):
+                out = run_child([pdf_path], {"WARMUP": mode, "CACHE_MAX_BYTES": "0", "LOG_LEVEL": "WARNING"})
+                runs.append(json.loads(out.stdout.strip().splitlines()[-1]))
+            errors = [r["error"] for r in runs if "error" in r]
+            summary = {k: round(statistics.median(r[k] for r in runs) * 1000, 1) for k in ("startup", "health", "first", "second")}
+            if errors:
+                summary["error"] = errors[0]
+            report["modes"][mode] = summary
+            print(f"{mode:<12} " + " ".join(f"{summary[k]:>7.0f}ms" for k in ("startup", "health", "first", "second"))
+                  + (f"  {errors[0]}" if errors else ""))
+    finally:
+        os.remove(pdf_path)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nwrote {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Load test: health-check latency while uploads are being parsed.
+
+Probes GET / continuously, first on an idle server and then while several
+uploads hit /parse concurrently, and prints p50/p99 for both phases. With
+parsing off the event loop the two p99s should stay close.
+
+    uvicorn main:app --port 8000
+    python benchmarks/load_health.py statement.pdf --uploads 4 --url http://127.0.0.1:8000
+"""
+import argparse
+import statistics
+import threading
+import time
+import urllib.request
+import uuid
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    k = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[k]
+
+
+def upload(url, pdf_bytes, filename, password=""):
+    boundary = uuid.uuid4().hex
+    body = (
+        f"--{boundary}\r\n"
+        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        "Content-Type: application/pdf\r\n\r\n"
+    ).encode() + pdf_bytes + (
+        f"\r\n--{boundary}\r\n"
+        'Content-Disposition: form-data; name="password"\r\n\r\n'
+        f"{password}\r\n--{boundary}--\r\n"
+    ).encode()
+    req = urllib.request.Request(
+        f"{url}/parse", data=body, method="POST",
+        headers={"Content-Type": f"multipart/form-data; boundary={boundary}"},
+    )
+    try:
+        with urllib.request.urlopen(req, timeout=600) as resp:
+            resp.read()
+    except Exception as e:
+        print(f"upload failed: {e}")
+
+
+def probe(url, stop, samples):
+    while not stop.is_set():
+        start = time.perf_counter()
+        with urllib.request.urlopen(f"{url}/", timeout=60) as resp:
+            resp.read()
+        samples.append((time.perf_counter() - start) * 1000)
+        time.sleep(0.02)
+
+
+def run_phase(url, seconds, pdf_bytes=None, filename="", uploads=0, password=""):
+    samples = []
+    stop = threading.Event()
+    prober = threading.Thread(target=probe, args=(url, stop, samples))
+    prober.start()
+    workers = [
+        threading.Thread(target=upload, args=(url, pdf_bytes, filename, password))
+        for _ in range(uploads)
+    ]
+    for w in workers:
+        w.start()
+    if workers:
+        for w in workers:
+            w.join()
+    else:
+        time.sleep(seconds)
+    stop.set()
+    prober.join()
+    return samples
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("pdf")
+    ap.add_argument("--url", default="http://127.0.0.1:8000")
+    ap.add_argument("--uploads", type=int, default=4)
+    ap.add_argument("--idle-seconds", type=float, default=5)
+    ap.add_argument("--password", default="")
+    args = ap.parse_args()
+
+    with open(args.pdf, "rb") as f:
+        pdf_bytes = f.read()
+
+    idle = run_phase(args.url, args.idle_seconds)
+    busy = run_phase(args.url, 0, pdf_bytes, args.pdf, args.uploads, args.password)
+
+    for name, samples in (("idle", idle), (f"{args.uploads} uploads", busy)):
+        print(
+            f"{name:>12}: n={len(samples):5d}  p50={statistics.median(samples):7.2f} ms  "
+            f"p99={percentile(samples, 99):7.2f} ms  max={max(samples):7.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
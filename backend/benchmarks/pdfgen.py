@@ -0,0 +1,145 @@
+"""
+Synthetic statement PDFs for benchmarks (needs reportlab: pip install reportlab).
+
+    cd backend && python -m benchmarks.pdfgen sib out.pdf --pages 100
+    cd backend && python -m benchmarks.pdfgen sbi out.pdf --pages 20 --password secret --image-every 4
+
+SBI-style files draw every row inside a ruled grid, the way pdfplumber's
+table extraction expects. SIB-style files are monospaced layout text with
+no grid. Both take their rows from benchmarks.synthetic, so dates run forward
+and the balance chain stays consistent. Pages can be rasterized into
+image-only pages (no text layer) to exercise the OCR path, and the file can
+be encrypted.
+"""
+import argparse
+import io
+import os
+
+import reportlab
+from PIL import Image, ImageDraw, ImageFont
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfgen import canvas
+
+from benchmarks.synthetic import sbi_pages, sib_pages
+
+PAGE_SIZE = landscape(A4)
+# Resolution image-only pages are rasterized at
+IMAGE_DPI = 150
+SBI_COLUMNS = [62, 62, 230, 110, 72, 72, 82]
+SBI_ROW_HEIGHT = 14
+SIB_LINE_HEIGHT = 11
+
+
+def sib_layout(page):
+    # Each layout line drawn at a fixed left margin in a monospaced font
+    ops = []
+    y = PAGE_SIZE[1] - 35
+    for line in page.splitlines():
+        ops.append(("text", 20, y, line, "Courier", 8))
+        y -= SIB_LINE_HEIGHT
+    return ops
+
+
+def sbi_layout(page, letterhead):
+    # Grid of ruled cells; the letterhead goes on the first page only
+    ops = []
+    top = PAGE_SIZE[1] - 35
+    if letterhead:
+        ops.append(("text", 20, top, "STATE BANK OF INDIA", "Helvetica-Bold", 14))
+        ops.append(("text", 20, top - 16, "Account Statement", "Helvetica", 9))
+        top -= 36
+    rows = [row.split(" | ") for row in page.splitlines()]
+    left = 20
+    right = left + sum(SBI_COLUMNS)
+    bottom = top - SBI_ROW_HEIGHT * len(rows)
+    for r in range(len(rows) + 1):
+        y = top - r * SBI_ROW_HEIGHT
+        ops.append(("line", left, y, right, y))
+    x = left
+    for width in SBI_COLUMNS + [0]:
+        ops.append(("line", x, top, x, bottom))
+        x += width
+    for r, row in enumerate(rows):
+        x = left
+        y = top - (r + 1) * SBI_ROW_HEIGHT + 4
+        for cell, width in zip(row, SBI_COLUMNS):
+            ops.append(("text", x + 2, y, cell, "Helvetica", 7))
+            x += width
+    return ops
+
+
+def draw_vector(c, ops):
+    for op in ops:
+        if op[0] == "text":
+            _, x, y, text, font, size = op
+            c.setFont(font, size)
+            c.drawString(x, y, text)
+        else:
+            c.line(*op[1:])
+
+
+def draw_image(c, ops):
+    # Rasterize the page so it has no text layer at all
+    scale = IMAGE_DPI / 72
+    width, height = int(PAGE_SIZE[0] * scale), int(PAGE_SIZE[1] * scale)
+    image = Image.new("L", (width, height), 255)
+    draw = ImageDraw.Draw(image)
+    fonts = {}
+    for op in ops:
+        if op[0] == "text":
+            _, x, y, text, font, size = op
+            if size not in fonts:
+                fonts[size] = ImageFont.truetype(os.path.join(reportlab.__path__[0], "fonts", "Vera.ttf"), int(size * scale))
+            draw.text((x * scale, (PAGE_SIZE[1] - y - size) * scale), text, fill=0, font=fonts[size])
+        else:
+            _, x0, y0, x1, y1 = op
+            draw.line([(x0 * scale, (PAGE_SIZE[1] - y0) * scale), (x1 * scale, (PAGE_SIZE[1] - y1) * scale)], fill=0)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    buffer.seek(0)
+    c.drawImage(ImageReader(buffer), 0, 0, width=PAGE_SIZE[0], height=PAGE_SIZE[1])
+
+
+def statement_pdf(bank, n_pages=10, per_page=30, password=None, image_every=0, seed=1):
+    """
+    PDF bytes for a synthetic `bank` ("sbi" or "sib") statement.
+
+    image_every=N rasterizes every Nth page (1 = every page, 0 = none).
+    """
+    if bank == "sib":
+        layouts = [sib_layout(page) for page in sib_pages(n_pages, per_page, seed)]
+    elif bank == "sbi":
+        layouts = [sbi_layout(page, i == 0) for i, page in enumerate(sbi_pages(n_pages, per_page, seed))]
+    else:
+        raise ValueError(f"Unknown bank: {bank}")
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=PAGE_SIZE, encrypt=password or None)
+    for i, ops in enumerate(layouts):
+        if image_every and (i + 1) % image_every == 0:
+            draw_image(c, ops)
+        else:
+            draw_vector(c, ops)
+        c.showPage()
+    c.save()
+    return buffer.getvalue()
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("bank", choices=["sbi", "sib"])
+    ap.add_argument("out")
+    ap.add_argument("--pages", type=int, default=10)
+    ap.add_argument("--rows", type=int, default=30, help="transactions per page")
+    ap.add_argument("--password", default="")
+    ap.add_argument("--image-every", type=int, default=0, help="rasterize every Nth page (1 = all)")
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+    data = statement_pdf(args.bank, args.pages, args.rows, args.password, args.image_every, args.seed)
+    with open(args.out, "wb") as f:
+        f.write(data)
+    print(f"{args.out}: {len(data):,} bytes")
+
+
+if __name__ == "__main__":
+    main()
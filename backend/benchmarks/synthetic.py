@@ -0,0 +1,81 @@
+"""
+Synthetic statement text for benchmarks.
+
+sib_pages() produces the layout text pdf_loader extracts from South Indian
+Bank statements; sbi_pages() produces the pipe-joined table rows it builds
+for SBI. Both are deterministic for a given seed and read like real
+statements: dates never go backwards and the balance column is a consistent
+running balance that never goes negative, so parsed rows are flagged only
+where a parser misreads.
+"""
+import random
+from datetime import date, timedelta
+
+START_DATE = date(2024, 1, 1)
+
+SIB_DEBITS = ["UPI/DR/{ref}/SWIGGY/PAYTM", "ATM WDL SBI ATM KOCHI", "TO CHARGES SMS ALERT", "RTGS TO ACME TRADERS"]
+SIB_CREDITS = ["BY NEFT SALARY ACME LTD", "UPI/CR/{ref}/JOHN MATHEW", "REFUND AMAZON SELLER", "DEPOSIT CASH BRANCH"]
+SBI_DEBITS = ["TO TRANSFER-UPI/DR/{ref}/SWIGGY", "ATM WDL-ATM CASH {ref}", "DEBIT-EMI HDFC LOAN"]
+SBI_CREDITS = ["BY TRANSFER-NEFT SALARY ACME", "BY TRANSFER-UPI/CR/{ref}/JOHN", "CREDIT INTEREST"]
+
+
+def _next_day(r, day):
+    # A few transactions a day: the next row is on the same day or the one after
+    return day + timedelta(days=r.random() < 0.3)
+
+
+def sib_pages(n_pages=10, per_page=30, seed=1):
+    r = random.Random(seed)
+    balance = 50000.0
+    day = START_DATE
+    pages = []
+    for p in range(n_pages):
+        lines = [
+            "      THE SOUTH INDIAN BANK LTD",
+            f"  Statement of Account          Page {p + 1} of {n_pages}",
+            "   DATE      PARTICULARS                    CHQ.NO.    WITHDRAWALS   DEPOSITS    BALANCE",
+            "",
+        ]
+        for _ in range(per_page):
+            amount = round(r.uniform(10, 5000), 2)
+            ref = r.randint(10**9, 10**11)
+            if r.random() < 0.5 and amount <= balance:
+                balance -= amount
+                desc = r.choice(SIB_DEBITS).format(ref=ref)
+            else:
+                balance += amount
+                desc = r.choice(SIB_CREDITS).format(ref=ref)
+            day = _next_day(r, day)
+            lines.append(f"  {day:%d-%m-%y}  {desc:<40} {amount:>12,.2f} {balance:>12,.2f}")
+            if r.random() < 0.3:
+                lines.append(f"            CONTD//RRN-{r.randint(10**6, 10**8)}")
+        lines += [
+            "   Page Total     1,234.00   2,345.00",
+            "  IFSC : SIBL0000123  PIN : 680001 Ph : 04872420020  Br. mail id br0123@sib.co.in",
+            "",
+        ]
+        pages.append("\n".join(lines) + "\n")
+    return pages
+
+
+def sbi_pages(n_pages=10, per_page=30, seed=1):
+    r = random.Random(seed)
+    balance = 50000.0
+    day = START_DATE
+    pages = []
+    for p in range(n_pages):
+        rows = ["Txn Date | Value Date | Description | Ref No./Cheque No. | Debit | Credit | Balance"]
+        for _ in range(per_page):
+            amount = round(r.uniform(10, 5000), 2)
+            ref = r.randint(10**9, 10**11)
+            day = _next_day(r, day)
+            when = f"{day:%d/%m/%Y}"
+            if r.random() < 0.5 and amount <= balance:
+                balance -= amount
+                row = [when, when, r.choice(SBI_DEBITS).format(ref=ref), f"TRANSFER TO {ref}", f"{amount:,.2f}", "", f"{balance:,.2f}"]
+            else:
+                balance += amount
+                row = [when, when, r.choice(SBI_CREDITS).format(ref=ref), "", "", f"{amount:,.2f}", f"{balance:,.2f}"]
+            rows.append(" | ".join(row))
+        pages.append("\n".join(rows) + "\n")
+    return pages
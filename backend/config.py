@@ -0,0 +1,106 @@
+import os
+
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+# --- Logging ---
+# Standard level name; DEBUG adds per-stage timings to the log
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+# "text" or "json" (one object per line, for log shippers)
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text")
+
+# --- PDF extraction ---
+# Number of processes used for page-sharded extraction (0 or 1 = sequential)
+EXTRACT_WORKERS = _env_int("EXTRACT_WORKERS", os.cpu_count() or 1)
+# Documents shorter than this are extracted sequentially; the pool overhead isn't worth it
+PARALLEL_MIN_PAGES = _env_int("PARALLEL_MIN_PAGES", 16)
+
+# --- Startup ---
+# "background" loads the PDF stack and starts extraction workers after the
+# worker begins serving, "blocking" before it does, "off" on the first parse
+WARMUP = os.environ.get("WARMUP", "background")
+
+# --- Uploads ---
+# Largest upload accepted. /parse and /sessions refuse bigger ones with a 413
+# from their Content-Length, before the body is read; otherwise (batches,
+# chunked requests) a file is checked once Starlette has received it
+UPLOAD_MAX_BYTES = _env_int("UPLOAD_MAX_BYTES", 100 * 1024 * 1024)
+# Uploads past this size are kept in a temp file (Starlette's own when it has
+# one) and memory-mapped instead of read into memory
+UPLOAD_SPOOL_BYTES = _env_int("UPLOAD_SPOOL_BYTES", 4 * 1024 * 1024)
+# Directory for spooled uploads (the system temp dir when empty)
+UPLOAD_DIR = os.environ.get("UPLOAD_DIR", "")
+# Estimated peak memory one non-streaming parse may use. Larger statements are
+# streamed instead when the client accepts NDJSON/SSE, else rejected with a 413.
+# At most MAX_CONCURRENT_PARSES of these run at once.
+PARSE_MEMORY_BUDGET = _env_int("PARSE_MEMORY_BUDGET", 512 * 1024 * 1024)
+
+# --- /parse request handling ---
+# Worker processes parsing uploads off the event loop, and threads for upload
+# sessions and streamed parses. 0 parses uploads on those threads in this
+# process instead (to profile a parse, or measure its memory).
+PARSE_WORKERS = _env_int("PARSE_WORKERS", 4)
+# Parses allowed in flight at once; further uploads wait in the queue
+MAX_CONCURRENT_PARSES = _env_int("MAX_CONCURRENT_PARSES", PARSE_WORKERS)
+# Seconds an upload may wait for a free slot before getting a 503
+PARSE_QUEUE_TIMEOUT = _env_int("PARSE_QUEUE_TIMEOUT", 30)
+# Seconds a single parse may run before the request gets a 504
+PARSE_TIMEOUT = _env_int("PARSE_TIMEOUT", 120)
+
+# --- Upload sessions (password retries without re-uploading) ---
+# Seconds an uploaded statement is kept for password attempts and the parse
+SESSION_TTL = _env_int("SESSION_TTL", 300)
+# Total upload bytes held across sessions; the oldest idle ones make room
+SESSION_MAX_BYTES = _env_int("SESSION_MAX_BYTES", 256 * 1024 * 1024)
+# Wrong passwords allowed per session before it is discarded
+SESSION_MAX_ATTEMPTS = _env_int("SESSION_MAX_ATTEMPTS", 10)
+
+# --- OCR fallback ---
+# Threads running tesseract concurrently (each call is its own subprocess)
+OCR_WORKERS = _env_int("OCR_WORKERS", os.cpu_count() or 1)
+# Speed/accuracy trade-off: "fast", "balanced" or "accurate"
+OCR_PROFILE = os.environ.get("OCR_PROFILE", "accurate")
+# Overrides the profile's DPI when set (> 0)
+OCR_DPI = _env_int("OCR_DPI", 0)
+
+# --- Responses ---
+# 1 = validate responses against their Pydantic models (slow; for development)
+VALIDATE_RESPONSES = _env_int("VALIDATE_RESPONSES", 0)
+
+# --- Parse result cache ---
+# Off by default: parsed statements are only kept past their request when an
+# operator opts in with a memory budget, a directory, or both.
+# In-memory LRU budget for serialized results (0 = no memory tier)
+CACHE_MAX_BYTES = _env_int("CACHE_MAX_BYTES", 0)
+# Seconds a cached result lives, in memory and on disk
+CACHE_TTL = _env_int("CACHE_TTL", 15 * 60)
+# Optional on-disk tier; results survive restarts when CACHE_SECRET is also set
+CACHE_DIR = os.environ.get("CACHE_DIR", "")
+# Bytes the on-disk tier may hold; the oldest results go first (0 = unbounded)
+CACHE_DIR_MAX_BYTES = _env_int("CACHE_DIR_MAX_BYTES", 1024 * 1024 * 1024)
+# HMAC key for folding passwords into cache keys (random per process by default)
+CACHE_SECRET = os.environ.get("CACHE_SECRET", "").encode() or os.urandom(32)
+
+# --- Reconciliation ---
+# Default search budget for /reconcile; the best matches so far are returned when it runs out
+RECONCILE_TIME_BUDGET_MS = _env_int("RECONCILE_TIME_BUDGET_MS", 2000)
+# Hard cap on client-supplied budgets and top-k
+RECONCILE_MAX_TIME_BUDGET_MS = _env_int("RECONCILE_MAX_TIME_BUDGET_MS", 10000)
+RECONCILE_MAX_TOP_K = _env_int("RECONCILE_MAX_TOP_K", 50)
+
+# --- Categorization ---
+# JSON rule set for transaction categories; edits are picked up on the next parse
+CATEGORY_RULES = os.environ.get("CATEGORY_RULES", os.path.join(os.path.dirname(__file__), "rules", "categories.json"))
+# Distinct descriptions remembered per rule set before the memo is reset
+CATEGORY_CACHE_SIZE = _env_int("CATEGORY_CACHE_SIZE", 100_000)
+
+# --- Transaction store ---
+# SQLite file for saved statements; empty means a temporary database for this process only
+DB_PATH = os.environ.get("DB_PATH", "")
+# Largest page size /transactions will return
+STORE_MAX_PAGE_SIZE = _env_int("STORE_MAX_PAGE_SIZE", 1000)
+# Search results are counted up to this many matches, then reported as a lower bound
+SEARCH_COUNT_CAP = _env_int("SEARCH_COUNT_CAP", 5000)
@@ -0,0 +1,417 @@
+import atexit
+import hashlib
+import logging
+import secrets
+import threading
+from datetime import date
+import config
+from db.temp_db import connect, create_temp_db, destroy_temp_db
+from services.transactions import TransactionBatch, NULL_PAISE, ABSENT, from_paise
+
+log = logging.getLogger(__name__)
+
+# Saved statements belong to an owner: whoever holds the token minted when
+# the first one was saved. Only the token's SHA-256 is stored, as `owner` on
+# every row, and every read or delete is filtered by it.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS owners (
+    token_hash  TEXT PRIMARY KEY,
+    created_at  TEXT NOT NULL DEFAULT (datetime('now'))
+);
+CREATE TABLE IF NOT EXISTS statements (
+    id          INTEGER PRIMARY KEY,
+    owner       TEXT,
+    account     TEXT NOT NULL,
+    bank        TEXT NOT NULL,
+    file_name   TEXT,
+    row_count   INTEGER NOT NULL,
+    created_at  TEXT NOT NULL DEFAULT (datetime('now'))
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    id            INTEGER PRIMARY KEY,
+    statement_id  INTEGER NOT NULL REFERENCES statements(id) ON DELETE CASCADE,
+    owner         TEXT,
+    account       TEXT NOT NULL,
+    bank          TEXT NOT NULL,
+    txn_no        INTEGER NOT NULL,
+    txn_date      TEXT,
+    date_str      TEXT NOT NULL,
+    description   TEXT NOT NULL,
+    ref_no        TEXT,
+    debit         INTEGER,
+    credit        INTEGER,
+    amount        INTEGER NOT NULL,
+    balance       INTEGER,
+    confidence    REAL NOT NULL,
+    is_flagged    INTEGER NOT NULL,
+    category      TEXT
+);
+"""
+
+# Created once the owner columns exist (see TransactionStore._migrate)
+INDEXES = """
+DROP INDEX IF EXISTS idx_txn_account_date;
+CREATE INDEX IF NOT EXISTS idx_statements_owner ON statements(owner, account);
+CREATE INDEX IF NOT EXISTS idx_txn_owner_account_date ON transactions(owner, account, txn_date);
+CREATE INDEX IF NOT EXISTS idx_txn_amount ON transactions(amount);
+CREATE INDEX IF NOT EXISTS idx_txn_description ON transactions(description);
+CREATE INDEX IF NOT EXISTS idx_txn_statement ON transactions(statement_id);
+"""
+
+# Two external-content FTS5 indexes over description and ref_no: trigrams
+# answer substring queries, word tokens (with short prefix indexes) answer
+# prefix queries. add_statement() indexes each import with one INSERT ...
+# SELECT (row triggers made bulk inserts ~8x slower); deletes go through a
+# trigger so cascades stay in sync.
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE transactions_trigram USING fts5(
+    description, ref_no, content='transactions', content_rowid='id', tokenize='trigram'
+);
+CREATE VIRTUAL TABLE transactions_words USING fts5(
+    description, ref_no, content='transactions', content_rowid='id', prefix='2 3 4'
+);
+CREATE TRIGGER transactions_ad AFTER DELETE ON transactions BEGIN
+    INSERT INTO transactions_trigram (transactions_trigram, rowid, description, ref_no)
+        VALUES ('delete', old.id, old.description, old.ref_no);
+    INSERT INTO transactions_words (transactions_words, rowid, description, ref_no)
+        VALUES ('delete', old.id, old.description, old.ref_no);
+END;
+INSERT INTO transactions_trigram (transactions_trigram) VALUES ('rebuild');
+INSERT INTO transactions_words (transactions_words) VALUES ('rebuild');
+"""
+
+# Trigram matching needs at least this many characters per term
+MIN_TRIGRAM_TERM = 3
+
+COLUMNS = ("id", "statement_id", "owner", "account", "bank", "txn_no", "txn_date", "date_str", "description",
+           "ref_no", "debit", "credit", "amount", "balance", "confidence", "is_flagged", "category")
+
+
+class TransactionStore:
+    """
+    SQLite-backed history of saved statements.
+
+    Amounts are stored as integer paise and dates as ISO strings, so range
+    filters hit the (owner, account, txn_date) and amount indexes directly.
+    One connection takes writes under a lock; reads use a connection per
+    thread, which WAL lets run alongside an import.
+
+    Every read and delete takes the owner token returned by add_statement()
+    and only sees that owner's statements.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.write_lock = threading.Lock()
+        self.local = threading.local()
+        self.writer = connect(path)
+        self.writer.executescript(SCHEMA)
+        self._migrate()
+        self.writer.executescript(INDEXES)
+        has_search = self.writer.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'transactions_trigram'"
+        ).fetchone()
+        if not has_search:
+            # New database, or one created before search existed: index what's there
+            self.writer.executescript(f"BEGIN; {SEARCH_SCHEMA} COMMIT;")
+
+    def _migrate(self):
+        # Databases from before owners: their statements have no owner, so no
+        # token reaches them. They stay on disk for an operator to reassign.
+        for table in ("statements", "transactions"):
+            columns = [row[1] for row in self.writer.execute(f"PRAGMA table_info({table})")]
+            if "owner" not in columns:
+                self.writer.execute(f"ALTER TABLE {table} ADD COLUMN owner TEXT")
+                log.warning("Added %s.owner; rows saved before it are not visible to any owner", table)
+        self.writer.commit()
+
+    def _reader(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = self.local.conn = connect(self.path)
+        return conn
+
+    # --- Writes ---
+
+    def add_statement(self, account, bank, transactions, file_name=None, owner_token=None):
+        """
+        Bulk-insert one parsed statement for the owner of `owner_token`, or a
+        new owner when it is None. Returns (statement id, owner token); the
+        token is the only way to read the statement back. Raises UnknownOwner
+        for a token this store never issued.
+        """
+        batch = transactions if isinstance(transactions, TransactionBatch) else TransactionBatch.from_dicts(transactions)
+        with self.write_lock, self.writer:
+            if owner_token is None:
+                owner_token = secrets.token_urlsafe(32)
+                owner = _owner_key(owner_token)
+                self.writer.execute("INSERT INTO owners (token_hash) VALUES (?)", (owner,))
+            else:
+                owner = _owner_key(owner_token)
+                if not self.writer.execute("SELECT 1 FROM owners WHERE token_hash = ?", (owner,)).fetchone():
+                    raise UnknownOwner()
+            cursor = self.writer.execute(
+                "INSERT INTO statements (owner, account, bank, file_name, row_count) VALUES (?, ?, ?, ?, ?)",
+                (owner, account, bank, file_name, len(batch)),
+            )
+            statement_id = cursor.lastrowid
+            self.writer.executemany(
+                "INSERT INTO transactions (statement_id, owner, account, bank, txn_no, txn_date, date_str, description,"
+                " ref_no, debit, credit, amount, balance, confidence, is_flagged, category)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                _rows(batch, statement_id, owner, account, bank),
+            )
+            for index in ("transactions_trigram", "transactions_words"):
+                self.writer.execute(
+                    f"INSERT INTO {index} (rowid, description, ref_no)"
+                    " SELECT id, description, ref_no FROM transactions WHERE statement_id = ?",
+                    (statement_id,),
+                )
+        return statement_id, owner_token
+
+    def delete_statement(self, owner_token, statement_id):
+        with self.write_lock, self.writer:
+            return self.writer.execute(
+                "DELETE FROM statements WHERE id = ? AND owner = ?", (statement_id, _owner_key(owner_token))
+            ).rowcount > 0
+
+    # --- Reads ---
+
+    def has_owner(self, owner_token):
+        return self._reader().execute(
+            "SELECT 1 FROM owners WHERE token_hash = ?", (_owner_key(owner_token),)
+        ).fetchone() is not None
+
+    def statements(self, owner_token, account=None):
+        sql = "SELECT id, account, bank, file_name, row_count, created_at FROM statements WHERE owner = ?"
+        args = (_owner_key(owner_token),)
+        if account is not None:
+            sql += " AND account = ?"
+            args += (account,)
+        rows = self._reader().execute(sql + " ORDER BY id", args).fetchall()
+        keys = ("id", "account", "bank", "fileName", "rowCount", "createdAt")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def query(self, owner_token, account=None, date_from=None, date_to=None, min_amount=None, max_amount=None,
+              text=None, category=None, flagged=None, limit=100, offset=0):
+        """
+        One page of the owner's stored transactions matching every given
+        filter, ordered by account, date and insertion order, plus the total
+        match count. Dates are ISO strings (YYYY-MM-DD) and amounts are
+        rupees. A text filter is answered by search() instead, in its order.
+        """
+        if text and text.strip():
+            return self.search(owner_token, text, account=account, date_from=date_from, date_to=date_to,
+                               min_amount=min_amount, max_amount=max_amount, category=category,
+                               flagged=flagged, limit=limit, offset=offset)
+        where, args = _filters(owner_token, account, date_from, date_to, min_amount, max_amount, category, flagged)
+        clause = " WHERE " + " AND ".join(where)
+
+        conn = self._reader()
+        total = conn.execute("SELECT COUNT(*) FROM transactions" + clause, args).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT {', '.join(COLUMNS)} FROM transactions{clause}"
+            " ORDER BY account, txn_date, id LIMIT ? OFFSET ?",
+            args + [limit, offset],
+        ).fetchall()
+        return {"total": total, "limit": limit, "offset": offset, "transactions": [_to_dict(row) for row in rows]}
+
+    def iter_transactions(self, owner_token, account=None, date_from=None, date_to=None, min_amount=None,
+                          max_amount=None, category=None, flagged=None, chunk_size=1000):
+        """
+        Every matching transaction of the owner's in query() order, fetched
+        chunk by chunk.
+
+        Uses its own connection, since exports are consumed from whichever
+        worker thread the response is streamed on.
+        """
+        where, args = _filters(owner_token, account, date_from, date_to, min_amount, max_amount, category, flagged)
+        clause = " WHERE " + " AND ".join(where)
+        conn = connect(self.path)
+        try:
+            cursor = conn.execute(
+                f"SELECT {', '.join(COLUMNS)} FROM transactions{clause} ORDER BY account, txn_date, id", args
+            )
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield _to_dict(row)
+        finally:
+            conn.close()
+
+    def search(self, owner_token, text, prefix=False, account=None, date_from=None, date_to=None, min_amount=None,
+               max_amount=None, category=None, flagged=None, limit=100, offset=0):
+        """
+        Full-text search over the owner's descriptions and ref numbers,
+        newest rows first.
+
+        Every whitespace-separated term must match: as a substring by default,
+        or as the start of a word with prefix=True. The other filters are the
+        same as query(). Counting stops after config.SEARCH_COUNT_CAP matches
+        (filters included) so broad terms stay bounded; totalExact is False
+        when the total is only a lower bound.
+        """
+        terms = text.split()
+        where, args = _filters(owner_token, account, date_from, date_to, min_amount, max_amount, category, flagged, "t.")
+        if prefix:
+            source = "transactions_words"
+            match = " ".join(_fts_prefix(term) for term in terms)
+        else:
+            # Terms too short for trigrams are checked with LIKE on the matched rows
+            source = "transactions_trigram"
+            match = " ".join(_fts_phrase(term) for term in terms if len(term) >= MIN_TRIGRAM_TERM)
+            for term in terms:
+                if len(term) < MIN_TRIGRAM_TERM:
+                    where.append("(t.description LIKE ? ESCAPE '\\' OR t.ref_no LIKE ? ESCAPE '\\')")
+                    args += [_like(term)] * 2
+
+        conn = self._reader()
+        cap = config.SEARCH_COUNT_CAP
+        columns = ", ".join("t." + c for c in COLUMNS)
+        if not match:
+            # Only short terms: no index applies, fall back to a filtered scan
+            matches = f"FROM transactions t WHERE {' AND '.join(where)}"
+            order = "t.id DESC"
+        else:
+            # CROSS JOIN pins the FTS index as the outer loop, and ordering by
+            # its rowid lets SQLite walk matches newest-first and stop after
+            # one page instead of sorting every match.
+            matches = (f"FROM {source} f CROSS JOIN transactions t ON t.id = f.rowid"
+                       f" WHERE {source} MATCH ?" + "".join(" AND " + w for w in where))
+            order = "f.rowid DESC"
+            args = [match] + args
+        rows = conn.execute(f"SELECT {columns} {matches} ORDER BY {order} LIMIT ? OFFSET ?",
+                            args + [limit, offset]).fetchall()
+        if len(rows) < limit and (rows or not offset):
+            # A short page is the end of the matches, so it gives the count
+            total, exact = offset + len(rows), True
+        else:
+            # Count the filtered matches themselves, up to cap + 1
+            total = conn.execute(f"SELECT COUNT(*) FROM (SELECT 1 {matches} LIMIT ?)", args + [cap + 1]).fetchone()[0]
+            exact = total <= cap
+            total = min(total, cap)
+            if rows:
+                # Paging past the cap: rows already seen are still counted
+                total = max(total, offset + len(rows))
+        return {
+            "total": total,
+            "totalExact": exact,
+            "limit": limit,
+            "offset": offset,
+            "transactions": [_to_dict(row) for row in rows],
+        }
+
+    def close(self):
+        self.writer.close()
+
+
+class UnknownOwner(Exception):
+    # An owner token this store didn't issue
+    pass
+
+
+def _owner_key(owner_token):
+    # Tokens are 256 random bits; an unsalted hash is enough to keep them off disk
+    return hashlib.sha256(owner_token.encode()).hexdigest()
+
+
+def _filters(owner_token, account, date_from, date_to, min_amount, max_amount, category, flagged, alias=""):
+    where, args = [f"{alias}owner = ?"], [_owner_key(owner_token)]
+    if account is not None:
+        where.append(f"{alias}account = ?")
+        args.append(account)
+    if date_from is not None:
+        where.append(f"{alias}txn_date >= ?")
+        args.append(date_from)
+    if date_to is not None:
+        where.append(f"{alias}txn_date <= ?")
+        args.append(date_to)
+    if min_amount is not None:
+        where.append(f"{alias}amount >= ?")
+        args.append(round(min_amount * 100))
+    if max_amount is not None:
+        where.append(f"{alias}amount <= ?")
+        args.append(round(max_amount * 100))
+    if category is not None:
+        where.append(f"{alias}category = ?")
+        args.append(category)
+    if flagged is not None:
+        where.append(f"{alias}is_flagged = ?")
+        args.append(1 if flagged else 0)
+    return where, args
+
+
+def _fts_phrase(term):
+    # A quoted FTS5 string: the term as a literal, quotes doubled
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _fts_prefix(term):
+    return _fts_phrase(term) + "*"
+
+
+def _like(term):
+    return "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def _rows(batch, statement_id, owner, account, bank):
+    strings = batch.pool.values
+    for i in range(len(batch)):
+        debit, credit = batch.debit[i], batch.credit[i]
+        day = batch.dates[i]
+        yield (
+            statement_id, owner, account, bank, batch.ids[i],
+            date.fromordinal(day).isoformat() if day else None,
+            strings[batch.date_strs[i]],
+            strings[batch.descriptions[i]],
+            None if batch.ref_nos[i] == ABSENT else strings[batch.ref_nos[i]],
+            None if debit == NULL_PAISE else debit,
+            None if credit == NULL_PAISE else credit,
+            debit if debit != NULL_PAISE else (credit if credit != NULL_PAISE else 0),
+            None if batch.balance[i] == NULL_PAISE else batch.balance[i],
+            batch.confidence[i],
+            batch.is_flagged[i],
+            None if batch.categories[i] == ABSENT else strings[batch.categories[i]],
+        )
+
+
+def _to_dict(row):
+    r = dict(zip(COLUMNS, row))
+    # Same shape as parsed transactions, plus where the row came from
+    return {
+        "id": r["id"],
+        "txn_date": r["date_str"],
+        "description": r["description"],
+        "ref_no": r["ref_no"],
+        "debit": None if r["debit"] is None else from_paise(r["debit"]),
+        "credit": None if r["credit"] is None else from_paise(r["credit"]),
+        "balance": None if r["balance"] is None else from_paise(r["balance"]),
+        "confidence": r["confidence"],
+        "is_flagged": bool(r["is_flagged"]),
+        "category": r["category"],
+        "bank": r["bank"],
+        "account": r["account"],
+        "statementId": r["statement_id"],
+        "isoDate": r["txn_date"],
+    }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """The process-wide store at config.DB_PATH (a temp database when unset)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            if config.DB_PATH:
+                _store = TransactionStore(config.DB_PATH)
+            else:
+                conn, path = create_temp_db()
+                conn.close()
+                _store = TransactionStore(path)
+                atexit.register(destroy_temp_db, path)
+        return _store
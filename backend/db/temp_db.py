@@ -2,11 +2,21 @@ import sqlite3
 import os
 import tempfile
 
+def connect(path):
+    # WAL lets readers page through results while an import is being written
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    return conn
+
 def create_temp_db():
     fd, path = tempfile.mkstemp(suffix=".db")
-    conn = sqlite3.connect(path)
+    os.close(fd)
+    conn = connect(path)
     return conn, path
 
 def destroy_temp_db(path):
-    if os.path.exists(path):
-        os.remove(path)
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
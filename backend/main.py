@@ -26,17 +26,114 @@
 
 
 
-import re
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form
+import asyncio
+import concurrent.futures
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import anyio
+from contextlib import asynccontextmanager, contextmanager
+from functools import partial
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Query, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from typing import Optional
-from services.pdf_loader import extract_text, extract_title_upload, PasswordRequiredException
-from services.sbi_parser import parse_sbi
-from services.sib_parser import parse_sib
+from fastapi.responses import JSONResponse, StreamingResponse, FileResponse, PlainTextResponse
+from starlette.background import BackgroundTask
+from datetime import date
+import os
+import time
+import logging
+from typing import List, Optional
+import config
+from services.pdf_loader import PasswordRequiredException, InvalidPDFException
+from services.pipeline import (
+    parse_pdf_bytes, parse_in_worker, init_parse_worker, iter_parse_events, NoTransactionsException, MemoryBudgetExceeded,
+    PARSER_VERSION, warm_up
+)
+from services.result_cache import result_cache, cache_key
+from services.sessions import (
+    UploadSession, upload_sessions, unlock_session, parse_session, iter_session_events,
+    SessionBusy, SessionClosed, TooManyAttempts
+)
+from services.analytics import compute_analytics
+from services.analytics_engine import compute_insights
+from models.schemas import (
+    AnalyticsRequest, ReconcileRequest, ExportRequest, ParseResponse, BatchParseResponse, AnalyticsResponse
+)
+from services.consolidate import consolidate
+from services.transactions import TransactionBatch
+from services.reconcile import reconcile, ReconcileError
+from services.categorize import get_categorizer
+from db.store import get_store, UnknownOwner
+from services.export import iter_csv, export_xlsx_file
+from services import telemetry
+from services.responses import (
+    OrjsonResponse, json_response, encode_response, negotiate, stream_fallback, dumps, loads, NEGOTIATED, NDJSON, SSE
+)
+from services import uploads
+
+telemetry.configure_logging()
+log = logging.getLogger(__name__)
+
+# Parsing is CPU-bound and synchronous, and pdfminer holds the GIL while it
+# works: on a thread it would still stall the event loop. Uploads are parsed
+# in worker processes (see get_parse_pool). Upload sessions keep their
+# decrypted document in this process and streamed parses are a generator
+# pulled event by event, so those two run on parse_threads.
+parse_threads = ThreadPoolExecutor(max_workers=max(config.PARSE_WORKERS, 1), thread_name_prefix="parse")
+parse_slots = asyncio.Semaphore(max(config.MAX_CONCURRENT_PARSES, 1))
+_parse_pool = None
+
+
+def get_parse_pool():
+    # Workers come from a fork server rather than being forked from here: a
+    # fork taken while another thread holds a lock (an import in progress,
+    # say) leaves the worker waiting on it forever. The server is a fresh
+    # single-threaded interpreter with the pipeline already imported.
+    global _parse_pool
+    if _parse_pool is None:
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["services.pipeline"])
+        _parse_pool = ProcessPoolExecutor(
+            max_workers=max(config.PARSE_WORKERS, 1), mp_context=context, initializer=init_parse_worker
+        )
+    return _parse_pool
 
-app = FastAPI()
 
+def safe_warm_up():
+    try:
+        warm_up()
+        if config.PARSE_WORKERS > 0:
+            # Start the parse workers too; each warms itself up
+            get_parse_pool().submit(os.getpid).result()
+    except Exception:
+        # The first parse will load whatever failed here
+        log.exception("Warm-up failed")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    if config.WARMUP == "blocking":
+        await asyncio.get_running_loop().run_in_executor(parse_threads, safe_warm_up)
+    elif config.WARMUP == "background":
+        # Health checks are answered straight away; a parse that arrives
+        # mid warm-up just waits on the import lock
+        asyncio.get_running_loop().run_in_executor(parse_threads, safe_warm_up)
+    yield
+    global _parse_pool
+    pool, _parse_pool = _parse_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+app = FastAPI(lifespan=lifespan, default_response_class=OrjsonResponse)
+
+# Single-file uploads over the limit are refused before their body is read.
+# Added first so CORS wraps it and browsers can read the 413.
+app.add_middleware(
+    uploads.UploadLimit,
+    paths={"/parse", "/sessions"},
+    max_bytes=config.UPLOAD_MAX_BYTES + uploads.FORM_OVERHEAD_BYTES,
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -53,6 +150,11 @@ def health_check():
         "message": "API is running"
     }
 
+@app.get("/metrics")
+def metrics():
+    # Prometheus scrape target: per-stage latency histograms and outcome counters
+    return PlainTextResponse(telemetry.render(), media_type="text/plain; version=0.0.4")
+
 # @app.post("/parse")
 # async def parse_statement(
 #     file: UploadFile = File(...), 
@@ -134,139 +236,693 @@ def health_check():
 #         print(f"Error: {str(e)}")
 #         raise HTTPException(status_code=500, detail={"message": str(e)})
 #
-@app.post("/parse")
+
+@app.post("/parse", response_model=ParseResponse, response_model_exclude_unset=True, responses=NEGOTIATED)
 async def parse_statement(
     file: UploadFile = File(...), 
-    password: str = Form("")
+    password: str = Form(""),
+    stream: str = Form(""),
+    save: bool = Form(False),
+    account: str = Form(""),
+    accept: str = Header("application/json"),
+    x_owner_token: Optional[str] = Header(None)
 ):
-    pdf_file = None
+    check_stream_options(stream, save)
+    await check_save_owner(save, x_owner_token)
+    # Small uploads in memory, large ones spooled to disk
+    content = await receive_upload(file)
+    # Set when a stream or an upload session takes the upload over and releases it itself
+    handed_over = False
     try:
-        # Read file content
-        content = await file.read()
-        print(f"[DEBUG] File received: {file.filename}, Size: {len(content)} bytes")
-        
-        # Create a file-like object
-        from io import BytesIO
-        pdf_file = BytesIO(content)
-        
-        # 1. Extract Text (Pass password if provided)
-        print(f"[DEBUG] Attempting to extract title with password: {'Yes' if password else 'No'}")
+        if stream in STREAM_FORMATS:
+            response = await stream_parse(iter_parse_events(content, password), stream, on_close=partial(uploads.release, content))
+            handed_over = True
+            return response
+        fmt = negotiate(accept)
+        if save or fmt != "json":
+            result = await run_parse(content, password)
+            if save:
+                result = {**result, **await save_statement(result, account, file.filename, x_owner_token)}
+            return await asyncio.to_thread(encode_response, result, fmt)
+        # Already-encoded JSON: straight from the cache, or serialized once on a miss
+        return json_response(await run_parse(content, password, raw=True))
+
+    except PasswordRequiredException as e:
+        log.info("Password required: %s", e)
+        # Password attempts can go to the session from here on, without re-uploading
+        session = upload_sessions.create(content, file.filename)
+        handed_over = session is not None
+        return password_required(session)
+    except InvalidPDFException as e:
+        log.info("Not a readable PDF: %s (%s)", file.filename, e)
+        return invalid_pdf()
+    except NoTransactionsException:
+        log.info("No transactions found in %s", file.filename)
+        return JSONResponse(
+            status_code=422,
+            content={"detail": {"code": "NO_TRANSACTIONS", "message": "No transactions found."}}
+        )
+    except MemoryBudgetExceeded as e:
+        response = await over_budget(e, accept, iter_parse_events(content, password), on_close=partial(uploads.release, content))
+        handed_over = isinstance(response, StreamingResponse)
+        return response
+    except HTTPException:
+        raise
+    except Exception as e:
+        log.exception("Unhandled exception parsing %s", file.filename)
+        raise HTTPException(
+            status_code=500, 
+            detail={
+                "message": f"{type(e).__name__}: {str(e)}",
+                "type": type(e).__name__
+            }
+        )
+    finally:
+        if not handed_over:
+            uploads.release(content)
+
+
+def check_stream_options(stream, save):
+    # A stream never holds the whole result, so there is nothing to save from it
+    if save and stream in STREAM_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail={"code": "UNSUPPORTED_OPTIONS", "message": "save can't be combined with stream; parse without stream to save."}
+        )
+
+
+async def receive_upload(file):
+    try:
+        content = await uploads.receive(file)
+    except uploads.UploadTooLarge:
+        raise HTTPException(status_code=413, detail=uploads.too_large_detail())
+    log.debug("File received: %s, %d bytes%s", file.filename, len(content),
+              " (spooled)" if isinstance(content, uploads.SpooledUpload) else "")
+    return content
+
+
+async def over_budget(e, accept, events, on_close=None):
+    # Too long for one response: stream it instead if the client reads streams
+    log.info("Statement over the memory budget: %s", e)
+    fmt = stream_fallback(accept)
+    if fmt is None:
+        events.close()
+        return JSONResponse(
+            status_code=413,
+            content={"detail": {
+                "code": "STATEMENT_TOO_LARGE",
+                "message": "This statement is too large to return in one response. Retry with stream=ndjson."
+            }}
+        )
+    return await stream_parse(events, fmt, on_close)
+
+
+async def run_in_parse_pool(fn, *args, pool=parse_threads):
+    # Concurrency limit: wait for a free slot, but don't queue forever
+    try:
+        await asyncio.wait_for(parse_slots.acquire(), timeout=config.PARSE_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=503,
+            detail={"code": "SERVER_BUSY", "message": "Too many statements are being processed. Please retry shortly."}
+        )
+    try:
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(pool, fn, *args)
         try:
-            text = extract_title_upload(pdf_file, password=password)
-            print(f"[DEBUG] Title extracted successfully. Length: {len(text)}")
-        except PasswordRequiredException as e:
-            print(f"[DEBUG] Password required error: {str(e)}")
-            return JSONResponse(
-                status_code=422,
-                content={
-                    "detail": {
-                        "code": "PASSWORD_REQUIRED",
-                        "message": "This file is password protected. Please provide a password."
-                    }
-                }
+            return await asyncio.wait_for(future, timeout=config.PARSE_TIMEOUT)
+        except asyncio.TimeoutError:
+            # The worker can't be interrupted; it finishes in the
+            # background and its result is discarded.
+            raise HTTPException(
+                status_code=504,
+                detail={"code": "PARSE_TIMEOUT", "message": "Processing this statement took too long."}
             )
-        except Exception as e:
-            print(f"[ERROR] Title extraction failed: {type(e).__name__}: {str(e)}")
-            raise
-
-        # Reset file pointer for second read
-        pdf_file.seek(0)
-        print("[DEBUG] File pointer reset to beginning")
-
-        # 2. Identify Bank
-        raw_text = text.upper()
-        normalized = re.sub(r"[^A-Z]", "", raw_text)
-        print(f"[DEBUG] Normalized text preview: {normalized[:100]}")
-
-        bank_type = "UNKNOWN"
-
-        #South Indian Bank detection
-        if "SOUTHINDIANBANK" in normalized:
-            bank_type = "SIB"
-            print("[DEBUG] Detected bank: South Indian Bank (SIB)")
-
-        # SBI detection
-        elif "STATEBANKOFINDIA" in normalized:
-            bank_type = "SBI"
-            print("[DEBUG] Detected bank: State Bank of India (SBI)")
-        else:
-            print(f"[DEBUG] Bank not detected. Normalized text: {normalized[:200]}")
-
-        # 3. Parse Transactions
-        print(f"[DEBUG] Starting transaction parsing for {bank_type}")
-        transactions = []
-        
+    finally:
+        parse_slots.release()
+
+
+def invalid_pdf():
+    return JSONResponse(
+        status_code=422,
+        content={"detail": {"code": "INVALID_PDF", "message": "This file couldn't be opened as a PDF."}}
+    )
+
+
+def password_required(session=None):
+    detail = {
+        "code": "PASSWORD_REQUIRED",
+        "message": "This file is password protected. Please provide a password."
+    }
+    if session is not None:
+        detail["sessionId"] = session.id
+    return JSONResponse(status_code=422, content={"detail": detail})
+
+
+async def parse_once(content, password="", raw=False, session=None):
+    if session is not None:
+        result = await run_in_parse_pool(parse_session, session, password)
+    elif config.PARSE_WORKERS <= 0:
+        result = await run_in_parse_pool(parse_pdf_bytes, content, password)
+    else:
+        return await parse_in_worker_process(content, password, raw)
+    return await asyncio.to_thread(dumps, result) if raw else result
+
+
+async def parse_in_worker_process(content, password, raw):
+    pool = get_parse_pool()
+    try:
+        result, error, metrics = await run_in_parse_pool(
+            parse_in_worker, uploads.portable(content), password, raw, pool=pool
+        )
+    except BrokenProcessPool:
+        # A worker died (killed, out of memory); the next parse gets a new pool
+        global _parse_pool
+        if _parse_pool is pool:
+            _parse_pool = None
+        raise
+    telemetry.merge(metrics)
+    if error is not None:
+        raise error
+    return result
+
+
+async def run_parse(content, password="", raw=False, session=None):
+    # raw=True returns the result as JSON bytes instead of a dict; the cache
+    # stores those bytes, so a hit is never decoded and re-encoded.
+    # With a session, its already-decrypted document is parsed instead.
+    if not result_cache.enabled:
+        return await parse_once(content, password, raw, session)
+
+    # Repeat uploads are answered from the cache without taking a parse slot.
+    # Edited category rules change the output too, so their hash is in the key.
+    version = f"{PARSER_VERSION}+{get_categorizer().version}"
+    key = await asyncio.to_thread(cache_key, content, password, version)
+    payload = await asyncio.to_thread(result_cache.get_payload, key)
+    if payload is not None:
+        log.debug("Result cache hit")
+        telemetry.RESULT_CACHE.inc(result="hit")
+        return payload if raw else await asyncio.to_thread(loads, payload)
+    telemetry.RESULT_CACHE.inc(result="miss")
+
+    payload = await parse_once(content, password, True, session)
+    await asyncio.to_thread(result_cache.put_payload, key, payload)
+    return payload if raw else await asyncio.to_thread(loads, payload)
+
+
+# --- Streaming mode (/parse with stream=ndjson|sse) ---
+
+STREAM_FORMATS = {
+    "ndjson": (NDJSON, lambda e: dumps(e) + b"\n"),
+    "sse": (SSE, lambda e: b"event: " + e["type"].encode() + b"\ndata: " + dumps(e) + b"\n\n"),
+}
+
+_DONE = object()
+
+async def stream_parse(events, fmt, on_close=None):
+    # on_close runs once the stream is over (not if this raises instead)
+    media_type, encode = STREAM_FORMATS[fmt]
+    try:
+        await asyncio.wait_for(parse_slots.acquire(), timeout=config.PARSE_QUEUE_TIMEOUT)
+    except asyncio.TimeoutError:
+        events.close()
+        raise HTTPException(
+            status_code=503,
+            detail={"code": "SERVER_BUSY", "message": "Too many statements are being processed. Please retry shortly."}
+        )
+
+    # The next() running on the pool, if any; the generator can't be closed
+    # until it has returned
+    pending = None
+
+    async def pull():
+        nonlocal pending
+        pending = parse_threads.submit(next, events, _DONE)
+        return await asyncio.wrap_future(pending)
+
+    try:
+        # Pull the first event before responding so open/password errors
+        # still come back as regular 422s instead of a half-written stream.
+        first = await pull()
+    except BaseException:
+        parse_slots.release()
+        await close_events(events, pending)
+        raise
+
+    async def body():
         try:
-            text = extract_text(pdf_file, password=password)
-            print(f"[DEBUG] Full text extracted successfully. Length: {len(text)}")
+            event = first
+            while event is not _DONE:
+                yield encode(event)
+                event = await pull()
+        except NoTransactionsException:
+            yield encode({"type": "error", "detail": {"code": "NO_TRANSACTIONS", "message": "No transactions found."}})
         except Exception as e:
-            print(f"[ERROR] Text extraction failed: {type(e).__name__}: {str(e)}")
-            raise
-            
-        if bank_type == "SBI":
-            print("[DEBUG] Using SBI parser")
-            transactions = parse_sbi(text)
-        elif bank_type == "SIB":
-            print("[DEBUG] Using SIB parser")
-            transactions = parse_sib(text)
-        else:
-            print("[DEBUG] No parser available for UNKNOWN bank type")
-            pass
-
-        print(f"[DEBUG] Transactions parsed: {len(transactions)}")
-
-        if not transactions:
-            print("[DEBUG] No transactions found, returning error")
+            log.exception("Streaming parse failed")
+            yield encode({"type": "error", "detail": {"code": "INTERNAL_ERROR", "message": f"{type(e).__name__}: {str(e)}"}})
+        finally:
+            # Nothing here may await before the slot is back: when the client
+            # disconnects, this runs inside a cancelled scope
+            parse_slots.release()
+            if on_close is not None:
+                on_close()
+            await close_events(events, pending)
+
+    return StreamingResponse(body(), media_type=media_type)
+
+
+def _close_after(events, pending):
+    if pending is not None:
+        concurrent.futures.wait([pending])
+    events.close()
+
+
+async def close_events(events, pending):
+    # Shielded, so a disconnect can't skip it: the generator's own cleanup
+    # (closing the document, finishing the span) runs once pending is done
+    with anyio.CancelScope(shield=True):
+        await asyncio.get_running_loop().run_in_executor(parse_threads, _close_after, events, pending)
+
+
+async def parse_one(upload, password):
+    # Batch variant of /parse: errors are reported per file instead of raised
+    content = b""
+    try:
+        content = await receive_upload(upload)
+        result = await run_parse(content, password)
+        return {"fileName": upload.filename, "status": "success", **result}
+    except PasswordRequiredException:
+        code, message = "PASSWORD_REQUIRED", "This file is password protected. Please provide a password."
+    except InvalidPDFException:
+        code, message = "INVALID_PDF", "This file couldn't be opened as a PDF."
+    except NoTransactionsException:
+        code, message = "NO_TRANSACTIONS", "No transactions found."
+    except MemoryBudgetExceeded:
+        code, message = "STATEMENT_TOO_LARGE", "This statement is too large to parse in a batch. Upload it on its own with stream=ndjson."
+    except HTTPException as e:
+        code, message = e.detail["code"], e.detail["message"]
+    except Exception as e:
+        log.exception("Batch file %s failed", upload.filename)
+        code, message = "INTERNAL_ERROR", f"{type(e).__name__}: {str(e)}"
+    finally:
+        uploads.release(content)
+    return {"fileName": upload.filename, "status": "error", "detail": {"code": code, "message": message}}
+
+
+async def save_statement(result, account, file_name, owner_token=None):
+    # Store a parsed result for the token's owner, or a new owner without one.
+    # The account defaults to the detected bank.
+    store = get_store()
+    try:
+        statement_id, owner_token = await asyncio.to_thread(
+            store.add_statement, account or result["bank"], result["bank"], result["transactions"], file_name,
+            owner_token
+        )
+    except UnknownOwner:
+        raise invalid_owner()
+    return {"statementId": statement_id, "ownerToken": owner_token}
+
+
+async def check_save_owner(save, owner_token):
+    # Saving into an existing history: refuse a bad token before parsing
+    if save and owner_token is not None:
+        await check_owner(owner_token)
+
+
+@app.post("/parse-batch", response_model=BatchParseResponse, response_model_exclude_unset=True, responses=NEGOTIATED)
+async def parse_batch(
+    files: List[UploadFile] = File(...),
+    passwords: List[str] = Form([]),
+    save: bool = Form(False),
+    account: str = Form(""),
+    accept: str = Header("application/json"),
+    x_owner_token: Optional[str] = Header(None)
+):
+    await check_save_owner(save, x_owner_token)
+    # passwords[i] belongs to files[i]; missing entries mean "no password"
+    passwords = list(passwords) + [""] * (len(files) - len(passwords))
+    results = await asyncio.gather(*(parse_one(f, p) for f, p in zip(files, passwords)))
+
+    parsed = [r for r in results if r["status"] == "success"]
+    owner_token = x_owner_token
+    if save:
+        # Every file goes to the same owner, a new one unless a token was sent
+        for r in parsed:
+            saved = await save_statement(r, account, r["fileName"], owner_token)
+            r["statementId"], owner_token = saved["statementId"], saved["ownerToken"]
+    # Every file's result goes in, so each row's `source` indexes `files`
+    transactions = consolidate(results)
+    response = {
+        "files": results,
+        "banks": sorted({r["bank"] for r in parsed}),
+        "transactions": transactions,
+        "analytics": compute_analytics(transactions),
+        "insights": compute_insights(transactions),
+    }
+    if save and owner_token is not None:
+        response["ownerToken"] = owner_token
+    # The batch itself goes to the encoder: rows for JSON, columns for MessagePack
+    return await asyncio.to_thread(encode_response, response, negotiate(accept))
+
+
+# --- Upload sessions (password retries without re-uploading) ---
+
+def session_not_found():
+    return HTTPException(
+        status_code=404,
+        detail={"code": "SESSION_NOT_FOUND", "message": "This upload has expired. Please upload the file again."}
+    )
+
+
+def get_session(session_id):
+    session = upload_sessions.get(session_id)
+    if session is None:
+        raise session_not_found()
+    return session
+
+
+def session_status(session):
+    return {
+        "sessionId": session.id,
+        "status": "ready" if session.ready else "password_required",
+        "expiresIn": max(round(session.expires - time.monotonic()), 0),
+        "attemptsLeft": max(config.SESSION_MAX_ATTEMPTS - session.attempts, 0),
+    }
+
+
+@contextmanager
+def session_errors(session):
+    # Busy, expired and locked-out sessions map to their HTTP errors
+    try:
+        yield
+    except SessionBusy:
+        raise HTTPException(
+            status_code=409,
+            detail={"code": "SESSION_BUSY", "message": "This upload is already being processed."}
+        )
+    except SessionClosed:
+        raise session_not_found()
+    except TooManyAttempts:
+        upload_sessions.remove(session.id)
+        raise HTTPException(
+            status_code=429,
+            detail={"code": "TOO_MANY_ATTEMPTS", "message": "Too many incorrect passwords. Please upload the file again."}
+        )
+
+
+@app.post("/sessions")
+async def create_session(file: UploadFile = File(...), password: str = Form("")):
+    # Hold a password-protected upload server-side and check whether it opens
+    # (with `password`, if given). Only files that ask for a password are held.
+    content = await receive_upload(file)
+    session = UploadSession(content, file.filename, upload_sessions.ttl)
+    held = False
+    try:
+        with session_errors(session):
+            await run_in_parse_pool(unlock_session, session, password)
+        if not session.encrypted:
             return JSONResponse(
                 status_code=422,
-                content={"detail": {"code": "NO_TRANSACTIONS", "message": "No transactions found."}}
+                content={"detail": {
+                    "code": "NOT_PASSWORD_PROTECTED",
+                    "message": "This file isn't password protected. Upload it to /parse instead.",
+                }}
             )
+        held = upload_sessions.add(session)
+        if not held:
+            raise HTTPException(
+                status_code=503,
+                detail={"code": "SERVER_BUSY", "message": "Too many uploads are being held. Please retry shortly."}
+            )
+        return session_status(session)
+    except InvalidPDFException as e:
+        log.info("Not a readable PDF: %s (%s)", file.filename, e)
+        return invalid_pdf()
+    except HTTPException:
+        raise
+    except Exception as e:
+        log.exception("Unhandled exception opening %s", file.filename)
+        raise HTTPException(
+            status_code=500,
+            detail={"message": f"{type(e).__name__}: {str(e)}", "type": type(e).__name__}
+        )
+    finally:
+        if not held:
+            session.close()
 
-        # 4. Analytics
-        total_credit = sum(t['credit'] or 0 for t in transactions)
-        total_debit = sum(t['debit'] or 0 for t in transactions)
-        
-        print(f"[DEBUG] Analytics: Credit={total_credit}, Debit={total_debit}")
-        
-        response_data = {
-            "bank": bank_type,
-            "transactions": transactions,
-            "analytics": {
-                "totalCredit": total_credit,
-                "totalDebit": total_debit,
-                "netCashFlow": total_credit - total_debit,
-                "flaggedCount": len([t for t in transactions if t['is_flagged']])
-            }
-        }
-        
-        print("[DEBUG] Request completed successfully")
-        return response_data
 
-    except PasswordRequiredException as e:
-        print(f"[ERROR] Password required: {str(e)}")
+@app.post("/sessions/{session_id}/password")
+async def try_session_password(session_id: str, password: str = Form(...)):
+    session = get_session(session_id)
+    with session_errors(session):
+        unlocked = await run_in_parse_pool(unlock_session, session, password)
+    if not unlocked:
         return JSONResponse(
             status_code=422,
-            content={
-                "detail": {
-                    "code": "PASSWORD_REQUIRED",
-                    "message": str(e)
-                }
-            }
+            content={"detail": {
+                "code": "PASSWORD_INCORRECT",
+                "message": "Incorrect password. Please try again.",
+                **session_status(session),
+            }}
         )
-    except Exception as e:
-        print(f"[ERROR] Unhandled exception: {type(e).__name__}")
-        print(f"[ERROR] Message: {str(e)}")
-        import traceback
-        print(f"[ERROR] Traceback:\n{traceback.format_exc()}")
-        
+    return session_status(session)
+
+
+@app.post("/sessions/{session_id}/parse", response_model=ParseResponse, response_model_exclude_unset=True, responses=NEGOTIATED)
+async def parse_session_statement(
+    session_id: str,
+    password: str = Form(""),
+    stream: str = Form(""),
+    save: bool = Form(False),
+    account: str = Form(""),
+    accept: str = Header("application/json"),
+    x_owner_token: Optional[str] = Header(None)
+):
+    # /parse for a held upload; a document already opened by /password is reused
+    check_stream_options(stream, save)
+    await check_save_owner(save, x_owner_token)
+    session = get_session(session_id)
+    # The password that opened it, so the result cache key matches /parse's
+    password = password or session.password or ""
+    try:
+        with session_errors(session):
+            if stream in STREAM_FORMATS:
+                return await stream_parse(iter_session_events(session, password), stream)
+            fmt = negotiate(accept)
+            if save or fmt != "json":
+                result = await run_parse(session.content, password, session=session)
+                if save:
+                    result = {**result, **await save_statement(result, account, session.file_name, x_owner_token)}
+                return await asyncio.to_thread(encode_response, result, fmt)
+            return json_response(await run_parse(session.content, password, raw=True, session=session))
+    except PasswordRequiredException:
+        return password_required(session)
+    except NoTransactionsException:
+        log.info("No transactions found in %s", session.file_name)
+        return JSONResponse(
+            status_code=422,
+            content={"detail": {"code": "NO_TRANSACTIONS", "message": "No transactions found."}}
+        )
+    except MemoryBudgetExceeded as e:
+        with session_errors(session):
+            return await over_budget(e, accept, iter_session_events(session, password))
+
+
+@app.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    if not upload_sessions.remove(session_id):
+        raise session_not_found()
+    return {"deleted": session_id}
+
+
+@app.post("/analytics", response_model=AnalyticsResponse)
+async def analytics(request: AnalyticsRequest):
+    # Recompute summaries for transactions the client already holds
+    transactions = TransactionBatch.from_dicts(t.model_dump(exclude_unset=True) for t in request.transactions)
+    return json_response(await asyncio.to_thread(lambda: {
+        "analytics": compute_analytics(transactions),
+        "insights": compute_insights(transactions),
+    }))
+
+
+@app.post("/reconcile")
+async def reconcile_credit(request: ReconcileRequest):
+    # Server-side subset-sum search: which debits add up to this credit?
+    transactions = TransactionBatch.from_dicts(t.model_dump(exclude_unset=True) for t in request.transactions)
+    budget_ms = min(request.timeBudgetMs or config.RECONCILE_TIME_BUDGET_MS, config.RECONCILE_MAX_TIME_BUDGET_MS)
+    try:
+        return await asyncio.to_thread(
+            reconcile,
+            transactions,
+            request.creditId,
+            target=request.target,
+            tolerance=max(request.tolerance, 0.0),
+            window_days=request.windowDays,
+            top_k=min(max(request.topK, 1), config.RECONCILE_MAX_TOP_K),
+            time_budget=budget_ms / 1000,
+        )
+    except ReconcileError as e:
         raise HTTPException(
-            status_code=500, 
+            status_code=422,
+            detail={"code": "RECONCILE_ERROR", "message": str(e)}
+        )
+
+
+# --- Saved statements ---
+# Every endpoint here takes the owner token returned by a save in the
+# X-Owner-Token header, and only sees that owner's statements.
+
+def invalid_owner():
+    return HTTPException(
+        status_code=401,
+        detail={"code": "INVALID_OWNER_TOKEN", "message": "This owner token isn't valid."}
+    )
+
+
+async def check_owner(owner_token):
+    if not owner_token:
+        raise HTTPException(
+            status_code=401,
             detail={
-                "message": f"{type(e).__name__}: {str(e)}",
-                "type": type(e).__name__
+                "code": "OWNER_TOKEN_REQUIRED",
+                "message": "Send the ownerToken returned when the statements were saved, in the X-Owner-Token header."
             }
         )
-    finally:
-        if pdf_file:
-            pdf_file.close()
-            print("[DEBUG] PDF file handle closed")
+    if not await asyncio.to_thread(get_store().has_owner, owner_token):
+        raise invalid_owner()
+
+
+@app.get("/statements")
+async def list_statements(account: Optional[str] = None, x_owner_token: Optional[str] = Header(None)):
+    await check_owner(x_owner_token)
+    return await asyncio.to_thread(get_store().statements, x_owner_token, account)
+
+
+@app.delete("/statements/{statement_id}")
+async def delete_statement(statement_id: int, x_owner_token: Optional[str] = Header(None)):
+    await check_owner(x_owner_token)
+    # Another owner's statement is reported as missing, not as forbidden
+    if not await asyncio.to_thread(get_store().delete_statement, x_owner_token, statement_id):
+        raise HTTPException(
+            status_code=404,
+            detail={"code": "NOT_FOUND", "message": f"Statement {statement_id} not found."}
+        )
+    return {"deleted": statement_id}
+
+
+@app.get("/transactions")
+async def list_transactions(
+    account: Optional[str] = None,
+    dateFrom: Optional[str] = None,
+    dateTo: Optional[str] = None,
+    minAmount: Optional[float] = None,
+    maxAmount: Optional[float] = None,
+    q: Optional[str] = None,
+    category: Optional[str] = None,
+    flagged: Optional[bool] = None,
+    limit: int = Query(100, ge=1),
+    offset: int = Query(0, ge=0),
+    x_owner_token: Optional[str] = Header(None)
+):
+    # Server-side paging over saved statements; dates are YYYY-MM-DD
+    await check_owner(x_owner_token)
+    return await asyncio.to_thread(
+        get_store().query, x_owner_token,
+        account=account, date_from=dateFrom, date_to=dateTo, min_amount=minAmount, max_amount=maxAmount,
+        text=q, category=category, flagged=flagged,
+        limit=min(limit, config.STORE_MAX_PAGE_SIZE), offset=offset,
+    )
+
+
+@app.get("/search")
+async def search_transactions(
+    q: str = Query(..., min_length=1),
+    prefix: bool = False,
+    account: Optional[str] = None,
+    dateFrom: Optional[str] = None,
+    dateTo: Optional[str] = None,
+    minAmount: Optional[float] = None,
+    maxAmount: Optional[float] = None,
+    category: Optional[str] = None,
+    flagged: Optional[bool] = None,
+    limit: int = Query(100, ge=1),
+    offset: int = Query(0, ge=0),
+    x_owner_token: Optional[str] = Header(None)
+):
+    # Substring (or word-prefix) search over descriptions and ref numbers
+    await check_owner(x_owner_token)
+    return await asyncio.to_thread(
+        get_store().search,
+        x_owner_token, q, prefix=prefix,
+        account=account, date_from=dateFrom, date_to=dateTo, min_amount=minAmount, max_amount=maxAmount,
+        category=category, flagged=flagged,
+        limit=min(limit, config.STORE_MAX_PAGE_SIZE), offset=offset,
+    )
+
+
+# --- Export ---
+
+EXPORT_FORMATS = ("xlsx", "csv")
+
+
+async def export_response(transactions, fmt, bank_label):
+    if fmt not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=422,
+            detail={"code": "UNSUPPORTED_FORMAT", "message": f"Format must be one of {', '.join(EXPORT_FORMATS)}."}
+        )
+    filename = f"Statement_{bank_label or 'ALL'}_{date.today().isoformat()}.{fmt}"
+    if fmt == "csv":
+        # Rows are encoded and sent as they are read; nothing is buffered whole
+        return StreamingResponse(
+            iter_csv(transactions),
+            media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+        )
+    path = await asyncio.to_thread(export_xlsx_file, transactions, bank_label)
+    return FileResponse(
+        path,
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        filename=filename,
+        background=BackgroundTask(os.remove, path),
+    )
+
+
+@app.post("/export")
+async def export_transactions(request: ExportRequest):
+    # Export transactions the client already holds
+    transactions = (t.model_dump(exclude_unset=True) for t in request.transactions)
+    return await export_response(transactions, request.format, request.bank)
+
+
+@app.get("/export")
+async def export_stored(
+    format: str = "xlsx",
+    account: Optional[str] = None,
+    dateFrom: Optional[str] = None,
+    dateTo: Optional[str] = None,
+    minAmount: Optional[float] = None,
+    maxAmount: Optional[float] = None,
+    category: Optional[str] = None,
+    flagged: Optional[bool] = None,
+    x_owner_token: Optional[str] = Header(None)
+):
+    # Export the owner's saved statements straight from the store, row by row
+    await check_owner(x_owner_token)
+    transactions = get_store().iter_transactions(
+        x_owner_token,
+        account=account, date_from=dateFrom, date_to=dateTo, min_amount=minAmount, max_amount=maxAmount,
+        category=category, flagged=flagged,
+    )
+    return await export_response(transactions, format, account)
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    return result_cache.snapshot()
+
+
+@app.delete("/cache")
+async def purge_cache():
+    # Drop every cached parse result, in memory and on disk
+    return {"deleted": await asyncio.to_thread(result_cache.clear)}
@@ -1,15 +1,20 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 class Transaction(BaseModel):
     id: int
     txn_date: str
     description: str
+    ref_no: Optional[str] = None
     debit: Optional[float]
     credit: Optional[float]
     balance: float
     confidence: float
     is_flagged: bool
+    category: Optional[str] = None
+    bank: Optional[str] = None
+    # Consolidated histories: index of the file this row came from
+    source: Optional[int] = None
 
 class Analytics(BaseModel):
     totalCredit: float
@@ -17,7 +22,61 @@ class Analytics(BaseModel):
     netCashFlow: float
     flaggedCount: int
 
+class ErrorDetail(BaseModel):
+    code: str
+    message: str
+
 class ParseResponse(BaseModel):
     bank: str
     transactions: List[Transaction]
     analytics: Analytics
+    # Monthly/weekly summaries, balance check, counterparties, percentiles, categories, quality
+    insights: Optional[Dict[str, Any]] = None
+    # Set when the statement was saved (save=true); the token reads it back
+    statementId: Optional[int] = None
+    ownerToken: Optional[str] = None
+
+class BatchFileResult(BaseModel):
+    fileName: str
+    status: str
+    bank: Optional[str] = None
+    transactions: Optional[List[Transaction]] = None
+    analytics: Optional[Analytics] = None
+    insights: Optional[Dict[str, Any]] = None
+    statementId: Optional[int] = None
+    # Set when status is "error"
+    detail: Optional[ErrorDetail] = None
+
+class BatchParseResponse(BaseModel):
+    files: List[BatchFileResult]
+    banks: List[str]
+    transactions: List[Transaction]
+    analytics: Analytics
+    insights: Dict[str, Any]
+    # Set when the files were saved (save=true)
+    ownerToken: Optional[str] = None
+
+class AnalyticsResponse(BaseModel):
+    analytics: Analytics
+    insights: Dict[str, Any]
+
+class AnalyticsRequest(BaseModel):
+    transactions: List[Transaction]
+
+class ReconcileRequest(BaseModel):
+    transactions: List[Transaction]
+    creditId: int
+    # Amount to match in rupees; defaults to the credit's own amount
+    target: Optional[float] = None
+    # Accept sums within this many rupees of the target
+    tolerance: float = 0.0
+    # Only consider debits up to this many days after the credit
+    windowDays: Optional[int] = None
+    topK: int = 5
+    timeBudgetMs: Optional[int] = None
+
+class ExportRequest(BaseModel):
+    transactions: List[Transaction]
+    # "xlsx" (Raw, Monthly and Quality sheets) or "csv" (raw rows only)
+    format: str = "xlsx"
+    bank: Optional[str] = None
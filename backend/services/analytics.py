@@ -1,34 +1,23 @@
-import re
+from services import banks
+from services.transactions import TransactionBatch, NULL_PAISE
 
 def detect_bank(text: str) -> str:
-    if not text:
-        return "UNKNOWN"
-
-    t = text.upper()
-
-    sbi_patterns = [
-        r"STATE\s+BANK\s+OF\s+INDIA",
-        r"\bSBI\b",
-        r"STATE\s+BANK"
-    ]
-
-    sib_patterns = [
-        r"SOUTH\s+INDIAN\s+BANK",
-        r"\bSIB\b"
-    ]
-
-    for p in sbi_patterns:
-        if re.search(p, t):
-            return "SBI"
-
-    for p in sib_patterns:
-        if re.search(p, t):
-            return "SIB"
-
-    return "UNKNOWN"
+    # Kept for callers that only have text; detection lives in the registry
+    return banks.detect_code(text)
 
 
 def compute_analytics(transactions):
+    if isinstance(transactions, TransactionBatch):
+        # Columnar fast path: exact integer paise sums
+        total_credit = sum(p for p in transactions.credit if p != NULL_PAISE) / 100
+        total_debit = sum(p for p in transactions.debit if p != NULL_PAISE) / 100
+        return {
+            "totalCredit": total_credit,
+            "totalDebit": total_debit,
+            "netCashFlow": total_credit - total_debit,
+            "flaggedCount": sum(transactions.is_flagged)
+        }
+
     total_credit = sum(t["credit"] or 0 for t in transactions)
     total_debit = sum(t["debit"] or 0 for t in transactions)
 
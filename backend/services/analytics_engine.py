@@ -0,0 +1,178 @@
+import re
+from datetime import date
+import numpy as np
+from services.transactions import TransactionBatch, NULL_PAISE, ABSENT
+from services.validation import BALANCE_TOLERANCE_PAISE, chain_keys
+
+# Ordinal of 1970-01-01, to turn date ordinals into numpy datetime64[D]
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+PERCENTILES = [10, 25, 50, 75, 90, 99]
+TOP_COUNTERPARTIES = 10
+
+_NOISE_TOKEN = re.compile(r"\S*\d\S*")
+_SEPARATORS = re.compile(r"[/\-|:@*]+")
+_TXN_PREFIXES = {"UPI", "DR", "CR", "TO", "BY", "NEFT", "RTGS", "IMPS", "TRANSFER", "ATM", "WDL", "NACH", "ECS", "POS"}
+
+
+def counterparty(description):
+    # Strip refs/phone numbers and rail prefixes: "UPI/DR/4123/SWIGGY/PAYTM" -> "SWIGGY PAYTM"
+    words = _SEPARATORS.sub(" ", _NOISE_TOKEN.sub(" ", description or "").upper()).split()
+    words = [w for w in words if w not in _TXN_PREFIXES]
+    return " ".join(words[:3]) or "UNKNOWN"
+
+
+def _columns(batch):
+    debit = np.frombuffer(batch.debit, dtype=np.int64)
+    credit = np.frombuffer(batch.credit, dtype=np.int64)
+    balance = np.frombuffer(batch.balance, dtype=np.int64)
+    return (
+        np.where(debit == NULL_PAISE, 0, debit),
+        np.where(credit == NULL_PAISE, 0, credit),
+        balance,
+        np.asarray(batch.dates, dtype=np.int64),
+    )
+
+
+def _group_totals(keys, debit, credit):
+    labels, inverse = np.unique(keys, return_inverse=True)
+    n = len(labels)
+    return (
+        labels,
+        np.bincount(inverse, weights=credit, minlength=n),
+        np.bincount(inverse, weights=debit, minlength=n),
+        np.bincount(inverse, minlength=n),
+    )
+
+
+def _period_summaries(days, debit, credit):
+    valid = days > 0
+    days, debit, credit = days[valid], debit[valid], credit[valid]
+    epoch_days = (days - EPOCH_ORDINAL).astype("datetime64[D]")
+
+    months, m_credit, m_debit, m_count = _group_totals(epoch_days.astype("datetime64[M]"), debit, credit)
+    monthly = [
+        {
+            "month": str(m),
+            "totalCredit": c / 100,
+            "totalDebit": d / 100,
+            "net": (c - d) / 100,
+            "count": int(k),
+        }
+        for m, c, d, k in zip(months, m_credit, m_debit, m_count)
+    ]
+
+    # ISO weeks start on Monday; 1970-01-01 was a Thursday
+    week_index = (days - EPOCH_ORDINAL + 3) // 7
+    weeks, w_credit, w_debit, w_count = _group_totals(week_index, debit, credit)
+    week_starts = (weeks * 7 - 3).astype("datetime64[D]")
+    weekly = [
+        {
+            "weekStart": str(s),
+            "totalCredit": c / 100,
+            "totalDebit": d / 100,
+            "net": (c - d) / 100,
+            "count": int(k),
+        }
+        for s, c, d, k in zip(week_starts, w_credit, w_debit, w_count)
+    ]
+    return monthly, weekly
+
+
+def _balance_check(batch, debit, credit, balance):
+    # Check prev_balance + credit - debit == balance within each statement's
+    # rows, in statement order (a stable sort keeps per-chain order intact).
+    keys = chain_keys(batch)
+    order = np.argsort(keys, kind="stable")
+    same_chain = keys[order][1:] == keys[order][:-1]
+    expected = balance[order][:-1] + credit[order][1:] - debit[order][1:]
+    bad = same_chain & (np.abs(expected - balance[order][1:]) > BALANCE_TOLERANCE_PAISE)
+    bad_rows = order[1:][bad]
+    ids = np.asarray(batch.ids, dtype=np.int64)
+    return {
+        "checked": int(same_chain.sum()),
+        "mismatches": int(bad.sum()),
+        "mismatchIds": ids[np.sort(bad_rows)].tolist(),
+    }
+
+
+def _top_counterparties(batch, debit, credit):
+    # Map each unique description once, then aggregate rows with bincount
+    pool = batch.pool.values
+    descriptions = np.asarray(batch.descriptions, dtype=np.int64)
+    unique_desc, desc_inverse = np.unique(descriptions, return_inverse=True)
+    names = [counterparty(pool[i]) for i in unique_desc]
+    name_labels, name_index = np.unique(np.array(names, dtype=object), return_inverse=True)
+    row_name = name_index[desc_inverse]
+
+    n = len(name_labels)
+    spent = np.bincount(row_name, weights=debit, minlength=n)
+    received = np.bincount(row_name, weights=credit, minlength=n)
+    counts = np.bincount(row_name, minlength=n)
+
+    def top(totals):
+        idx = np.argsort(-totals, kind="stable")[:TOP_COUNTERPARTIES]
+        return [
+            {"name": name_labels[i], "total": totals[i] / 100, "count": int(counts[i])}
+            for i in idx if totals[i] > 0
+        ]
+
+    return {"debit": top(spent), "credit": top(received)}
+
+
+def _category_totals(batch, debit, credit):
+    # Expense summary per category; rows without one are grouped as None
+    pool = batch.pool.values
+    categories = np.asarray(batch.categories, dtype=np.int64)
+    labels, c_credit, c_debit, counts = _group_totals(categories, debit, credit)
+    order = np.argsort(-c_debit, kind="stable")
+    return [
+        {
+            "category": None if labels[i] == ABSENT else pool[labels[i]],
+            "totalDebit": c_debit[i] / 100,
+            "totalCredit": c_credit[i] / 100,
+            "count": int(counts[i]),
+        }
+        for i in order
+    ]
+
+
+def _percentiles(amounts):
+    amounts = amounts[amounts > 0]
+    if len(amounts) == 0:
+        return {}
+    values = np.percentile(amounts, PERCENTILES) / 100
+    return {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, values)}
+
+
+def compute_insights(transactions):
+    """
+    Batched analytics over a TransactionBatch (or a list of transaction dicts):
+    monthly/weekly credit-debit-net, running balance checks, top counterparties
+    and amount percentiles, all computed with array operations.
+    """
+    batch = transactions if isinstance(transactions, TransactionBatch) else TransactionBatch.from_dicts(transactions)
+    if len(batch) == 0:
+        return {"monthly": [], "weekly": [], "balanceCheck": {"checked": 0, "mismatches": 0, "mismatchIds": []},
+                "topCounterparties": {"debit": [], "credit": []}, "percentiles": {"debit": {}, "credit": {}}, "categories": [],
+                "quality": {"totalRows": 0, "flaggedRows": 0, "avgConfidence": 0, "balanceMismatches": 0}}
+
+    debit, credit, balance, days = _columns(batch)
+    monthly, weekly = _period_summaries(days, debit, credit)
+    balance_check = _balance_check(batch, debit, credit, balance)
+    confidence = np.frombuffer(batch.confidence, dtype=np.float64)
+    flagged = np.frombuffer(batch.is_flagged, dtype=np.int8)
+
+    return {
+        "monthly": monthly,
+        "weekly": weekly,
+        "balanceCheck": balance_check,
+        "topCounterparties": _top_counterparties(batch, debit, credit),
+        "percentiles": {"debit": _percentiles(debit), "credit": _percentiles(credit)},
+        "categories": _category_totals(batch, debit, credit),
+        "quality": {
+            "totalRows": len(batch),
+            "flaggedRows": int(flagged.sum()),
+            "avgConfidence": round(float(confidence.mean()), 2),
+            "balanceMismatches": balance_check["mismatches"],
+        },
+    }
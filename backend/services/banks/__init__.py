@@ -0,0 +1,116 @@
+"""
+Bank parser registry.
+
+Each module in this package declares one bank with `register(Bank(...))`:
+the signatures that identify its statements, the extraction strategy its
+parser expects, and the parsers themselves. Modules are imported on first
+use, so supporting a new bank (HDFC, ICICI, Axis...) is one new module here
+and no edits to the pipeline, the loader or detection.
+"""
+import importlib
+import pkgutil
+import re
+import threading
+from services.pdf_loader import LAYOUT, TABLES
+
+UNKNOWN = "UNKNOWN"
+
+
+class Bank:
+    """
+    code             short id reported to clients ("SBI", "SIB")
+    signatures       regexes that identify the bank on its own (full name,
+                     letterhead); matched against the upper-cased first page
+    weak_signatures  regexes only trusted when no bank's strong signature
+                     matches (abbreviations, IFSC prefixes)
+    strategy         LAYOUT or TABLES, see StatementDocument.extract_page
+    parse_batch      page texts -> TransactionBatch
+    stream_parser    class with iter_feed(page_text) / iter_finish()
+    """
+
+    def __init__(self, code, name, signatures, strategy, parse_batch, stream_parser, weak_signatures=()):
+        if strategy not in (LAYOUT, TABLES):
+            raise ValueError(f"Unknown extraction strategy: {strategy}")
+        self.code = code
+        self.name = name
+        self.signatures = list(signatures)
+        self.weak_signatures = list(weak_signatures)
+        self.strategy = strategy
+        self.parse_batch = parse_batch
+        self.stream_parser = stream_parser
+
+    def __repr__(self):
+        return f"Bank({self.code!r})"
+
+
+_banks = {}
+_lock = threading.Lock()
+_state = {"loaded": False, "pattern": None, "groups": []}
+
+
+def register(bank):
+    with _lock:
+        _banks[bank.code] = bank
+        _state["pattern"] = None
+    return bank
+
+
+def _load():
+    # Import every bank module once; each registers itself on import
+    if _state["loaded"]:
+        return
+    for module in sorted(m.name for m in pkgutil.iter_modules(__path__)):
+        importlib.import_module(f"{__name__}.{module}")
+    _state["loaded"] = True
+
+
+def _compile():
+    # All signatures of all banks in one alternation of named groups; the
+    # group that matched maps back to (bank, strong)
+    groups = []
+    parts = []
+    for bank in _banks.values():
+        for strong, signatures in ((True, bank.signatures), (False, bank.weak_signatures)):
+            for signature in signatures:
+                parts.append(f"(?P<g{len(groups)}>{signature})")
+                groups.append((bank, strong))
+    _state["groups"] = groups
+    _state["pattern"] = re.compile("|".join(parts)) if parts else None
+
+
+def banks():
+    _load()
+    return dict(_banks)
+
+
+def get(code):
+    _load()
+    return _banks.get(code)
+
+
+def detect(text):
+    """
+    The Bank whose signatures appear in `text` (normally just the first
+    page), or None. One scan of one compiled pattern: the leftmost strong
+    signature wins, which is the letterhead on every statement we have seen;
+    a weak signature only counts if no strong one occurs anywhere.
+    """
+    _load()
+    with _lock:
+        if _state["pattern"] is None:
+            _compile()
+        pattern, groups = _state["pattern"], _state["groups"]
+    if not text or pattern is None:
+        return None
+    fallback = None
+    for match in pattern.finditer(text.upper()):
+        bank, strong = groups[int(match.lastgroup[1:])]
+        if strong:
+            return bank
+        fallback = fallback or bank
+    return fallback
+
+
+def detect_code(text):
+    bank = detect(text)
+    return bank.code if bank else UNKNOWN
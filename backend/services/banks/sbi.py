@@ -0,0 +1,13 @@
+from services.banks import Bank, register, TABLES
+from services.sbi_parser import parse_sbi_batch, SbiStreamParser
+
+# SBI statements carry their columns as ruled grid tables
+register(Bank(
+    code="SBI",
+    name="State Bank of India",
+    signatures=[r"STATE\s*BANK\s*OF\s*INDIA"],
+    weak_signatures=[r"\bSBIN0", r"\bSBI\b"],
+    strategy=TABLES,
+    parse_batch=parse_sbi_batch,
+    stream_parser=SbiStreamParser,
+))
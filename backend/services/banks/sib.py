@@ -0,0 +1,14 @@
+from services.banks import Bank, register, LAYOUT
+from services.sib_parser import parse_sib_batch, SibStreamParser
+
+# SIB statements have no ruled grid; table extraction mangles their rows,
+# so the parser works on the visual layout text
+register(Bank(
+    code="SIB",
+    name="South Indian Bank",
+    signatures=[r"SOUTH\s*INDIAN\s*BANK"],
+    weak_signatures=[r"\bSIBL0", r"\bSIBL?\b"],
+    strategy=LAYOUT,
+    parse_batch=parse_sib_batch,
+    stream_parser=SibStreamParser,
+))
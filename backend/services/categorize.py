@@ -0,0 +1,116 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import config
+
+WORD_CHARS = "A-Z0-9"
+
+
+class Categorizer:
+    """
+    Compiles a rule set into one regex over all keywords.
+
+    The keywords are folded into a prefix trie before compiling, so the regex
+    engine walks shared prefixes once instead of trying every keyword at
+    every position. A description is scanned once; every keyword hit maps back to its rule
+    and the highest-priority (earliest) rule wins. Results are memoized per
+    description, since statements repeat the same merchants and rails.
+    """
+
+    def __init__(self, rules, default="Other", cache_size=config.CATEGORY_CACHE_SIZE):
+        self.default = default
+        self.categories = [rule["category"] for rule in rules]
+        self.priority = {}
+        for i, rule in enumerate(rules):
+            for keyword in rule["keywords"]:
+                self.priority.setdefault(_normalize(keyword), i)
+        trie = _trie_pattern(self.priority)
+        self.pattern = re.compile(f"(?<![{WORD_CHARS}])(?:{trie})(?![{WORD_CHARS}])") if self.priority else None
+        self.cache = {}
+        self.cache_size = cache_size
+
+    def categorize(self, description):
+        category = self.cache.get(description)
+        if category is None:
+            if len(self.cache) >= self.cache_size:
+                self.cache.clear()
+            category = self.cache[description] = self._match(description)
+        return category
+
+    def _match(self, description):
+        if not description or self.pattern is None:
+            return self.default
+        best = len(self.categories)
+        for match in self.pattern.finditer(description.upper()):
+            best = min(best, self.priority[_normalize(match.group())])
+            if best == 0:
+                break
+        return self.categories[best] if best < len(self.categories) else self.default
+
+    def categorize_batch(self, batch):
+        # One lookup per distinct interned description, then a column fill
+        pool = batch.pool
+        by_desc = {}
+        categories = batch.categories
+        for row, desc in enumerate(batch.descriptions):
+            i = by_desc.get(desc)
+            if i is None:
+                i = by_desc[desc] = pool.add(self.categorize(pool.values[desc]))
+            categories[row] = i
+        return batch
+
+
+def _normalize(keyword):
+    return " ".join(keyword.upper().split())
+
+
+def _trie_pattern(keywords):
+    # ["ATM", "ATM WDL", "AMAZON"] -> A(?:MAZON|TM(?:\s+WDL)?). Optional tails
+    # are greedy, so the longest keyword at a position is tried first.
+    trie = {}
+    for keyword in keywords:
+        node = trie
+        for ch in keyword:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node):
+        branches = [
+            (r"\s+" if ch == " " else re.escape(ch)) + emit(child)
+            for ch, child in sorted(node.items()) if ch
+        ]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(trie)
+
+
+def load_rules(path):
+    with open(path, "rb") as f:
+        raw = f.read()
+    spec = json.loads(raw)
+    categorizer = Categorizer(spec["rules"], spec.get("default", "Other"))
+    categorizer.version = hashlib.sha256(raw).hexdigest()[:12]
+    return categorizer
+
+
+_lock = threading.Lock()
+_current = {"mtime": None, "categorizer": None}
+
+
+def get_categorizer():
+    """The categorizer for config.CATEGORY_RULES, recompiled when the file changes."""
+    mtime = os.stat(config.CATEGORY_RULES).st_mtime_ns
+    with _lock:
+        if _current["mtime"] != mtime:
+            _current["categorizer"] = load_rules(config.CATEGORY_RULES)
+            _current["mtime"] = mtime
+        return _current["categorizer"]
+
+
+def categorize_batch(batch):
+    return get_categorizer().categorize_batch(batch)
@@ -0,0 +1,36 @@
+from services.transactions import TransactionBatch
+from services.validation import validate_batch
+
+
+def consolidate(results):
+    """
+    Merge per-file /parse results into one TransactionBatch.
+
+    Every row gets a `bank` column and a `source` column, the index of its
+    file in `results` (entries without transactions, i.e. failed files, are
+    skipped but keep their index). Each statement is re-validated as its own
+    chain in its own row order, so two accounts at the same bank are never
+    chained into each other. Rows repeated across statements with
+    overlapping periods are then dropped, and the rest are sorted by date
+    (stable, so same-day rows keep their statement order) and renumbered.
+    """
+    merged = TransactionBatch()
+    for source, result in enumerate(results):
+        if not result.get("transactions"):
+            continue
+        batch = TransactionBatch.from_dicts(result["transactions"], merged.pool)
+        merged.extend(batch.with_bank(result["bank"]).with_source(source))
+    validate_batch(merged)
+
+    seen = set()
+    keep = []
+    columns = zip(merged.banks, merged.dates, merged.descriptions, merged.debit, merged.credit, merged.balance)
+    for i, key in enumerate(columns):
+        if key in seen:
+            continue
+        seen.add(key)
+        keep.append(i)
+
+    dates = merged.dates
+    keep.sort(key=dates.__getitem__)
+    return merged.take(keep).renumber()
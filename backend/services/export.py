@@ -0,0 +1,181 @@
+import csv
+import io
+import os
+import tempfile
+from datetime import date
+from services.transactions import parse_txn_date, to_paise
+from services.validation import BALANCE_TOLERANCE_PAISE
+
+# Same layout as the browser export (ExportPanel.tsx), plus ref no, category and bank
+RAW_HEADERS = ["Date", "Description", "Ref No", "Debit", "Credit", "Balance", "Confidence", "Flagged", "Category", "Bank"]
+RAW_WIDTHS = [12, 40, 14, 12, 12, 15, 12, 10, 14, 10]
+MONEY_COLUMNS = (3, 4, 5)
+LOW_CONFIDENCE = 0.8
+# Rows buffered per CSV chunk handed to the response
+CSV_CHUNK_ROWS = 500
+
+
+def _raw_row(txn):
+    return [
+        txn["txn_date"],
+        txn["description"],
+        txn.get("ref_no") or "",
+        txn["debit"] if txn["debit"] else "",
+        txn["credit"] if txn["credit"] else "",
+        txn["balance"],
+        f"{txn['confidence'] * 100:.1f}%",
+        "Yes" if txn["is_flagged"] else "No",
+        txn.get("category") or "",
+        txn.get("bank") or "",
+    ]
+
+
+def iter_csv(transactions):
+    """Raw transactions as CSV, yielded in chunks of CSV_CHUNK_ROWS rows."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(RAW_HEADERS)
+    for i, txn in enumerate(transactions, 1):
+        writer.writerow(_raw_row(txn))
+        if i % CSV_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+class _Summary:
+    """Monthly and quality figures accumulated while the raw sheet is written."""
+
+    def __init__(self):
+        self.months = {}          # "YYYY-MM" -> {bank: [credit, debit, count]} in paise
+        self.banks = []
+        self.rows = 0
+        self.flagged = 0
+        self.low_confidence = 0
+        self.confidence_sum = 0.0
+        self.credit = 0
+        self.debit = 0
+        self.mismatches = 0
+        self.last_balance = {}    # statement -> previous row's balance, for the running-balance check
+
+    def add(self, txn):
+        bank = txn.get("bank") or ""
+        if bank not in self.banks:
+            self.banks.append(bank)
+        credit = to_paise(txn["credit"] or 0)
+        debit = to_paise(txn["debit"] or 0)
+        balance = to_paise(txn["balance"])
+        # Balances chain within one statement: saved rows carry statementId,
+        # consolidated ones source; other rows fall back to their bank
+        if txn.get("statementId") is not None:
+            chain = ("statement", txn["statementId"])
+        elif txn.get("source") is not None:
+            chain = ("source", txn["source"])
+        else:
+            chain = ("bank", bank)
+        previous = self.last_balance.get(chain)
+        if previous is not None and abs(previous + credit - debit - balance) > BALANCE_TOLERANCE_PAISE:
+            self.mismatches += 1
+        self.last_balance[chain] = balance
+
+        day = parse_txn_date(txn["txn_date"])
+        month = date.fromordinal(day).strftime("%Y-%m") if day else "Unknown"
+        totals = self.months.setdefault(month, {}).setdefault(bank, [0, 0, 0])
+        totals[0] += credit
+        totals[1] += debit
+        totals[2] += 1
+
+        self.rows += 1
+        self.flagged += 1 if txn["is_flagged"] else 0
+        self.low_confidence += 1 if txn["confidence"] < LOW_CONFIDENCE else 0
+        self.confidence_sum += txn["confidence"]
+        self.credit += credit
+        self.debit += debit
+
+
+def write_xlsx(transactions, path, bank_label=None):
+    """
+    Write the Raw_Transactions, Monthly_Summary and Quality_Report sheets to
+    `path` in a single pass over `transactions`.
+
+    XlsxWriter's constant_memory mode flushes each row to disk as it is
+    written, so memory stays flat however many rows are exported; only the
+    monthly/quality aggregates are kept.
+    """
+    import xlsxwriter  # only needed for XLSX exports
+    workbook = xlsxwriter.Workbook(path, {"constant_memory": True})
+    header = workbook.add_format({"bold": True})
+    money = workbook.add_format({"num_format": "#,##0.00"})
+    highlight = workbook.add_format({"num_format": "#,##0.00", "bg_color": "#FFFF00"})
+
+    raw = workbook.add_worksheet("Raw_Transactions")
+    for col, width in enumerate(RAW_WIDTHS):
+        # Unformatted cells pick up their column's format
+        raw.set_column(col, col, width, money if col in MONEY_COLUMNS else None)
+    raw.write_row(0, 0, RAW_HEADERS, header)
+
+    summary = _Summary()
+    for row, txn in enumerate(transactions, 1):
+        summary.add(txn)
+        # One write_row per transaction; low-confidence rows are highlighted
+        raw.write_row(row, 0, _raw_row(txn), highlight if txn["confidence"] < LOW_CONFIDENCE else None)
+
+    # Monthly summary, with credit/debit columns per bank when there are several
+    monthly = workbook.add_worksheet("Monthly_Summary")
+    banks = [b for b in summary.banks if b]
+    per_bank = len(summary.banks) > 1 and banks
+    headers = ["Month", "Total Credit", "Total Debit", "Net Flow", "Transaction Count"]
+    if per_bank:
+        for bank in banks:
+            headers += [f"{bank} Credit", f"{bank} Debit"]
+    monthly.set_column(0, 0, 10)
+    monthly.set_column(1, len(headers) - 1, 16)
+    monthly.write_row(0, 0, headers, header)
+    for row, month in enumerate(sorted(summary.months), 1):
+        by_bank = summary.months[month]
+        credit = sum(t[0] for t in by_bank.values())
+        debit = sum(t[1] for t in by_bank.values())
+        count = sum(t[2] for t in by_bank.values())
+        values = [credit / 100, debit / 100, (credit - debit) / 100]
+        monthly.write(row, 0, month)
+        monthly.write_row(row, 1, values, money)
+        monthly.write(row, 4, count)
+        if per_bank:
+            for i, bank in enumerate(banks):
+                totals = by_bank.get(bank, [0, 0, 0])
+                monthly.write_row(row, 5 + 2 * i, [totals[0] / 100, totals[1] / 100], money)
+
+    quality = workbook.add_worksheet("Quality_Report")
+    quality.set_column(0, 0, 30)
+    quality.set_column(1, 1, 20)
+    average = summary.confidence_sum / summary.rows if summary.rows else 0
+    rows = [
+        ("Total Rows Processed", summary.rows),
+        ("Balance Mismatches", summary.mismatches),
+        ("Average Confidence", f"{average * 100:.1f}%"),
+        ("Low Confidence Rows (<80%)", summary.low_confidence),
+        ("Flagged Transactions", summary.flagged),
+        ("Bank Source", bank_label or ", ".join(banks)),
+        ("Export Date", date.today().strftime("%d/%m/%Y")),
+        ("Total Credit", summary.credit / 100),
+        ("Total Debit", summary.debit / 100),
+    ]
+    quality.write_row(0, 0, ["Metric", "Value"], header)
+    for row, (metric, value) in enumerate(rows, 1):
+        quality.write(row, 0, metric)
+        quality.write(row, 1, value)
+
+    workbook.close()
+    return path
+
+
+def export_xlsx_file(transactions, bank_label=None):
+    # Written to a temp file (the caller deletes it once it has been sent)
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        return write_xlsx(transactions, path, bank_label)
+    except BaseException:
+        os.remove(path)
+        raise
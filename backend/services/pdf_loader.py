@@ -1,121 +1,348 @@
-import pdfplumber
-import pytesseract
-from PIL import Image
 import io
-from pdfminer.pdfdocument import PDFPasswordIncorrect, PDFTextExtractionNotAllowed
-from pdfminer.psparser import PSSyntaxError
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import config
+
+# pdfplumber/pdfminer are imported on first use and pytesseract only on the
+# OCR path, so importing this module (and main) stays cheap; warm_up()
+# loads them ahead of the first request.
 
 class PasswordRequiredException(Exception):
     pass
 
-from pdfplumber.utils.exceptions import PdfminerException
 
-def extract_title_upload(pdf_file, password=None):
-    title = ""
-    try:
-        with pdfplumber.open(pdf_file, password=password or "") as pdf:
-            all_pages = pdf.pages
-            if len(all_pages) <= 4:
-                pages_to_read = all_pages
-            else:
-                pages_to_read = all_pages[:2] + all_pages[-2:]
-            for page in pages_to_read:
-                text = page.extract_text()
-                if text:
-                    title += text + "\n"
-    except PdfminerException as e:
-        # pdfplumber wraps PDFPasswordIncorrect in PdfminerException
-        # Check if the cause is a password error
-        if hasattr(e, '__cause__'):
-            cause_name = type(e.__cause__).__name__
-            if 'Password' in cause_name or cause_name == 'PDFPasswordIncorrect':
-                raise PasswordRequiredException("File is password protected")
+class InvalidPDFException(Exception):
+    # The upload doesn't open as a PDF at all (not a PDF, truncated, corrupt)
+    pass
+
+# Extraction strategies; each bank declares the one its parser expects
+# (see services.banks)
+LAYOUT = "layout"   # visual layout text (layout=True)
+TABLES = "tables"   # grid tables joined with " | ", layout text on table-less pages
+
+def _raise_open_error(e):
+    # pdfplumber wraps pdfminer's errors (PDFPasswordIncorrect among them) in
+    # PdfminerException, and pypdf/pdfminer report other encryption problems
+    # as generic errors. Anything else means the file isn't a readable PDF.
+    from pdfminer.pdfdocument import PDFPasswordIncorrect, PDFTextExtractionNotAllowed
+    from pdfminer.psparser import PSSyntaxError
+    from pdfplumber.utils.exceptions import PdfminerException
+    cause = e.args[0] if isinstance(e, PdfminerException) and e.args and isinstance(e.args[0], Exception) else e
+    if isinstance(cause, (PDFPasswordIncorrect, PDFTextExtractionNotAllowed, PSSyntaxError)):
         raise PasswordRequiredException("File is password protected")
-    except (PDFPasswordIncorrect, PDFTextExtractionNotAllowed, PSSyntaxError):
+    error_str = str(cause).lower()
+    if "password" in error_str or "encrypt" in error_str:
         raise PasswordRequiredException("File is password protected")
-    except Exception as e:
-        error_str = str(e).lower()
-        if "password" in error_str or "encrypt" in error_str:
-            raise PasswordRequiredException("File is password protected")
-        raise e
-    return title
-
-def extract_text(pdf_file, password=None):
-    text = ""
-    
+    raise InvalidPDFException(f"{type(cause).__name__}: {cause}") from e
+
+
+class StatementDocument:
+    """
+    One open (and decrypted) PDF shared by every stage of a /parse request.
+
+    Page text, layout text and tables are computed lazily and cached per page,
+    so bank detection, title extraction and full extraction never lay out the
+    same page twice.
+    """
+
+    def __init__(self, pdf_file, password=None):
+        self.pdf_file = pdf_file
+        self.password = password or ""
+        import pdfplumber
+        try:
+            self.pdf = pdfplumber.open(pdf_file, password=self.password)
+            self.pages = self.pdf.pages
+        except Exception as e:
+            _raise_open_error(e)
+        self._text = {}
+        self._layout = {}
+        self._tables = {}
+        # Optional telemetry.Span; per-page extract/OCR times are recorded on it
+        self.span = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def encrypted(self):
+        return self.pdf.doc.encryption is not None
+
+    def close(self):
+        self.pdf.close()
+
+    def __len__(self):
+        return len(self.pages)
+
+    # --- Per-page cached primitives ---
+
+    def page_text(self, i):
+        if i not in self._text:
+            self._text[i] = self.pages[i].extract_text() or ""
+        return self._text[i]
+
+    def page_layout(self, i):
+        if i not in self._layout:
+            self._layout[i] = self.pages[i].extract_text(layout=True) or ""
+        return self._layout[i]
+
+    def page_tables(self, i):
+        if i not in self._tables:
+            self._tables[i] = self.pages[i].extract_tables()
+        return self._tables[i]
+
+    # --- Document-level views ---
+
+    def title_text(self):
+        n = len(self.pages)
+        if n <= 4:
+            indexes = range(n)
+        else:
+            indexes = [0, 1, n - 2, n - 1]
+        return "".join(text + "\n" for text in map(self.page_text, indexes) if text)
+
+    def _record(self, stage, seconds):
+        if self.span is not None:
+            self.span.record(stage, seconds)
+
+    def extract_page(self, i, strategy=TABLES):
+        start = time.perf_counter()
+        try:
+            text = self._extract_page(i, strategy)
+        finally:
+            self.release_page(i)
+        self._record("extract_page", time.perf_counter() - start)
+        return text
+
+    def release_page(self, i):
+        # pdfplumber keeps every page's chars, layout and textmap (several MB
+        # per page) until the document is closed; drop them once the page is
+        # extracted so memory doesn't grow with the page count
+        self.pages[i].close()
+
+    def _extract_page(self, i, strategy):
+        # --- STRATEGY A: Visual Layout (e.g. SIB) ---
+        # Banks without ruled grids strictly use visual layout.
+        # This prevents Table Extraction from mangling the data.
+        if strategy == LAYOUT:
+            page_text = self.page_layout(i)
+            return page_text + "\n" if page_text else ""
+
+        # --- STRATEGY B: Grid Tables (e.g. SBI, and the generic default) ---
+        # For SBI, we prefer extracting grid tables to handle column alignment.
+        tables = self.page_tables(i)
+
+        # Check if we found a valid table (at least 3 columns)
+        is_valid_table = False
+        if tables and len(tables) > 0:
+            if len(tables[0]) > 0 and len(tables[0][0]) >= 3:
+                is_valid_table = True
+
+        if is_valid_table:
+            lines = []
+            for table in tables:
+                for row in table:
+                    # Clean each cell
+                    clean_row = [
+                        str(cell).replace("\n", " ").strip() if cell is not None else ""
+                        for cell in row
+                    ]
+                    # USE PIPES '|' FOR SBI (Reliable Column Splitting)
+                    lines.append(" | ".join(clean_row) + "\n")
+            return "".join(lines)
+
+        # Fallback for pages without tables (even in SBI)
+        page_text = self.page_layout(i)
+        return page_text + "\n" if page_text else ""
+
+    def source(self):
+        # What a worker process reopens the document from: the path of a file
+        # on disk (a spooled upload, never copied into memory), else the bytes
+        if isinstance(getattr(self.pdf_file, "name", None), str):
+            return self.pdf_file.name
+        if hasattr(self.pdf_file, "getvalue"):
+            return self.pdf_file.getvalue()
+        self.pdf_file.seek(0)
+        return self.pdf_file.read()
+
+    def extract_pages(self, strategy=TABLES, parallel=None):
+        n = len(self.pages)
+        workers = config.EXTRACT_WORKERS
+        if parallel is None:
+            parallel = workers > 1 and n >= config.PARALLEL_MIN_PAGES
+        if not parallel or n < 2:
+            return [self.extract_page(i, strategy) for i in range(n)]
+
+        # --- Page-sharded mode ---
+        # Each worker re-opens the document and extracts a contiguous page range.
+        # Results are stitched back in page order, so the output is identical
+        # to the sequential path.
+        source = self.source()
+        shard_size = -(-n // (max(workers, 1) * 2))
+        ranges = [(start, min(start + shard_size, n)) for start in range(0, n, shard_size)]
+        futures = [
+            get_extraction_pool().submit(_extract_page_range, source, self.password, start, stop, strategy)
+            for start, stop in ranges
+        ]
+        pages = []
+        for future in futures:
+            texts, timings = future.result()
+            pages.extend(texts)
+            for seconds in timings:
+                self._record("extract_page", seconds)
+        return pages
+
+    def extract_page_texts(self, strategy=TABLES, parallel=None):
+        try:
+            pages = self.extract_pages(strategy, parallel=parallel)
+        except PasswordRequiredException:
+            raise
+        except Exception as e:
+            _raise_open_error(e)
+
+        # OCR Fallback
+        if sum(len(page.strip()) for page in pages) < 50:
+            # Nothing usable in the text layer at all: OCR every page
+            try:
+                return [t + "\n" for t in self.ocr_pages(range(len(self.pages)))]
+            except:
+                return []
+        missing = [i for i, page in enumerate(pages) if not page.strip()]
+        if self.span is not None:
+            self.span.count_pages("text", len(pages) - len(missing))
+        if missing:
+            # Mixed scanned/digital statement: OCR only the empty pages
+            try:
+                for i, ocr_text in zip(missing, self.ocr_pages(missing)):
+                    pages[i] = ocr_text + "\n"
+            except:
+                pass # Keep the digital pages if OCR is unavailable
+        return pages
+
+    def extract_text(self, strategy=TABLES, parallel=None):
+        return "".join(self.extract_page_texts(strategy, parallel=parallel))
+
+    def ocr_pages(self, indexes, profile=None):
+        profile = profile or ocr_profile()
+        futures = [get_ocr_pool().submit(_timed_ocr_page, self.pages[i], profile) for i in indexes]
+        texts = []
+        for future in futures:
+            text, seconds = future.result()
+            self._record("ocr_page", seconds)
+            texts.append(text)
+        if self.span is not None:
+            self.span.count_pages("ocr", len(texts))
+        return texts
+
+    def ocr(self):
+        try:
+            return "".join(t + "\n" for t in self.ocr_pages(range(len(self.pages))))
+        except:
+            return ""
+
+
+_extraction_pool = None
+
+def get_extraction_pool():
+    global _extraction_pool
+    if _extraction_pool is None:
+        _extraction_pool = ProcessPoolExecutor(max_workers=max(config.EXTRACT_WORKERS, 1))
+    return _extraction_pool
+
+def warm_up():
+    """
+    Import the PDF stack now rather than on the first request, then start the
+    extraction workers. With the default fork start method they inherit the
+    imports; _warm_worker covers spawn.
+    """
+    import pdfplumber  # noqa: F401
+    import pdfminer.pdfdocument  # noqa: F401
+    import pdfminer.psparser  # noqa: F401
+    import pdfplumber.utils.exceptions  # noqa: F401
+    if config.EXTRACT_WORKERS > 1:
+        pool = get_extraction_pool()
+        for future in [pool.submit(_warm_worker) for _ in range(config.EXTRACT_WORKERS)]:
+            future.result()
+
+def _warm_worker():
+    import pdfplumber  # noqa: F401
+
+def _extract_page_range(source, password, start, stop, strategy):
+    # Runs in a worker process: page timings go back with the texts and are
+    # recorded by the parent, whose metrics are the ones exported
+    texts, timings = [], []
+    pdf_file = open(source, "rb") if isinstance(source, str) else io.BytesIO(source)
+    with pdf_file, StatementDocument(pdf_file, password=password) as doc:
+        for i in range(start, stop):
+            begin = time.perf_counter()
+            texts.append(doc._extract_page(i, strategy))
+            doc.release_page(i)
+            timings.append(time.perf_counter() - begin)
+    return texts, timings
+
+
+# --- OCR ---
+
+OCR_PROFILES = {
+    "fast": {"dpi": 150, "grayscale": True, "tesseract_config": "--oem 1 --psm 6"},
+    "balanced": {"dpi": 200, "grayscale": True, "tesseract_config": "--oem 1 --psm 6"},
+    "accurate": {"dpi": 300, "grayscale": False, "tesseract_config": ""},
+}
+
+def ocr_profile(name=None):
+    profile = dict(OCR_PROFILES.get(name or config.OCR_PROFILE, OCR_PROFILES["accurate"]))
+    if config.OCR_DPI > 0:
+        profile["dpi"] = config.OCR_DPI
+    return profile
+
+_ocr_pool = None
+# pdfplumber's renderer isn't thread-safe; tesseract itself runs in parallel
+_render_lock = threading.Lock()
+
+def get_ocr_pool():
+    global _ocr_pool
+    if _ocr_pool is None:
+        _ocr_pool = ThreadPoolExecutor(max_workers=max(config.OCR_WORKERS, 1), thread_name_prefix="ocr")
+    return _ocr_pool
+
+def _timed_ocr_page(page, profile):
+    start = time.perf_counter()
+    text = _ocr_page(page, profile)
+    return text, time.perf_counter() - start
+
+def _ocr_page(page, profile):
+    with _render_lock:
+        image = page.to_image(resolution=profile["dpi"]).original
+        if profile["grayscale"]:
+            rgb, image = image, image.convert("L")
+            rgb.close()
+        # Drop pdfplumber's cached layout objects for this page as well
+        page.close()
+    import pytesseract
     try:
-        # Attempt to open with password (default empty string if None)
-        with pdfplumber.open(pdf_file, password=password or "") as pdf:
-            
-            # --- INTELLIGENT STRATEGY SELECTION (The Fix) ---
-            # We peek at the first page to determine the best extraction method.
-            # SIB works best with Visual Layout (layout=True).
-            # SBI works best with Grid Tables (extract_tables).
-            
-            use_visual_mode = False # Default to Table Mode (better for SBI)
-            
-            if len(pdf.pages) > 0:
-                try:
-                    first_page_text = pdf.pages[0].extract_text() or ""
-                    # Check for SIB identifiers
-                    if "South Indian Bank" in first_page_text or "SIB" in first_page_text or "SIBL" in first_page_text:
-                        use_visual_mode = True
-                except:
-                    pass # Fallback to default if first page read fails
-
-            for page in pdf.pages:
-                # --- STRATEGY A: SIB (Visual Layout) ---
-                # If we identified this as SIB, we strictly use visual layout.
-                # This prevents Table Extraction from mangling the data.
-                if use_visual_mode:
-                    page_text = page.extract_text(layout=True)
-                    if page_text:
-                        text += page_text + "\n"
-                    continue
-
-                # --- STRATEGY B: SBI / Generic (Grid Tables) ---
-                # For SBI, we prefer extracting grid tables to handle column alignment.
-                tables = page.extract_tables()
-                
-                # Check if we found a valid table (at least 3 columns)
-                is_valid_table = False
-                if tables and len(tables) > 0:
-                    if len(tables[0]) > 0 and len(tables[0][0]) >= 3:
-                        is_valid_table = True
-
-                if is_valid_table:
-                    for table in tables:
-                        for row in table:
-                            # Clean each cell
-                            clean_row = [
-                                str(cell).replace("\n", " ").strip() if cell is not None else "" 
-                                for cell in row
-                            ]
-                            # USE PIPES '|' FOR SBI (Reliable Column Splitting)
-                            text += " | ".join(clean_row) + "\n"
-                else:
-                    # Fallback for pages without tables (even in SBI)
-                    page_text = page.extract_text(layout=True)
-                    if page_text:
-                        text += page_text + "\n"
-
-    except PDFPasswordIncorrect:
-        raise PasswordRequiredException("File is password protected")
-    except Exception as e:
-        # Catch generic pypdf/pdfminer errors related to encryption
-        if "password" in str(e).lower() or "encrypt" in str(e).lower():
-             raise PasswordRequiredException("File is password protected")
-        raise e
+        return pytesseract.image_to_string(image, config=profile["tesseract_config"])
+    finally:
+        # Release the raster as soon as the page is done
+        image.close()
 
-    # OCR Fallback
-    if len(text.strip()) < 50:
-        pdf_file.seek(0)
-        text = ocr_pdf(pdf_file)
 
-    return text
+def extract_title_upload(pdf_file, password=None):
+    with StatementDocument(pdf_file, password=password) as doc:
+        try:
+            return doc.title_text()
+        except Exception as e:
+            _raise_open_error(e)
+
+def extract_text(pdf_file, password=None, parallel=None):
+    with StatementDocument(pdf_file, password=password) as doc:
+        return doc.extract_text(parallel=parallel)
 
 def extract_title(pdf_file):
-    title = ""
+    import pdfplumber
+    texts = []
     try:
         with pdfplumber.open(pdf_file) as pdf:
             all_pages = pdf.pages
@@ -126,19 +353,14 @@ def extract_title(pdf_file):
             for page in pages_to_read:
                 text = page.extract_text()
                 if text:
-                    title += text + "\n"
+                    texts.append(text + "\n")
     except:
         pass
-    return title
+    return "".join(texts)
 
-def ocr_pdf(pdf_file):
-    extracted_text = ""
+def ocr_pdf(pdf_file, password=None):
     try:
-        with pdfplumber.open(pdf_file) as pdf:
-            for page in pdf.pages:
-                image = page.to_image(resolution=300).original
-                ocr_text = pytesseract.image_to_string(image)
-                extracted_text += ocr_text + "\n"
+        with StatementDocument(pdf_file, password=password) as doc:
+            return doc.ocr()
     except:
         return ""
-    return extracted_text
\ No newline at end of file
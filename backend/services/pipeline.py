@@ -0,0 +1,279 @@
+import logging
+import time
+import config
+from services import banks, pdf_loader
+from services.pdf_loader import StatementDocument, PasswordRequiredException, TABLES
+from services.transactions import TransactionBatch, to_paise
+from services.validation import ChainValidator
+from services.categorize import get_categorizer, categorize_batch
+from services.analytics import compute_analytics
+from services.analytics_engine import compute_insights
+from services import telemetry
+from services.telemetry import Span
+from services.uploads import open_upload
+from services.responses import dumps
+
+log = logging.getLogger(__name__)
+
+# Bump whenever extraction or parsing output changes; invalidates cached results
+PARSER_VERSION = "2026.10.5"
+
+
+# Peak memory of a non-streaming parse per page, once extracted pages are
+# released: page text, rows in the batch, the response dicts and their JSON.
+# benchmarks.bench_memory measures 60-150KB; this leaves headroom.
+FULL_PARSE_BYTES_PER_PAGE = 256 * 1024
+
+
+class NoTransactionsException(Exception):
+    pass
+
+
+class MemoryBudgetExceeded(Exception):
+    def __init__(self, estimate, budget):
+        super().__init__(f"estimated {estimate >> 20}MB exceeds the {budget >> 20}MB parse budget")
+        self.estimate = estimate
+        self.budget = budget
+
+    def __reduce__(self):
+        # Raised in parse worker processes and re-raised in the parent
+        return type(self), (self.estimate, self.budget)
+
+
+def warm_up():
+    """
+    Pay the one-off costs of the first parse up front: the PDF stack and
+    extraction workers, the bank modules and their compiled signatures, and
+    the category rules. OCR (pytesseract/PIL) stays lazy; it is rarely used.
+    """
+    start = time.perf_counter()
+    pdf_loader.warm_up()
+    banks.detect("")
+    get_categorizer()
+    log.info("Warm-up finished in %.0fms", (time.perf_counter() - start) * 1000)
+
+
+def detect_bank(doc):
+    # One compiled signature scan over the first page's (cached) text
+    bank = banks.detect(doc.page_text(0)) if len(doc) else None
+    log.debug("detected bank %s", bank.code if bank else banks.UNKNOWN)
+    return bank
+
+
+def _label(span, bank):
+    span.set_labels(bank.code if bank else banks.UNKNOWN, bank.strategy if bank else TABLES)
+
+
+def _open(span, pdf_file, password):
+    # 1. Open + decrypt once; every later stage reads from this document
+    try:
+        with span.stage("decrypt"):
+            return StatementDocument(pdf_file, password=password)
+    except PasswordRequiredException:
+        span.finish("password_required")
+        raise
+    except Exception:
+        span.finish("error")
+        raise
+
+
+def check_memory_budget(doc):
+    # A full response holds every page's rows at once; refuse before extracting
+    estimate = len(doc) * FULL_PARSE_BYTES_PER_PAGE
+    if 0 < config.PARSE_MEMORY_BUDGET < estimate:
+        raise MemoryBudgetExceeded(estimate, config.PARSE_MEMORY_BUDGET)
+
+
+def parse_pdf_bytes(content, password=""):
+    """
+    Synchronous /parse pipeline: decrypt -> detect -> extract -> parse -> analytics.
+
+    CPU-bound; the endpoint runs it in a parse worker process (parse_in_worker),
+    never on the event loop. `content` is the upload as bytes, a
+    services.uploads.SpooledUpload, or the path of one.
+    Raises PasswordRequiredException / NoTransactionsException for the 422 cases,
+    and MemoryBudgetExceeded for statements too long for PARSE_MEMORY_BUDGET.
+    Each stage is timed into the statement_stage_seconds histogram.
+    """
+    span = Span(log)
+    pdf_file = open_upload(content)
+    try:
+        with _open(span, pdf_file, password) as doc:
+            return parse_document(doc, span)
+    finally:
+        pdf_file.close()
+
+
+def init_parse_worker():
+    """
+    Initializer of the parse worker processes. Page-sharded extraction
+    shares EXTRACT_WORKERS out between the parse workers instead of starting
+    that many per worker; then the worker warms up before its first upload.
+    """
+    config.EXTRACT_WORKERS = max(config.EXTRACT_WORKERS // max(config.PARSE_WORKERS, 1), 1)
+    try:
+        warm_up()
+    except Exception:
+        log.exception("Parse worker warm-up failed")
+
+
+def parse_in_worker(content, password="", raw=False):
+    """
+    parse_pdf_bytes in a parse worker process (see init_parse_worker), as
+    (result, error, metrics). `content` comes from uploads.portable(). The
+    error is returned rather than raised so the metrics recorded before it
+    still reach the parent, which merges them. raw=True returns the result
+    as JSON bytes, which cost far less to send back than the dict.
+    """
+    try:
+        result = parse_pdf_bytes(content, password)
+        return (dumps(result) if raw else result), None, telemetry.drain()
+    except Exception as e:
+        return None, e, telemetry.drain()
+
+
+def parse_document(doc, span=None):
+    """
+    The rest of parse_pdf_bytes for a document that is already open and
+    decrypted, such as an upload session's. The caller closes `doc`.
+    """
+    span = span or Span(log)
+    outcome = "error"
+    transactions = TransactionBatch()
+    try:
+        # 2. Identify Bank
+        with span.stage("detect"):
+            bank = detect_bank(doc)
+        _label(span, bank)
+        bank_type = span.labels["bank"]
+        try:
+            check_memory_budget(doc)
+        except MemoryBudgetExceeded:
+            outcome = "over_budget"
+            raise
+
+        # 3. Extract page texts; they stay separate, the parsers consume them one by one
+        doc.span = span
+        with span.stage("extract"):
+            pages = doc.extract_page_texts(span.labels["strategy"])
+
+        with span.stage("parse"):
+            if bank:
+                transactions = bank.parse_batch(pages)
+            categorize_batch(transactions)
+
+        if not transactions:
+            outcome = "no_transactions"
+            raise NoTransactionsException("No transactions found.")
+
+        # 4. Analytics
+        with span.stage("analytics"):
+            analytics = compute_analytics(transactions)
+            insights = compute_insights(transactions)
+
+        outcome = "success"
+        log.info(
+            "parsed statement", extra={"fields": {
+                "bank": bank_type, "pages": len(pages), "transactions": len(transactions),
+            }},
+        )
+        return {
+            "bank": bank_type,
+            "transactions": transactions.to_dicts(),
+            "analytics": analytics,
+            "insights": insights
+        }
+    finally:
+        doc.span = None
+        span.finish(outcome, len(transactions))
+
+
+def iter_parse_events(content, password=""):
+    """
+    Streaming variant of parse_pdf_bytes.
+
+    Yields dict events as pages are processed: one "bank" event, then
+    "transaction" and "progress" events page by page, and a final "analytics"
+    event. Transactions are never collected into a list.
+    """
+    span = Span(log)
+    pdf_file = open_upload(content)
+    try:
+        with _open(span, pdf_file, password) as doc:
+            yield from iter_document_events(doc, span)
+    finally:
+        pdf_file.close()
+
+
+def iter_document_events(doc, span=None):
+    # iter_parse_events for a document that is already open and decrypted
+    span = span or Span(log)
+    outcome = "error"
+    count = 0
+    try:
+        with span.stage("detect"):
+            bank = detect_bank(doc)
+        _label(span, bank)
+        doc.span = span
+        pages = len(doc)
+        yield {"type": "bank", "bank": span.labels["bank"], "pages": pages}
+
+        if bank is None:
+            outcome = "no_transactions"
+            raise NoTransactionsException("No transactions found.")
+
+        parser = bank.stream_parser()
+        validator = ChainValidator()
+        categorizer = get_categorizer()
+        total_credit = 0
+        total_debit = 0
+        flagged = 0
+
+        def emit(transactions):
+            nonlocal total_credit, total_debit, count, flagged
+            for txn in transactions:
+                txn["category"] = categorizer.categorize(txn["description"])
+                # Summed in paise, matching compute_analytics on a batch
+                total_credit += to_paise(txn['credit'] or 0)
+                total_debit += to_paise(txn['debit'] or 0)
+                count += 1
+                flagged += 1 if txn['is_flagged'] else 0
+                yield {"type": "transaction", "transaction": txn}
+
+        for i in range(pages):
+            page_text = doc.extract_page(i, bank.strategy)
+            if not page_text.strip():
+                # Scanned page: OCR just this one
+                try:
+                    page_text = doc.ocr_pages([i])[0] + "\n"
+                except Exception as e:
+                    log.warning("OCR failed on page %d: %s: %s", i + 1, type(e).__name__, e)
+            else:
+                span.count_pages("text", 1)
+            yield from emit(validator.iter_feed(parser.iter_feed(page_text)))
+            yield {"type": "progress", "pagesDone": i + 1, "pages": pages}
+        yield from emit(validator.iter_feed(parser.iter_finish()))
+        # Release the row the validator holds back for lookahead
+        yield from emit(validator.iter_finish())
+
+        if count == 0:
+            outcome = "no_transactions"
+            raise NoTransactionsException("No transactions found.")
+
+        outcome = "success"
+        yield {
+            "type": "analytics",
+            "analytics": {
+                "totalCredit": total_credit / 100,
+                "totalDebit": total_debit / 100,
+                "netCashFlow": total_credit / 100 - total_debit / 100,
+                "flaggedCount": flagged
+            }
+        }
+    except GeneratorExit:
+        # Client went away mid-stream
+        outcome = "cancelled"
+        raise
+    finally:
+        doc.span = None
+        span.finish(outcome, count)
@@ -0,0 +1,227 @@
+import time
+import numpy as np
+from services.transactions import NULL_PAISE
+
+# Candidate sets up to this size are solved exactly by meet-in-the-middle
+# (2 x 2^20 subset sums); larger ones go through the paise DP.
+MITM_MAX_ITEMS = 40
+# Share of the time budget meet-in-the-middle may use before it gives up
+# and leaves the rest to the DP
+MITM_BUDGET_SHARE = 0.5
+# Most (left, right) pairs meet-in-the-middle builds subsets from; only
+# reached when thousands of combinations tie for the best distances
+MITM_MAX_PAIRS = 100_000
+# Upper bound on DP cells; the amount resolution is coarsened to stay under it
+DP_MAX_CELLS = 400_000
+
+
+class ReconcileError(Exception):
+    pass
+
+
+def reconcile(batch, credit_id, target=None, tolerance=0.0, window_days=None, top_k=5, time_budget=2.0):
+    """
+    Find combinations of debits on or after a credit whose sum matches it.
+
+    Debits are pruned to the date window [credit date, credit date + window]
+    and to amounts no larger than target + tolerance. Sums above
+    target + tolerance are never returned. Matches are ranked by distance to
+    the target, then by average confidence, then by fewer debits.
+
+    `complete` is False when the budget ran out before the search finished.
+    `exact` is False when the DP had to round amounts to `resolution` rupees
+    to fit DP_MAX_CELLS, so closer combinations than those returned may exist.
+    """
+    start = time.perf_counter()
+    deadline = start + time_budget
+    ids = np.asarray(batch.ids, dtype=np.int64)
+    where = np.flatnonzero(ids == credit_id)
+    if len(where) == 0:
+        raise ReconcileError(f"Transaction {credit_id} not found")
+    row = where[0]
+    credit = batch.credit[row]
+    if credit == NULL_PAISE and target is None:
+        raise ReconcileError(f"Transaction {credit_id} is not a credit")
+
+    target_paise = int(round(target * 100)) if target is not None else credit
+    tol_paise = int(round(tolerance * 100))
+    limit = target_paise + tol_paise
+
+    # --- Pruning: date window and amount ---
+    dates = np.asarray(batch.dates, dtype=np.int64)
+    debit = np.asarray(batch.debit, dtype=np.int64)
+    mask = (debit != NULL_PAISE) & (debit > 0) & (debit <= limit) & (dates >= dates[row])
+    if window_days is not None:
+        mask &= dates <= dates[row] + window_days
+    mask[row] = False
+    candidates = np.flatnonzero(mask)
+    amounts = debit[candidates]
+
+    subsets = None
+    if len(candidates) <= MITM_MAX_ITEMS:
+        subsets = _meet_in_the_middle(amounts, target_paise, limit, top_k, start + time_budget * MITM_BUDGET_SHARE)
+        method, complete, resolution = "meet-in-the-middle", True, 1
+    if subsets is None:
+        # Too many candidates, or meet-in-the-middle ran out of its share
+        subsets, complete, resolution = _paise_dp(amounts, target_paise, limit, top_k, deadline)
+        method = "dp"
+
+    confidence = np.asarray(batch.confidence, dtype=np.float64)
+    matches = []
+    for subset in subsets:
+        rows = candidates[subset]
+        total = int(debit[rows].sum())
+        if total > limit or len(rows) == 0:
+            continue
+        matches.append({
+            "debitIds": ids[np.sort(rows)].tolist(),
+            "totalMatched": total / 100,
+            "difference": (target_paise - total) / 100,
+            "accuracy": round(total / target_paise * 100, 2) if target_paise else 0,
+            "withinTolerance": abs(target_paise - total) <= tol_paise,
+            "avgConfidence": round(float(confidence[rows].mean()), 4),
+        })
+    matches.sort(key=lambda m: (abs(m["difference"]), -m["avgConfidence"], len(m["debitIds"])))
+
+    return {
+        "creditId": credit_id,
+        "target": target_paise / 100,
+        "candidates": len(candidates),
+        "method": method,
+        "complete": complete,
+        "exact": resolution == 1,
+        "resolution": resolution / 100,
+        "matches": matches[:top_k],
+    }
+
+
+def _subset_sums(amounts, deadline):
+    # All 2^n subset sums with their membership bitmasks, built by doubling;
+    # None once the deadline passes
+    sums = np.zeros(1, dtype=np.int64)
+    masks = np.zeros(1, dtype=np.int64)
+    for i, a in enumerate(amounts):
+        if time.perf_counter() > deadline:
+            return None
+        sums = np.concatenate([sums, sums + a])
+        masks = np.concatenate([masks, masks | (1 << i)])
+    return sums, masks
+
+
+def _meet_in_the_middle(amounts, target, limit, top_k, deadline):
+    # Exact search; returns None if the deadline passes first
+    n = len(amounts)
+    half = n // 2
+    left = _subset_sums(amounts[:half], deadline)
+    right = None if left is None else _subset_sums(amounts[half:], deadline)
+    if right is None:
+        return None
+    left_sums, left_masks = left
+    right_sums, right_masks = right
+    order = np.argsort(right_sums, kind="stable")
+    right_sums, right_masks = right_sums[order], right_masks[order]
+
+    # Every pair whose total lies within `slack` of the target (and <= limit):
+    # per left sum, a contiguous range of the sorted right sums.
+    def band(slack):
+        lo = np.searchsorted(right_sums, target - slack - left_sums, side="left")
+        hi = np.searchsorted(right_sums, min(limit, target + slack) - left_sums, side="right")
+        return lo, np.maximum(hi - lo, 0)
+
+    # Each left sum's nearest partner bounds the slack: the (top_k + 1)-th
+    # smallest of those (one pair is the empty subset) leaves at least
+    # top_k pairs in the band. With fewer left sums than that the whole
+    # search space is small, and the band takes every total up to limit.
+    below = np.searchsorted(right_sums, target - left_sums, side="right") - 1
+    nearest = []
+    for j in (below, below + 1):
+        ok = (j >= 0) & (j < len(right_sums))
+        totals = left_sums + right_sums[np.clip(j, 0, len(right_sums) - 1)]
+        nearest.append(np.where(ok & (totals <= limit), np.abs(totals - target), np.iinfo(np.int64).max))
+    nearest = np.minimum(*nearest)
+    nearest = nearest[nearest < np.iinfo(np.int64).max]
+    if len(nearest) == 0:
+        return []
+    want = top_k + 1
+    if len(nearest) >= want:
+        slack = int(np.partition(nearest, want - 1)[want - 1])
+    else:
+        slack = max(target, limit)
+
+    # Many ties can put far more pairs in the band than are worth building
+    # subsets for; narrow it while it still holds top_k pairs.
+    lo, counts = band(slack)
+    floor = 0
+    while counts.sum() > MITM_MAX_PAIRS and floor < slack:
+        if time.perf_counter() > deadline:
+            return None
+        mid = (floor + slack) // 2
+        mid_lo, mid_counts = band(mid)
+        if mid_counts.sum() >= want:
+            slack, lo, counts = mid, mid_lo, mid_counts
+        else:
+            floor = mid + 1
+    if time.perf_counter() > deadline:
+        return None
+
+    # Expand the ranges into (left, right) index pairs, closest first
+    total = min(int(counts.sum()), MITM_MAX_PAIRS)
+    li = np.repeat(np.arange(len(left_sums)), counts)[:total]
+    starts = np.cumsum(counts) - counts
+    rj = lo[li] + np.arange(total) - starts[li]
+    distance = np.abs(left_sums[li] + right_sums[rj] - target)
+    order = np.argsort(distance, kind="stable")
+
+    # The closest top_k * 4, plus (within reason) whatever ties the last of
+    # them, since reconcile() breaks ties by confidence
+    subsets = []
+    for b in order:
+        lm, rm = int(left_masks[li[b]]), int(right_masks[rj[b]])
+        if lm == 0 and rm == 0:
+            continue
+        if len(subsets) >= top_k * 4 and (distance[b] > distance[order[top_k * 4 - 1]] or len(subsets) >= top_k * 40):
+            break
+        subset = [i for i in range(half) if lm >> i & 1] + [half + i for i in range(n - half) if rm >> i & 1]
+        subsets.append(np.array(subset, dtype=np.int64))
+    return subsets
+
+
+def _paise_dp(amounts, target, limit, top_k, deadline):
+    # 0/1 reachability over (possibly coarsened) paise. first[s] records the
+    # item that first made sum s reachable; walking first[] back from s
+    # recovers one subset, since s - a[first[s]] was reachable strictly earlier.
+    # Returns the subsets, whether every item was added, and the resolution.
+    resolution = max(1, -(-limit // DP_MAX_CELLS))
+    q = np.maximum(1, np.rint(amounts / resolution).astype(np.int64))
+    cells = limit // resolution + 1
+    reach = np.zeros(cells, dtype=bool)
+    reach[0] = True
+    first = np.full(cells, -1, dtype=np.int64)
+
+    complete = True
+    for i, a in enumerate(q):
+        if time.perf_counter() > deadline:
+            complete = False
+            break
+        if a >= cells:
+            continue
+        newly = np.flatnonzero(reach[:cells - a] & ~reach[a:]) + a
+        first[newly] = i
+        reach[newly] = True
+
+    sums = np.flatnonzero(reach[1:]) + 1
+    if len(sums) == 0:
+        return [], complete, resolution
+    distance = np.abs(sums * resolution - target)
+    k = min(len(sums), top_k * 2)
+    best = sums[np.argsort(distance, kind="stable")[:k]]
+
+    subsets = []
+    for s in best:
+        subset = []
+        while s > 0:
+            i = first[s]
+            subset.append(i)
+            s -= q[i]
+        subsets.append(np.array(subset[::-1], dtype=np.int64))
+    return subsets, complete, resolution
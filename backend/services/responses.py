@@ -0,0 +1,146 @@
+"""
+Response encoding and content negotiation.
+
+Parse results are plain dicts of str/int/float/bool/None built by the
+parsers, so they can go straight to orjson: no jsonable_encoder walk and no
+per-row Pydantic round trip. The schemas in models.schemas still describe
+the responses (OpenAPI), and VALIDATE_RESPONSES=1 routes them through
+FastAPI's response_model validation again, e.g. in development.
+
+Clients that send `Accept: application/x-msgpack` get MessagePack instead,
+with every transaction list turned into column arrays ({"id": [...],
+"txn_date": [...], ...}) so the field names aren't repeated per row. JSON
+stays the default; without the msgpack package only JSON is offered.
+"""
+import orjson
+from fastapi.responses import Response
+import config
+from services.transactions import TransactionBatch
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = "application/json"
+MSGPACK = "application/x-msgpack"
+MSGPACK_TYPES = (MSGPACK, "application/msgpack", "application/vnd.msgpack")
+JSON_TYPES = (JSON, "application/*", "*/*")
+NDJSON = "application/x-ndjson"
+SSE = "text/event-stream"
+# Row keys, in row() order, for the columnar encoding
+COLUMNS = ("id", "txn_date", "description", "ref_no", "debit", "credit", "balance",
+           "confidence", "is_flagged", "category", "bank", "source")
+
+
+def _default(obj):
+    # Batches may be handed over as-is; JSON gets them as rows
+    if isinstance(obj, TransactionBatch):
+        return obj.to_dicts()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(obj):
+    return orjson.dumps(obj, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+loads = orjson.loads
+
+
+class OrjsonResponse(Response):
+    media_type = JSON
+
+    def render(self, content):
+        return dumps(content)
+
+
+def _accepted(accept):
+    # Media types from an Accept header with q > 0, best first (ties: listed first)
+    ranked = []
+    for position, part in enumerate((accept or "").split(",")):
+        media, *params = [p.strip() for p in part.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if q > 0 and media:
+            ranked.append((-q, position, media.lower()))
+    return [media for _, _, media in sorted(ranked)]
+
+
+def negotiate(accept):
+    """
+    "msgpack" if the Accept header ranks a MessagePack type at least as high
+    as JSON (ties go to the one listed first), else "json".
+    """
+    if msgpack is None:
+        return "json"
+    for media in _accepted(accept):
+        if media in MSGPACK_TYPES:
+            return "msgpack"
+        if media in JSON_TYPES:
+            return "json"
+    return "json"
+
+
+def stream_fallback(accept):
+    """
+    The stream format ("ndjson" or "sse") a client names explicitly in Accept,
+    for statements too large to answer in one response; None otherwise.
+    Wildcards don't count: the client has to be able to read a stream.
+    """
+    for media in _accepted(accept):
+        if media == NDJSON:
+            return "ndjson"
+        if media == SSE:
+            return "sse"
+    return None
+
+
+def _columnar(value):
+    # Transaction lists (rows or a batch) anywhere in a result -> column arrays
+    if isinstance(value, TransactionBatch):
+        return value.to_columns()
+    if isinstance(value, dict):
+        return {k: _columnar_transactions(v) if k == "transactions" else _columnar(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_columnar(v) for v in value]
+    return value
+
+
+def _columnar_transactions(value):
+    if isinstance(value, TransactionBatch):
+        return value.to_columns()
+    if isinstance(value, list):
+        return {key: [row.get(key) for row in value] for key in COLUMNS}
+    return value
+
+
+def json_response(result):
+    """
+    Response for a dict, or for JSON bytes that are already encoded (a
+    cached parse result is sent exactly as stored).
+    """
+    if config.VALIDATE_RESPONSES:
+        # Returning plain data lets FastAPI validate it against response_model
+        return loads(result if isinstance(result, bytes) else dumps(result))
+    if isinstance(result, bytes):
+        return Response(result, media_type=JSON, headers={"Vary": "Accept"})
+    return OrjsonResponse(result, headers={"Vary": "Accept"})
+
+
+def msgpack_response(result):
+    payload = msgpack.packb(_columnar(result), use_bin_type=True)
+    return Response(payload, media_type=MSGPACK, headers={"Vary": "Accept"})
+
+
+def encode_response(result, fmt="json"):
+    # CPU-bound for large results; endpoints call it off the event loop
+    return msgpack_response(result) if fmt == "msgpack" else json_response(result)
+
+
+# OpenAPI entry for endpoints that negotiate their encoding
+NEGOTIATED = {200: {"content": {MSGPACK: {"schema": {"type": "string", "format": "binary"}}}}}
@@ -0,0 +1,265 @@
+import hashlib
+import hmac
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+import config
+from services.responses import dumps, loads
+from services.uploads import content_digest
+
+log = logging.getLogger(__name__)
+
+# Longest gap between two sweeps of the disk tier (see ResultCache._sweep_disk)
+DISK_SWEEP_SECONDS = 60
+
+def cache_key(content, password, parser_version):
+    """
+    Content-addressed key for a parse result.
+
+    The password is folded in through an HMAC keyed with CACHE_SECRET, so it
+    never appears in the key (or on disk) in plain or plainly-hashed form.
+    """
+    h = hashlib.sha256()
+    h.update(parser_version.encode())
+    h.update(b"\0")
+    h.update(content_digest(content))
+    if password:
+        h.update(hmac.new(config.CACHE_SECRET, password.encode(), hashlib.sha256).digest())
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    Two-tier cache of serialized /parse results: an in-memory LRU bounded by
+    total bytes, and an optional directory of JSON files bounded by
+    `disk_max_bytes` (0 = unbounded). Either tier works without the other.
+
+    Entries expire `ttl` seconds after they are stored, in both tiers; a hit
+    doesn't extend them. Expired entries are dropped when they are looked up
+    and whenever a new result is stored; on disk, by a sweep that runs from
+    put at most every DISK_SWEEP_SECONDS (or TTL, if shorter), and straight
+    away once the directory may have outgrown its bound. clear() purges
+    everything.
+    """
+
+    def __init__(self, max_bytes, disk_dir=None, ttl=config.CACHE_TTL, disk_max_bytes=config.CACHE_DIR_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.ttl = ttl
+        self.disk_max_bytes = disk_max_bytes
+        self._entries = OrderedDict()   # key -> (expires, payload)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Bytes on disk as of the last sweep plus what has been written since;
+        # other processes sharing the directory are only seen by a sweep
+        self._disk_bytes = 0
+        self._next_sweep = 0.0
+        self._sweep_lock = threading.Lock()
+        self.stats = {
+            "memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0, "expired": 0,
+            "disk_expired": 0, "disk_evictions": 0,
+        }
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0 or bool(self.disk_dir)
+
+    def get(self, key):
+        payload = self.get_payload(key)
+        return None if payload is None else loads(payload)
+
+    def get_payload(self, key):
+        # The stored JSON bytes, which /parse sends without decoding them
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires, payload = entry
+                if expires > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.stats["memory_hits"] += 1
+                    return payload
+                self._pop(key)
+                self.stats["expired"] += 1
+
+        payload, age = self._read_disk(key)
+        with self._lock:
+            if payload is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["disk_hits"] += 1
+            # Promoted entries keep the expiry they were written with
+            self._insert(key, payload, time.monotonic() + self.ttl - age)
+        return payload
+
+    def put(self, key, result):
+        self.put_payload(key, dumps(result))
+
+    def put_payload(self, key, payload):
+        with self._lock:
+            self.stats["stores"] += 1
+            self._purge()
+            self._insert(key, payload, time.monotonic() + self.ttl)
+        if self.disk_dir:
+            self._write_disk(key, payload)
+            self._maybe_sweep_disk()
+
+    def clear(self):
+        """Drop every entry, from memory and disk; returns how many were removed."""
+        with self._lock:
+            removed = len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+        if self.disk_dir:
+            removed = max(removed, self._clear_disk())
+            with self._lock:
+                self._disk_bytes = 0
+        return removed
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                **self.stats,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "ttl": self.ttl,
+                "disk": bool(self.disk_dir),
+                "disk_bytes": self._disk_bytes,
+                "disk_max_bytes": self.disk_max_bytes,
+            }
+
+    # --- Internals (call with the lock held) ---
+
+    def _insert(self, key, payload, expires):
+        if len(payload) > self.max_bytes:
+            return
+        self._pop(key)
+        self._entries[key] = (expires, payload)
+        self._bytes += len(payload)
+        while self._bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.stats["evictions"] += 1
+
+    def _pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+
+    def _purge(self):
+        # Hits reorder entries, so expired ones can be anywhere
+        now = time.monotonic()
+        for key in [key for key, (expires, _) in self._entries.items() if expires <= now]:
+            self._pop(key)
+            self.stats["expired"] += 1
+
+    # --- Disk tier ---
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, key[:2], key + ".json")
+
+    def _read_disk(self, key):
+        # (payload, seconds since it was written), or (None, 0)
+        if not self.disk_dir:
+            return None, 0
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                age = time.time() - os.fstat(f.fileno()).st_mtime
+                if age < self.ttl:
+                    return f.read(), age
+            os.remove(path)
+        except OSError:
+            pass
+        return None, 0
+
+    def _clear_disk(self):
+        removed = 0
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                try:
+                    os.remove(os.path.join(root, name))
+                    removed += name.endswith(".json")
+                except OSError:
+                    pass
+        return removed
+
+    def _write_disk(self, key, payload):
+        if 0 < self.disk_max_bytes < len(payload):
+            return
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write-then-rename so concurrent readers never see a partial file
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(payload)
+            os.replace(tmp, path)
+        except OSError as e:
+            log.error("Result cache disk write failed: %s", e)
+            return
+        with self._lock:
+            self._disk_bytes += len(payload)
+
+    def _maybe_sweep_disk(self):
+        now = time.monotonic()
+        over = 0 < self.disk_max_bytes < self._disk_bytes
+        if now < self._next_sweep and not over:
+            return
+        # One sweep at a time; other stores don't wait for it
+        if not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            self._next_sweep = now + min(self.ttl, DISK_SWEEP_SECONDS)
+            total = self._sweep_disk()
+            with self._lock:
+                self._disk_bytes = total
+        finally:
+            self._sweep_lock.release()
+
+    def _sweep_disk(self):
+        """
+        Delete files older than the TTL (stale temp files included), then the
+        oldest entries until the directory fits disk_max_bytes. Returns the
+        bytes left. The directory is rescanned every time rather than tracked,
+        since other processes may be writing to it too.
+        """
+        now = time.time()
+        kept, total, expired = [], 0, 0
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                    if now - st.st_mtime >= self.ttl:
+                        os.remove(path)
+                        expired += name.endswith(".json")
+                        continue
+                except OSError:
+                    continue
+                kept.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+
+        evicted = 0
+        if 0 < self.disk_max_bytes < total:
+            kept.sort()
+            for _, size, path in kept:
+                if total <= self.disk_max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                evicted += 1
+        with self._lock:
+            self.stats["disk_expired"] += expired
+            self.stats["disk_evictions"] += evicted
+        return total
+
+
+result_cache = ResultCache(config.CACHE_MAX_BYTES, config.CACHE_DIR or None, config.CACHE_TTL, config.CACHE_DIR_MAX_BYTES)
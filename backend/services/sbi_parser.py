@@ -1,65 +1,101 @@
 import re
+from services.transactions import TransactionBatch
+from services.validation import iter_validated
 
 def parse_sbi(text: str):
-    transactions = []
-    lines = text.splitlines()
-    txn_id = 1
+    return list(iter_validated(iter_sbi([text])))
+
+def parse_sbi_batch(pages):
+    return TransactionBatch.from_dicts(iter_validated(iter_sbi(pages)))
+
+def iter_sbi(pages):
+    # Yields transactions from an iterable of page texts as each row completes
+    parser = SbiStreamParser()
+    for page in pages:
+        yield from parser.iter_feed(page)
+    yield from parser.finish()
+
+def parse_line(line, txn_id):
+    # We look for lines with Pipes '|' (Generated by pdf_loader's table extraction)
+    if "|" not in line:
+        return None
+    parts = [p.strip() for p in line.split("|")]
+    
+    # SBI Table Structure:
+    # 0: Txn Date
+    # 1: Value Date (or Post Date)
+    # 2: Description
+    # 3: Ref No / Cheque
+    # 4: Debit
+    # 5: Credit
+    # 6: Balance
+    
+    if len(parts) < 7:
+        return None
+    date_str = parts[0]
+    
+    # Skip Header Rows
+    if "Date" in date_str or "Txn" in date_str:
+        return None
+    
+    # Validate Date Format (DD/MM/YYYY or DD-MM-YYYY)
+    if not re.match(r"\d{2}[/-]\d{2}[/-]\d{4}", date_str):
+        return None
+
+    description = parts[2]
+
+    # Helper to clean numbers
+    def clean_amt(val):
+        # Remove commas, handle '-' or empty strings
+        val = val.replace(",", "").strip()
+        if not val or val == "-":
+            return 0.0
+        try:
+            return float(val)
+        except ValueError:
+            return 0.0
+
+    debit = clean_amt(parts[4])
+    credit = clean_amt(parts[5])
+    balance = clean_amt(parts[6])
     
-    for line in lines:
-        # We look for lines with Pipes '|' (Generated by pdf_loader's table extraction)
-        if "|" in line:
-            parts = [p.strip() for p in line.split("|")]
-            
-            # SBI Table Structure:
-            # 0: Txn Date
-            # 1: Value Date (or Post Date)
-            # 2: Description
-            # 3: Ref No / Cheque
-            # 4: Debit
-            # 5: Credit
-            # 6: Balance
-            
-            if len(parts) >= 7:
-                date_str = parts[0]
-                
-                # Skip Header Rows
-                if "Date" in date_str or "Txn" in date_str:
-                    continue
-                
-                # Validate Date Format (DD/MM/YYYY or DD-MM-YYYY)
-                if not re.match(r"\d{2}[/-]\d{2}[/-]\d{4}", date_str):
-                    continue
+    # Valid transaction check
+    if debit > 0 or credit > 0:
+        return {
+            "id": txn_id,
+            "txn_date": date_str,
+            "description": description,
+            "debit": debit if debit > 0 else None,
+            "credit": credit if credit > 0 else None,
+            "balance": balance,
+            "confidence": 1.0, # Until the balance-chain validation pass says otherwise
+            "is_flagged": False
+        }
+    return None
+
+class SbiStreamParser:
+    """
+    Incremental SBI parser fed one page of table text at a time.
+
+    Table rows never span lines, so each page is parsed as soon as it arrives;
+    only the running txn_id is carried between pages.
+    """
+
+    def __init__(self):
+        self.txn_id = 1
+
+    def feed(self, text):
+        return list(self.iter_feed(text))
 
-                description = parts[2]
+    def iter_feed(self, text):
+        for line in text.splitlines():
+            txn = parse_line(line, self.txn_id)
+            if txn is not None:
+                self.txn_id += 1
+                yield txn
 
-                # Helper to clean numbers
-                def clean_amt(val):
-                    # Remove commas, handle '-' or empty strings
-                    val = val.replace(",", "").strip()
-                    if not val or val == "-":
-                        return 0.0
-                    try:
-                        return float(val)
-                    except ValueError:
-                        return 0.0
+    def finish(self):
+        return []
 
-                debit = clean_amt(parts[4])
-                credit = clean_amt(parts[5])
-                balance = clean_amt(parts[6])
-                
-                # Valid transaction check
-                if debit > 0 or credit > 0:
-                    txn = {
-                        "id": txn_id,
-                        "txn_date": date_str,
-                        "description": description,
-                        "debit": debit if debit > 0 else None,
-                        "credit": credit if credit > 0 else None,
-                        "balance": balance,
-                        "confidence": 1.0, # High confidence because it's from a Table
-                        "is_flagged": False
-                    }
-                    transactions.append(txn)
-                    txn_id += 1
-                    
-    return transactions
\ No newline at end of file
+    def iter_finish(self):
+        return iter(())
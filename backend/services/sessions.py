@@ -0,0 +1,246 @@
+import logging
+import secrets
+import threading
+import time
+from collections import OrderedDict
+import config
+from services.pdf_loader import StatementDocument, PasswordRequiredException
+from services.pipeline import parse_document, iter_document_events
+from services import uploads
+
+log = logging.getLogger(__name__)
+
+
+class SessionBusy(Exception):
+    pass
+
+
+class SessionClosed(Exception):
+    pass
+
+
+class TooManyAttempts(Exception):
+    pass
+
+
+class UploadSession:
+    """
+    One uploaded statement held server-side between requests.
+
+    The bytes are kept once, so password attempts don't re-send the file, and
+    the document opened by the first correct password is kept open, so the
+    parse that follows skips the decrypt. Use it under `with session:`; only
+    one request at a time may (SessionBusy otherwise).
+    """
+
+    def __init__(self, content, file_name="", ttl=config.SESSION_TTL):
+        self.id = secrets.token_urlsafe(18)
+        self.content = content
+        self.file_name = file_name
+        self.password = None
+        self.doc = None
+        # Set once opening it has asked for a password (or needed one)
+        self.encrypted = False
+        self.attempts = 0
+        self.expires = time.monotonic() + ttl
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def __enter__(self):
+        if not self._lock.acquire(blocking=False):
+            raise SessionBusy(self.id)
+        if self._closed:
+            self._lock.release()
+            raise SessionClosed(self.id)
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if self._closed:
+                # Expired or removed while this request was using it
+                self._release()
+        finally:
+            self._lock.release()
+
+    @property
+    def ready(self):
+        return self.doc is not None
+
+    def unlock(self, password=""):
+        """
+        Open the document with `password`. Returns False for a wrong (or
+        missing) password; raises TooManyAttempts once SESSION_MAX_ATTEMPTS
+        have failed. Other open errors (InvalidPDFException) propagate as
+        from StatementDocument.
+        """
+        if self.doc is not None and password in ("", self.password):
+            return True
+        if self.attempts >= config.SESSION_MAX_ATTEMPTS:
+            raise TooManyAttempts(self.id)
+        pdf_file = uploads.open_upload(self.content)
+        try:
+            doc = StatementDocument(pdf_file, password=password)
+        except BaseException as e:
+            pdf_file.close()
+            if not isinstance(e, PasswordRequiredException):
+                raise
+            self.encrypted = True
+            if not password:
+                # Probing whether a password is needed isn't an attempt
+                return False
+            self.attempts += 1
+            if self.attempts >= config.SESSION_MAX_ATTEMPTS:
+                raise TooManyAttempts(self.id)
+            return False
+        self._release_doc()
+        self.doc, self.password = doc, password
+        self.encrypted = self.encrypted or doc.encrypted
+        return True
+
+    def close(self):
+        self._closed = True
+        self._release()
+
+    def _release(self):
+        self._release_doc()
+        # A spooled upload's temp file goes with the session
+        uploads.release(self.content)
+
+    def _release_doc(self):
+        if self.doc is not None:
+            self.doc.close()
+            self.doc.pdf_file.close()
+            self.doc = None
+
+
+class SessionStore:
+    """
+    Upload sessions by id, bounded by a TTL and by the total bytes held.
+
+    Expired sessions are dropped whenever the store is used; when a new
+    upload doesn't fit, the oldest idle sessions make room for it, and if
+    that isn't enough it is refused (create returns None, add False).
+    """
+
+    def __init__(self, max_bytes, ttl):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._sessions = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.stats = {"created": 0, "rejected": 0, "expired": 0, "evictions": 0}
+
+    def create(self, content, file_name=""):
+        session = UploadSession(content, file_name, self.ttl)
+        return session if self.add(session) else None
+
+    def add(self, session):
+        # Hold a session built outside the store, e.g. one already unlocked
+        content = session.content
+        if len(content) > self.max_bytes:
+            log.warning("%d-byte upload exceeds SESSION_MAX_BYTES", len(content))
+            with self._lock:
+                self.stats["rejected"] += 1
+            return False
+        session.expires = time.monotonic() + self.ttl
+        closing = []
+        with self._lock:
+            self._purge(closing)
+            for held in list(self._sessions.values()):
+                if self._bytes + len(content) <= self.max_bytes:
+                    break
+                if held._lock.locked():
+                    continue
+                self._pop(held.id, closing)
+                self.stats["evictions"] += 1
+            admitted = self._bytes + len(content) <= self.max_bytes
+            if admitted:
+                self._sessions[session.id] = session
+                self._bytes += len(content)
+                self.stats["created"] += 1
+            else:
+                self.stats["rejected"] += 1
+                log.warning("Upload sessions full (%d bytes held); %d-byte upload refused", self._bytes, len(content))
+        self._close(closing)
+        return admitted
+
+    def get(self, session_id):
+        # None for unknown and expired ids alike
+        closing = []
+        with self._lock:
+            self._purge(closing)
+            session = self._sessions.get(session_id)
+        self._close(closing)
+        return session
+
+    def remove(self, session_id):
+        closing = []
+        with self._lock:
+            self._pop(session_id, closing)
+        self._close(closing)
+        return bool(closing)
+
+    def snapshot(self):
+        with self._lock:
+            return {**self.stats, "sessions": len(self._sessions), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+    # --- Internals (call with the lock held) ---
+
+    def _purge(self, closing):
+        now = time.monotonic()
+        for session in list(self._sessions.values()):
+            # Insertion order is expiry order
+            if session.expires > now:
+                break
+            if not session._lock.locked():
+                self._pop(session.id, closing)
+                self.stats["expired"] += 1
+
+    def _pop(self, session_id, closing):
+        session = self._sessions.pop(session_id, None)
+        if session is not None:
+            self._bytes -= len(session.content)
+            closing.append(session)
+
+    def _close(self, sessions):
+        # Outside the store lock; a session in use is closed by its holder
+        for session in sessions:
+            if session._lock.acquire(blocking=False):
+                try:
+                    session.close()
+                finally:
+                    session._lock.release()
+            else:
+                session._closed = True
+
+
+upload_sessions = SessionStore(config.SESSION_MAX_BYTES, config.SESSION_TTL)
+
+
+# --- Pipeline entry points (run on the parse pool) ---
+
+def unlock_session(session, password=""):
+    with session:
+        return session.unlock(password)
+
+
+def parse_session(session, password=""):
+    """
+    parse_pdf_bytes for a session: decrypts only if `password` isn't the one
+    the held document was opened with. The session is discarded once parsed.
+    """
+    with session:
+        if not session.unlock(password):
+            raise PasswordRequiredException("File is password protected")
+        result = parse_document(session.doc)
+    upload_sessions.remove(session.id)
+    return result
+
+
+def iter_session_events(session, password=""):
+    # iter_parse_events for a session; the session is held until the stream ends
+    with session:
+        if not session.unlock(password):
+            raise PasswordRequiredException("File is password protected")
+        yield from iter_document_events(session.doc)
+    upload_sessions.remove(session.id)
@@ -169,149 +169,203 @@
 
 
 import re
+from services.transactions import TransactionBatch
+from services.validation import iter_validated
+
+LINE_NOISE_PATTERNS = [
+    r"Page\s+Total", r"Grand\s+Total", r"Statement\s+of\s+Account", 
+    r"Account\s+Summary", r"Opening\s+Balance", r"Closing\s+Balance",
+    r"Page\s+\d+\s+of\s+\d+", r"Customer\s+ID", r"Branch\s+Code",
+    r"Visit\s+us\s+at", r"System\s+Generated", r"IFSC\s*:",
+    r"DATE\s+PARTICULARS", r"WITHDRAWALS\s+DEPOSITS"
+]
+
+EMAIL_TRIGGER = r"\S+@\S+\.\S+"
+
+FOOTER_TRIGGERS = [
+    r"IFSC\s*:", r"PIN\s*:\s*\d{6}", r"Ph\s*:\s*\d+", EMAIL_TRIGGER,            
+    r"GATE\s+NO", r"DATE\s*:", r"PAGE\s*:", r"Date/Time\s*:",       
+    r"This\s+is\s+a", r"C/O\s", r"Br\.\s*mail\s*id", r"Statement\s+of",
+    r"Account\s+Summary", r"Period\s+From", r"-{3,}"
+]
+
+# Compiled once at import. Each pattern list becomes a single alternation, so
+# a line (or chunk) is scanned once instead of once per pattern. For the
+# footer, the leftmost match of the alternation is the earliest trigger.
+def _alternation(patterns):
+    # Every pattern starts with a literal character; a lookahead on that set
+    # lets the scanner skip positions where no branch could start.
+    first_chars = "".join(sorted({re.escape(p[0]) for p in patterns}))
+    return re.compile(f"(?=[{first_chars}])(?:{'|'.join(patterns)})", re.IGNORECASE)
+
+LINE_NOISE_RE = _alternation(LINE_NOISE_PATTERNS)
+# The email trigger can start on any character, which would defeat the
+# first-character skip, so it is only searched for when the chunk has an '@'.
+FOOTER_RE = _alternation([t for t in FOOTER_TRIGGERS if t != EMAIL_TRIGGER])
+EMAIL_RE = re.compile(EMAIL_TRIGGER)
+STUTTER_RE = re.compile(r'([A-Z])\1{2,}')
+CHUNK_SPLIT_RE = re.compile(r"(?m)^\s*(?=\d{2}-\d{2}-\d{2}(?!\d))")
+CHUNK_START = re.compile(r"\s*\d{2}-\d{2}-\d{2}(?!\d)")
+DATE_RE = re.compile(r"^\s*(\d{2}-\d{2}-\d{2})")
+AMOUNT_RE = re.compile(r"[\d,]+\.\d{2}(?:[Cc][Rr]|[Dd][Rr])?")
+REF_NO_RE = re.compile(r"\b(\d{6,12})\b")
 
 def parse_sib(text: str):
-    transactions = []
-    
-    # --- PHASE 1: PRE-PROCESSING (Global Cleanup) ---
-    text = re.sub(r'([A-Z])\1{2,}', r'\1', text)
-    
-    clean_lines = []
-    raw_lines = text.splitlines()
-    
-    LINE_NOISE_PATTERNS = [
-        r"Page\s+Total", r"Grand\s+Total", r"Statement\s+of\s+Account", 
-        r"Account\s+Summary", r"Opening\s+Balance", r"Closing\s+Balance",
-        r"Page\s+\d+\s+of\s+\d+", r"Customer\s+ID", r"Branch\s+Code",
-        r"Visit\s+us\s+at", r"System\s+Generated", r"IFSC\s*:",
-        r"DATE\s+PARTICULARS", r"WITHDRAWALS\s+DEPOSITS"
-    ]
-    
-    for line in raw_lines:
-        clean_line = " ".join(line.split())
-        is_noise = False
-        for pat in LINE_NOISE_PATTERNS:
-            if re.search(pat, clean_line, re.IGNORECASE):
-                is_noise = True
-                break
-        if not is_noise:
-            clean_lines.append(line)
+    return list(iter_validated(iter_sib([text])))
 
-    cleaned_text = "\n".join(clean_lines)
-    
-    # --- PHASE 2: CHUNKING ---
-    chunk_pattern = r"(?m)^\s*(?=\d{2}-\d{2}-\d{2}(?!\d))" 
-    chunks = re.split(chunk_pattern, cleaned_text)
+def parse_sib_batch(pages):
+    return TransactionBatch.from_dicts(iter_validated(iter_sib(pages)))
 
-    txn_id = 1
-    previous_balance = None
-    
-    amount_pattern = re.compile(r"[\d,]+\.\d{2}(?:[Cc][Rr]|[Dd][Rr])?")
+def iter_sib(pages):
+    # Yields transactions from an iterable of page texts. Chunks that straddle
+    # a page break are completed once the next page arrives.
+    parser = SibStreamParser()
+    for page in pages:
+        yield from parser.iter_feed(page)
+    yield from parser.iter_finish()
 
-    for chunk in chunks:
-        if not chunk.strip(): continue
+def clean_lines(text):
+    # --- PHASE 1: PRE-PROCESSING (Global Cleanup) ---
+    text = STUTTER_RE.sub(r'\1', text)
+    is_noise = LINE_NOISE_RE.search
+    return [line for line in text.splitlines() if not is_noise(line)]
 
-        # 1. Validate Date
-        date_match = re.match(r"^\s*(\d{2}-\d{2}-\d{2})", chunk)
-        if not date_match: continue
-        
-        date_str = date_match.group(1)
-        
-        # 2. Extract Money
-        money_matches = amount_pattern.findall(chunk)
-        if len(money_matches) < 2: continue
-            
-        balance_str = money_matches[-1]
-        amount_str = money_matches[-2]  
+def parse_amt(val):
+    val = val.upper().replace(",", "").replace("CR", "").replace("DR", "").strip()
+    try: return float(val)
+    except: return 0.0
+
+def parse_chunk(chunk, txn_id, previous_balance):
+    if not chunk.strip(): return None
+
+    # 1. Validate Date
+    date_match = DATE_RE.match(chunk)
+    if not date_match: return None
+    
+    date_str = date_match.group(1)
+    
+    # 2. Extract Money
+    money_matches = AMOUNT_RE.findall(chunk)
+    if len(money_matches) < 2: return None
         
-        def parse_amt(val):
-            val = val.upper().replace(",", "").replace("CR", "").replace("DR", "").strip()
-            try: return float(val)
-            except: return 0.0
+    balance_str = money_matches[-1]
+    amount_str = money_matches[-2]  
 
-        balance = parse_amt(balance_str)
-        amount = parse_amt(amount_str)
+    balance = parse_amt(balance_str)
+    amount = parse_amt(amount_str)
 
-        # 3. Debit vs Credit (BEST FIT MATH)
-        is_debit = None
+    # 3. Debit vs Credit (BEST FIT MATH)
+    is_debit = None
 
-        if previous_balance is not None:
-            # Calculate error margin for both scenarios
-            diff_if_debit = abs(previous_balance - amount - balance)
-            diff_if_credit = abs(previous_balance + amount - balance)
-            
-            # Pick the scenario with the smaller error (closest to 0)
-            if diff_if_debit < diff_if_credit and diff_if_debit < 5.0:
-                is_debit = True
-            elif diff_if_credit < diff_if_debit and diff_if_credit < 5.0:
-                is_debit = False
-            
-            # If both are suspiciously close (unlikely) or math failed, leave as None to trigger fallback
-
-        # Fallback
-        if is_debit is None:
-            is_debit = guess_debit_credit_fallback(chunk)
-
-        if is_debit: 
-            debit = amount
-            credit = None
-        else: 
-            debit = None
-            credit = amount
-
-        # --- PHASE 3: CLEAN DESCRIPTION & REF NO ---
-        flat_chunk = chunk.replace("\n", " ")
-        temp_text = flat_chunk.replace(date_str, "").replace(balance_str, "").replace(amount_str, "")
-        
-        FOOTER_TRIGGERS = [
-            r"IFSC\s*:", r"PIN\s*:\s*\d{6}", r"Ph\s*:\s*\d+", r"\S+@\S+\.\S+",            
-            r"GATE\s+NO", r"DATE\s*:", r"PAGE\s*:", r"Date/Time\s*:",       
-            r"This\s+is\s+a", r"C/O\s", r"Br\.\s*mail\s*id", r"Statement\s+of",
-            r"Account\s+Summary", r"Period\s+From", r"-{3,}"
-        ]
+    if previous_balance is not None:
+        # Calculate error margin for both scenarios
+        diff_if_debit = abs(previous_balance - amount - balance)
+        diff_if_credit = abs(previous_balance + amount - balance)
         
-        cut_index = len(temp_text)
-        for trigger in FOOTER_TRIGGERS:
-            match = re.search(trigger, temp_text, re.IGNORECASE)
-            if match:
-                if match.start() < cut_index:
-                    cut_index = match.start()
+        # Pick the scenario with the smaller error (closest to 0)
+        if diff_if_debit < diff_if_credit and diff_if_debit < 5.0:
+            is_debit = True
+        elif diff_if_credit < diff_if_debit and diff_if_credit < 5.0:
+            is_debit = False
         
-        clean_desc_text = temp_text[:cut_index]
-
-        # Extract Ref No from clean text
-        chq_no = ""
-        chq_match = re.search(r"\b(\d{6,12})\b", clean_desc_text)
-        if chq_match:
-            chq_no = chq_match.group(1)
-            clean_desc_text = clean_desc_text.replace(chq_no, "")
-
-        # Final Polish
-        description = clean_desc_text.strip()
-        description = description.replace("|", "").strip()
-        description = description.replace("RRN-", "")
-        description = description.replace("//", "/")
-        description = " ".join(description.split())
-        if description.endswith("/"):
-            description = description[:-1]
-
-        txn = {
-            "id": txn_id,
-            "txn_date": date_str,
-            "description": description,
-            "ref_no": chq_no if chq_no else None,
-            "debit": debit,
-            "credit": credit,
-            "balance": balance,
-            "confidence": 1.0, 
-            "is_flagged": False
-        }
-
-        transactions.append(txn)
-        previous_balance = balance
-        txn_id += 1
-
-    return transactions
+        # If both are suspiciously close (unlikely) or math failed, leave as None to trigger fallback
+
+    # Fallback
+    if is_debit is None:
+        is_debit = guess_debit_credit_fallback(chunk)
+
+    if is_debit: 
+        debit = amount
+        credit = None
+    else: 
+        debit = None
+        credit = amount
+
+    # --- PHASE 3: CLEAN DESCRIPTION & REF NO ---
+    flat_chunk = chunk.replace("\n", " ")
+    temp_text = flat_chunk.replace(date_str, "").replace(balance_str, "").replace(amount_str, "")
+    
+    footer = FOOTER_RE.search(temp_text)
+    cut_index = footer.start() if footer else len(temp_text)
+    if "@" in temp_text:
+        email = EMAIL_RE.search(temp_text)
+        if email:
+            cut_index = min(cut_index, email.start())
+    clean_desc_text = temp_text[:cut_index]
+
+    # Extract Ref No from clean text
+    chq_no = ""
+    chq_match = REF_NO_RE.search(clean_desc_text)
+    if chq_match:
+        chq_no = chq_match.group(1)
+        clean_desc_text = clean_desc_text.replace(chq_no, "")
+
+    # Final Polish
+    description = clean_desc_text.strip()
+    description = description.replace("|", "").strip()
+    description = description.replace("RRN-", "")
+    description = description.replace("//", "/")
+    description = " ".join(description.split())
+    if description.endswith("/"):
+        description = description[:-1]
+
+    return {
+        "id": txn_id,
+        "txn_date": date_str,
+        "description": description,
+        "ref_no": chq_no if chq_no else None,
+        "debit": debit,
+        "credit": credit,
+        "balance": balance,
+        "confidence": 1.0, 
+        "is_flagged": False
+    }
+
+class SibStreamParser:
+    """
+    Incremental SIB parser fed one page of layout text at a time.
+
+    A transaction chunk runs until the next line that starts with a date, so
+    the trailing chunk of each page is held back until the next page (or
+    finish()) shows where it ends.
+    """
+
+    def __init__(self):
+        self.txn_id = 1
+        self.previous_balance = None
+        self.pending = []
+
+    def feed(self, text):
+        return list(self.iter_feed(text))
+
+    def finish(self):
+        return list(self.iter_finish())
+
+    def iter_feed(self, text):
+        self.pending.extend(clean_lines(text))
+        last_start = None
+        for i in range(len(self.pending) - 1, -1, -1):
+            if CHUNK_START.match(self.pending[i]):
+                last_start = i
+                break
+        if not last_start:
+            return
+        ready, self.pending = self.pending[:last_start], self.pending[last_start:]
+        yield from self._iter_lines(ready)
+
+    def iter_finish(self):
+        ready, self.pending = self.pending, []
+        yield from self._iter_lines(ready)
+
+    def _iter_lines(self, lines):
+        # --- PHASE 2: CHUNKING ---
+        for chunk in CHUNK_SPLIT_RE.split("\n".join(lines)):
+            txn = parse_chunk(chunk, self.txn_id, self.previous_balance)
+            if txn is None:
+                continue
+            self.previous_balance = txn["balance"]
+            self.txn_id += 1
+            yield txn
 
 def guess_debit_credit_fallback(text):
     upper_text = text.upper()
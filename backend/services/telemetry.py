@@ -0,0 +1,262 @@
+"""
+Logging setup and in-process Prometheus metrics.
+
+Logging is level-gated through the standard library (LOG_LEVEL), with either
+plain text or one JSON object per line (LOG_FORMAT). Metrics are plain
+counters and histograms kept in this process and rendered in the Prometheus
+text format by GET /metrics; with several uvicorn workers each worker
+reports its own. Parse worker processes are folded into their uvicorn
+worker's numbers (drain/merge).
+"""
+import bisect
+import json
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+import config
+
+
+# --- Logging ---
+
+QUIET_LOGGERS = ("pdfminer", "pdfplumber", "PIL")
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        text = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            text += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return text
+
+
+def configure_logging():
+    # Idempotent; uvicorn keeps its own handlers on the uvicorn.* loggers
+    root = logging.getLogger()
+    if any(getattr(h, "_statement_parser", False) for h in root.handlers):
+        return
+    handler = logging.StreamHandler(sys.stderr)
+    handler._statement_parser = True
+    if config.LOG_FORMAT == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(TextFormatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    root.addHandler(handler)
+    root.setLevel(config.LOG_LEVEL.upper())
+    # pdfminer logs every object it parses at DEBUG; that would dominate the
+    # parse time whenever our own debug output is switched on
+    for name in QUIET_LOGGERS:
+        logging.getLogger(name).setLevel(max(root.level, logging.WARNING))
+
+
+# --- Metrics ---
+
+_registry = []
+
+
+class _Metric:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def merge(self, values):
+        with self.lock:
+            for key, value in values.items():
+                self.values[key] = self.values.get(key, 0) + value
+
+    def samples(self):
+        with self.lock:
+            values = dict(self.values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{self._labels(key)} {_number(value)}"
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        # Per-bucket counts, cumulated when rendered; the last slot is +Inf
+        i = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def merge(self, values):
+        with self.lock:
+            for key, (counts, total, count) in values.items():
+                state = self.values.get(key)
+                if state is None:
+                    state = self.values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+                state[0] = [a + b for a, b in zip(state[0], counts)]
+                state[1] += total
+                state[2] += count
+
+    def samples(self):
+        with self.lock:
+            values = {key: ([*counts], total, count) for key, (counts, total, count) in self.values.items()}
+        for key, (counts, total, count) in sorted(values.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else _number(bound)
+                yield f"{self.name}_bucket{self._labels(key, [('le', le)])} {cumulative}"
+            yield f"{self.name}_sum{self._labels(key)} {_number(total)}"
+            yield f"{self.name}_count{self._labels(key)} {count}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    """All metrics in the Prometheus text exposition format (0.0.4)."""
+    lines = []
+    for metric in _registry:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+def drain():
+    """
+    This process's metric values, reset to zero. Parse worker processes send
+    theirs back with every result; the parent merge()s them into its own.
+    """
+    values = {}
+    for metric in _registry:
+        with metric.lock:
+            values[metric.name], metric.values = metric.values, {}
+    return values
+
+
+def merge(values):
+    for metric in _registry:
+        if metric.name in values:
+            metric.merge(values[metric.name])
+
+
+STAGE_SECONDS = Histogram(
+    "statement_stage_seconds",
+    "Time spent in each parse stage (extract_page and ocr_page are per page).",
+    ["stage", "bank", "strategy"],
+)
+STATEMENTS = Counter(
+    "statements_parsed_total",
+    "Statements processed, by outcome.",
+    ["bank", "strategy", "outcome"],
+)
+PAGES = Counter(
+    "statement_pages_total",
+    "Pages extracted, by text source (text layer or OCR).",
+    ["bank", "strategy", "source"],
+)
+TRANSACTIONS = Counter(
+    "statement_transactions_total",
+    "Transactions parsed.",
+    ["bank", "strategy"],
+)
+RESULT_CACHE = Counter(
+    "parse_result_cache_total",
+    "Parse result cache lookups.",
+    ["result"],
+)
+
+
+class Span:
+    """
+    Times named stages of one statement. Durations are held until the bank
+    and strategy are known (decrypt and detect finish before either is), then
+    flushed to STAGE_SECONDS with those labels.
+    """
+
+    def __init__(self, log=None):
+        self.log = log
+        self.labels = {"bank": "", "strategy": ""}
+        self.pending = []
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        if self.log is not None and self.log.isEnabledFor(logging.DEBUG):
+            self.log.debug("stage %s took %.1fms", name, seconds * 1000, extra={"fields": {"stage": name, **self.labels}})
+        if self.labels["bank"]:
+            STAGE_SECONDS.observe(seconds, stage=name, **self.labels)
+        else:
+            self.pending.append((name, seconds))
+
+    def set_labels(self, bank, strategy):
+        self.labels = {"bank": bank, "strategy": strategy}
+        for name, seconds in self.pending:
+            STAGE_SECONDS.observe(seconds, stage=name, **self.labels)
+        self.pending = []
+
+    def count_pages(self, source, n):
+        if n:
+            PAGES.inc(n, source=source, **self.labels)
+
+    def finish(self, outcome, transactions=0):
+        # Stages timed before a failure (wrong password, unreadable file) are
+        # still reported, under bank="UNKNOWN"
+        if not self.labels["bank"]:
+            self.set_labels("UNKNOWN", "")
+        STATEMENTS.inc(outcome=outcome, **self.labels)
+        if transactions:
+            TRANSACTIONS.inc(transactions, **self.labels)
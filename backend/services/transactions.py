@@ -0,0 +1,211 @@
+from array import array
+from datetime import date
+
+# Sentinel for "no amount" in the debit/credit columns
+NULL_PAISE = -(2 ** 63)
+# Sentinel for "key not present on this row" in optional string columns
+ABSENT = -1
+
+# SBI tables use DD/MM/YYYY or DD-MM-YYYY, SIB layout text uses DD-MM-YY
+def parse_txn_date(date_str):
+    try:
+        day, month, year = date_str.replace("/", "-").split("-")[:3]
+        year = int(year)
+        if year < 100:
+            year += 2000
+        return date(year, int(month), int(day)).toordinal()
+    except (ValueError, AttributeError):
+        return 0
+
+def to_paise(amount):
+    return NULL_PAISE if amount is None else int(round(amount * 100))
+
+def from_paise(paise):
+    return None if paise == NULL_PAISE else paise / 100
+
+
+class StringPool:
+    """Interned strings shared by batches; index 0 is reserved for None."""
+
+    def __init__(self):
+        self.values = [None]
+        self.index = {None: 0}
+
+    def add(self, value):
+        i = self.index.get(value)
+        if i is None:
+            i = self.index[value] = len(self.values)
+            self.values.append(value)
+        return i
+
+
+class TransactionBatch:
+    """
+    Columnar transaction list.
+
+    Amounts are integer paise, dates are kept both as the statement's own
+    string (interned) and as a proleptic ordinal for sorting/grouping, and
+    descriptions/ref numbers/banks/categories are interned. Iterating yields
+    the same dicts the parsers used to return, so the JSON shape is unchanged.
+
+    `sources` numbers the statement each row came from in a consolidated
+    history (ABSENT for a single statement); balance chains follow it.
+    """
+
+    STR_COLUMNS = ("date_strs", "descriptions", "ref_nos", "banks", "categories")
+
+    def __init__(self, pool=None):
+        self.pool = pool or StringPool()
+        self.ids = array("q")
+        self.dates = array("l")
+        self.date_strs = array("l")
+        self.descriptions = array("l")
+        self.ref_nos = array("l")
+        self.banks = array("l")
+        self.categories = array("l")
+        self.sources = array("l")
+        self.debit = array("q")
+        self.credit = array("q")
+        self.balance = array("q")
+        self.confidence = array("d")
+        self.is_flagged = array("b")
+
+    @classmethod
+    def from_dicts(cls, transactions, pool=None):
+        batch = cls(pool)
+        for txn in transactions:
+            batch.append(txn)
+        return batch
+
+    # --- Building ---
+
+    def append(self, txn):
+        add = self.pool.add
+        self.ids.append(txn["id"])
+        self.dates.append(parse_txn_date(txn["txn_date"]))
+        self.date_strs.append(add(txn["txn_date"]))
+        self.descriptions.append(add(txn["description"]))
+        self.ref_nos.append(add(txn["ref_no"]) if "ref_no" in txn else ABSENT)
+        self.banks.append(add(txn["bank"]) if "bank" in txn else ABSENT)
+        self.categories.append(add(txn["category"]) if "category" in txn else ABSENT)
+        self.sources.append(ABSENT if txn.get("source") is None else txn["source"])
+        self.debit.append(to_paise(txn["debit"]))
+        self.credit.append(to_paise(txn["credit"]))
+        self.balance.append(to_paise(txn["balance"]))
+        self.confidence.append(txn["confidence"])
+        self.is_flagged.append(1 if txn["is_flagged"] else 0)
+
+    def _columns(self):
+        return ("ids", "dates", "date_strs", "descriptions", "ref_nos", "banks", "categories", "sources",
+                "debit", "credit", "balance", "confidence", "is_flagged")
+
+    def extend(self, other):
+        if other.pool is self.pool:
+            for name in self._columns():
+                getattr(self, name).extend(getattr(other, name))
+            return self
+        # Different pools: re-intern the other batch's strings into ours
+        remap = array("l", (self.pool.add(v) for v in other.pool.values))
+        for name in self._columns():
+            column = getattr(other, name)
+            if name in self.STR_COLUMNS:
+                column = array("l", (ABSENT if i == ABSENT else remap[i] for i in column))
+            getattr(self, name).extend(column)
+        return self
+
+    @classmethod
+    def concat(cls, batches):
+        batches = list(batches)
+        result = cls(batches[0].pool if batches else None)
+        for batch in batches:
+            result.extend(batch)
+        return result
+
+    def with_bank(self, bank):
+        # Tag every row with its bank (consolidated histories)
+        i = self.pool.add(bank)
+        self.banks = array("l", [i]) * len(self)
+        return self
+
+    def with_source(self, source):
+        # Tag every row with the statement it came from (consolidated histories)
+        self.sources = array("l", [source]) * len(self)
+        return self
+
+    # --- Access ---
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            part = TransactionBatch(self.pool)
+            for name in self._columns():
+                setattr(part, name, getattr(self, name)[key])
+            return part
+        return self.row(key)
+
+    def take(self, indexes):
+        part = TransactionBatch(self.pool)
+        for name in self._columns():
+            column = getattr(self, name)
+            setattr(part, name, array(column.typecode, (column[i] for i in indexes)))
+        return part
+
+    def row(self, i):
+        strings = self.pool.values
+        txn = {
+            "id": self.ids[i],
+            "txn_date": strings[self.date_strs[i]],
+            "description": strings[self.descriptions[i]],
+        }
+        if self.ref_nos[i] != ABSENT:
+            txn["ref_no"] = strings[self.ref_nos[i]]
+        txn["debit"] = from_paise(self.debit[i])
+        txn["credit"] = from_paise(self.credit[i])
+        txn["balance"] = from_paise(self.balance[i])
+        txn["confidence"] = self.confidence[i]
+        txn["is_flagged"] = bool(self.is_flagged[i])
+        if self.categories[i] != ABSENT:
+            txn["category"] = strings[self.categories[i]]
+        if self.banks[i] != ABSENT:
+            txn["bank"] = strings[self.banks[i]]
+        if self.sources[i] != ABSENT:
+            txn["source"] = self.sources[i]
+        return txn
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.row(i)
+
+    def to_dicts(self):
+        return list(self)
+
+    def to_columns(self):
+        """
+        The rows as parallel lists keyed like row()'s fields, for columnar
+        encodings. Optional columns hold None where a row has no value.
+        """
+        strings = self.pool.values
+
+        def text(column):
+            return [None if i == ABSENT else strings[i] for i in column]
+
+        return {
+            "id": self.ids.tolist(),
+            "txn_date": text(self.date_strs),
+            "description": text(self.descriptions),
+            "ref_no": text(self.ref_nos),
+            "debit": [from_paise(p) for p in self.debit],
+            "credit": [from_paise(p) for p in self.credit],
+            "balance": [from_paise(p) for p in self.balance],
+            "confidence": self.confidence.tolist(),
+            "is_flagged": [bool(f) for f in self.is_flagged],
+            "category": text(self.categories),
+            "bank": text(self.banks),
+            "source": [None if s == ABSENT else s for s in self.sources],
+        }
+
+    def renumber(self, start=1):
+        self.ids = array("q", range(start, start + len(self)))
+        return self
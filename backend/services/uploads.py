@@ -0,0 +1,164 @@
+"""
+Receiving uploads without holding large ones in memory.
+
+Small uploads are read into bytes as before. Past UPLOAD_SPOOL_BYTES the
+upload stays in a temp file, which is memory-mapped instead: its pages live
+in the OS page cache, where the kernel can drop them under pressure, and
+extraction workers reopen the file by path rather than being sent a copy of
+the bytes. Starlette has normally written a large upload to its own
+anonymous temp file already; that file is taken over (and reopened through
+/proc) rather than copied. Only where that isn't possible is the upload
+copied chunk by chunk into a named temp file of ours.
+
+Oversized requests are refused by UploadLimit from their Content-Length,
+before Starlette reads the body at all.
+
+Everything downstream takes either form as `content`: open_upload() gives
+a file object for StatementDocument, len() is the upload size, and
+content_digest() hashes it for the result cache. portable() is what a
+parse worker process is sent instead: the bytes, or a spooled upload's path.
+"""
+import asyncio
+import hashlib
+import io
+import mmap
+import os
+import tempfile
+from starlette.responses import JSONResponse
+import config
+
+CHUNK_BYTES = 1024 * 1024
+# Allowance over UPLOAD_MAX_BYTES for the multipart framing and form fields
+FORM_OVERHEAD_BYTES = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class SpooledUpload:
+    """
+    An upload spooled to a temp file, memory-mapped read-only. `path` opens
+    the file from any process. The file is deleted on close() (or when the
+    object is garbage collected).
+    """
+
+    def __init__(self, file, path=None):
+        self.file = file
+        self.path = path or file.name
+        self.data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return len(self.data)
+
+    def open(self):
+        return open(self.path, "rb")
+
+    def close(self):
+        if not self.data.closed:
+            self.data.close()
+        self.file.close()
+
+
+async def receive(upload, max_bytes=None):
+    """
+    Read an UploadFile into bytes, or into a SpooledUpload once it passes
+    UPLOAD_SPOOL_BYTES. Raises UploadTooLarge past `max_bytes`
+    (UPLOAD_MAX_BYTES by default) without reading the rest.
+    """
+    max_bytes = config.UPLOAD_MAX_BYTES if max_bytes is None else max_bytes
+    if upload.size is not None and upload.size > max_bytes:
+        raise UploadTooLarge(upload.size)
+    if upload.size is not None and upload.size > config.UPLOAD_SPOOL_BYTES:
+        spooled = take_spooled(upload)
+        if spooled is not None:
+            return spooled
+    chunks, size, spool = [], 0, None
+    try:
+        while chunk := await upload.read(CHUNK_BYTES):
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLarge(size)
+            if spool is None and size > config.UPLOAD_SPOOL_BYTES:
+                spool = tempfile.NamedTemporaryFile(prefix="upload-", suffix=".pdf", dir=config.UPLOAD_DIR or None)
+                spool.writelines(chunks)
+                chunks = None
+            if spool is not None:
+                # Disk writes stay off the event loop
+                await asyncio.to_thread(spool.write, chunk)
+            else:
+                chunks.append(chunk)
+    except BaseException:
+        if spool is not None:
+            spool.close()
+        raise
+    if spool is None:
+        return b"".join(chunks)
+    spool.flush()
+    return SpooledUpload(spool)
+
+
+def take_spooled(upload):
+    """
+    A SpooledUpload over the temp file Starlette has already written `upload`
+    to, or None while it is still in memory (or can't be reopened by path).
+    The UploadFile is left holding an empty buffer, so closing it at the end
+    of the request doesn't delete a file an upload session still needs.
+    """
+    file = upload.file
+    if not getattr(file, "_rolled", False):
+        return None
+    # The file is anonymous; /proc (Linux) gives other processes a path to it
+    path = f"/proc/{os.getpid()}/fd/{file.fileno()}"
+    if not os.path.exists(path):
+        return None
+    file.flush()
+    upload.file = io.BytesIO()
+    return SpooledUpload(file, path)
+
+
+class UploadLimit:
+    """
+    ASGI middleware refusing uploads to `paths` whose Content-Length is over
+    `max_bytes` with a 413, before the multipart body is read. Requests
+    without a Content-Length are still checked file by file by receive().
+    """
+
+    def __init__(self, app, paths, max_bytes):
+        self.app = app
+        self.paths = paths
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "POST" and scope["path"] in self.paths:
+            length = dict(scope["headers"]).get(b"content-length", b"")
+            if length.isdigit() and int(length) > self.max_bytes:
+                response = JSONResponse(status_code=413, content={"detail": too_large_detail()})
+                return await response(scope, receive, send)
+        await self.app(scope, receive, send)
+
+
+def too_large_detail():
+    return {"code": "FILE_TOO_LARGE", "message": f"Files over {config.UPLOAD_MAX_BYTES >> 20}MB are not accepted."}
+
+
+def open_upload(content):
+    if isinstance(content, SpooledUpload):
+        return content.open()
+    # A path, from portable()
+    return open(content, "rb") if isinstance(content, str) else io.BytesIO(content)
+
+
+def portable(content):
+    # What another process opens the upload from; open_upload() takes either
+    return content.path if isinstance(content, SpooledUpload) else content
+
+
+def content_digest(content):
+    # mmap supports the buffer protocol, so a spooled upload is hashed in place
+    return hashlib.sha256(content.data if isinstance(content, SpooledUpload) else content).digest()
+
+
+def release(content):
+    if isinstance(content, SpooledUpload):
+        content.close()
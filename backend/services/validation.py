@@ -0,0 +1,170 @@
+import numpy as np
+from services.transactions import NULL_PAISE, ABSENT, parse_txn_date, to_paise
+
+# Running-balance differences up to this many paise are treated as rounding
+BALANCE_TOLERANCE_PAISE = 100
+
+# Confidence multipliers per anomaly; any anomaly also sets is_flagged
+PENALTIES = {
+    "balance": 0.5,        # this row's balance was misread (the chain resumes after it)
+    "gap": 0.6,            # chain break: rows missing before this one, or its amount misread
+    "duplicate": 0.5,      # identical to an earlier row
+    "out_of_order": 0.7,   # dated before the previous row
+    "bad_date": 0.5,       # date could not be parsed
+}
+
+
+def _confidence(anomalies):
+    confidence = 1.0
+    for name in anomalies:
+        confidence *= PENALTIES[name]
+    return round(confidence, 4)
+
+
+class ChainValidator:
+    """
+    Incremental balance-chain validation for a single statement.
+
+    Each row is checked against prev_balance + credit - debit. Classifying a
+    break needs the row after it (a misread balance breaks the chain twice,
+    a gap only once), so rows are released one behind the input; call
+    iter_finish() to flush the last one.
+    """
+
+    def __init__(self):
+        self.prev = None       # last released row: (txn, date, balance)
+        self.pending = None    # row waiting for its successor: [txn, date, balance, net, mismatch, excused, anomalies]
+        self.seen = set()
+
+    def feed(self, transactions):
+        return list(self.iter_feed(transactions))
+
+    def finish(self):
+        return list(self.iter_finish())
+
+    def iter_feed(self, transactions):
+        for txn in transactions:
+            yield from self._push(txn)
+
+    def iter_finish(self):
+        if self.pending is not None:
+            yield self._release(self.pending)
+            self.pending = None
+
+    def _push(self, txn):
+        day = parse_txn_date(txn["txn_date"])
+        balance = to_paise(txn["balance"])
+        net = to_paise(txn["credit"] or 0) - to_paise(txn["debit"] or 0)
+        anomalies = []
+        if day == 0:
+            anomalies.append("bad_date")
+        key = (txn["txn_date"], txn["description"], txn["debit"], txn["credit"], txn["balance"])
+        if key in self.seen:
+            anomalies.append("duplicate")
+        self.seen.add(key)
+
+        current = [txn, day, balance, net, False, False, anomalies]
+        pending = self.pending
+        if pending is not None:
+            current[4] = abs(pending[2] + net - balance) > BALANCE_TOLERANCE_PAISE
+            if pending[1] and day and day < pending[1]:
+                anomalies.append("out_of_order")
+            if pending[4] and current[4] and self.prev is not None \
+                    and abs(self.prev[2] + pending[3] + net - balance) <= BALANCE_TOLERANCE_PAISE:
+                # pending's balance was misread; this row continues the real chain
+                pending[6].append("balance")
+                current[5] = True
+            yield self._release(pending)
+        self.pending = current
+
+    def _release(self, row):
+        txn, day, balance, net, mismatch, excused, anomalies = row
+        if mismatch and not excused and "balance" not in anomalies:
+            anomalies.append("gap")
+        txn["confidence"] = _confidence(anomalies)
+        txn["is_flagged"] = bool(anomalies)
+        self.prev = (txn, day, balance)
+        return txn
+
+
+def iter_validated(transactions):
+    # Validates a stream of transaction dicts in place, one row behind
+    validator = ChainValidator()
+    yield from validator.iter_feed(transactions)
+    yield from validator.iter_finish()
+
+
+def chain_keys(batch):
+    """
+    Balance-chain id per row: its source statement, or for rows without one
+    (a single statement, or rows a client sends back without `source`) its
+    bank. The two ranges never collide: sources are >= 0, banks map below.
+    """
+    sources = np.asarray(batch.sources, dtype=np.int64)
+    banks = np.asarray(batch.banks, dtype=np.int64)
+    return np.where(sources != ABSENT, sources, -2 - banks)
+
+
+def validate_batch(batch):
+    """
+    Vectorized ChainValidator over a whole TransactionBatch, in place.
+
+    Rows are chained per source statement in their current order (see
+    chain_keys), so consolidated histories are checked statement by
+    statement. O(n) array passes plus one hash pass for duplicates.
+    """
+    n = len(batch)
+    if n == 0:
+        return batch
+    keys = chain_keys(batch)
+    order = np.argsort(keys, kind="stable")
+    debit = np.asarray(batch.debit, dtype=np.int64)[order]
+    credit = np.asarray(batch.credit, dtype=np.int64)[order]
+    balance = np.asarray(batch.balance, dtype=np.int64)[order]
+    days = np.asarray(batch.dates, dtype=np.int64)[order]
+    net = np.where(credit == NULL_PAISE, 0, credit) - np.where(debit == NULL_PAISE, 0, debit)
+
+    has_prev = np.zeros(n, dtype=bool)
+    has_prev[1:] = keys[order][1:] == keys[order][:-1]
+    has_next = np.zeros(n, dtype=bool)
+    has_next[:-1] = has_prev[1:]
+
+    mismatch = np.zeros(n, dtype=bool)
+    mismatch[1:] = has_prev[1:] & (np.abs(balance[:-1] + net[1:] - balance[1:]) > BALANCE_TOLERANCE_PAISE)
+
+    # Row k's balance is misread when k and k+1 both break the chain but
+    # balance[k-1] + net[k] + net[k+1] reaches balance[k+1]
+    bad_balance = np.zeros(n, dtype=bool)
+    if n > 2:
+        two_step = np.abs(balance[:-2] + net[1:-1] + net[2:] - balance[2:]) <= BALANCE_TOLERANCE_PAISE
+        bad_balance[1:-1] = mismatch[1:-1] & has_next[1:-1] & mismatch[2:] & two_step
+    excused = np.zeros(n, dtype=bool)
+    excused[1:] = bad_balance[:-1]
+    gap = mismatch & ~bad_balance & ~excused
+
+    out_of_order = np.zeros(n, dtype=bool)
+    out_of_order[1:] = has_prev[1:] & (days[1:] > 0) & (days[:-1] > 0) & (days[1:] < days[:-1])
+    bad_date = days == 0
+
+    duplicate = np.zeros(n, dtype=bool)
+    seen = set()
+    date_strs = np.asarray(batch.date_strs, dtype=np.int64)[order]
+    descriptions = np.asarray(batch.descriptions, dtype=np.int64)[order]
+    columns = zip(keys[order].tolist(), date_strs.tolist(), descriptions.tolist(),
+                  debit.tolist(), credit.tolist(), balance.tolist())
+    for k, key in enumerate(columns):
+        if key in seen:
+            duplicate[k] = True
+        seen.add(key)
+
+    confidence = np.ones(n)
+    flagged = np.zeros(n, dtype=bool)
+    for name, hit in (("balance", bad_balance), ("gap", gap), ("duplicate", duplicate),
+                      ("out_of_order", out_of_order), ("bad_date", bad_date)):
+        confidence[hit] *= PENALTIES[name]
+        flagged |= hit
+
+    # Write back through writable views of the batch's array columns
+    np.frombuffer(batch.confidence, dtype=np.float64)[order] = np.round(confidence, 4)
+    np.frombuffer(batch.is_flagged, dtype=np.int8)[order] = flagged
+    return batch
@@ -0,0 +1,70 @@
+import itertools
+import random
+
+import pytest
+
+from services.reconcile import reconcile
+from services.transactions import TransactionBatch
+
+
+def make_batch(credit, debits, confidence=1.0):
+    rows = [{"id": 1, "txn_date": "01/01/2024", "description": "CREDIT", "debit": None, "credit": credit,
+             "balance": 0.0, "confidence": 1.0, "is_flagged": False}]
+    for i, amount in enumerate(debits):
+        rows.append({"id": i + 2, "txn_date": "02/01/2024", "description": f"DEBIT {i}", "debit": amount,
+                     "credit": None, "balance": 0.0, "confidence": confidence, "is_flagged": False})
+    return TransactionBatch.from_dicts(rows)
+
+
+def brute_force_distances(target, debits, tolerance, top_k):
+    # Distances of the top_k closest combinations that don't exceed target + tolerance
+    paise = [round(d * 100) for d in debits]
+    limit = round(target * 100) + round(tolerance * 100)
+    totals = [sum(c) for k in range(1, len(paise) + 1) for c in itertools.combinations(paise, k)]
+    return sorted(abs(round(target * 100) - t) for t in totals if t <= limit)[:top_k]
+
+
+def match_distances(result):
+    return sorted(round(abs(m["difference"]) * 100) for m in result["matches"])
+
+
+def test_finds_every_exact_combination():
+    debits = [300, 700, 400, 600, 500, 250, 750, 200, 800, 100]
+    result = reconcile(make_batch(1000.0, debits), 1, top_k=10)
+    exact = [m for m in result["matches"] if m["difference"] == 0]
+    expected = {c for k in range(1, len(debits) + 1) for c in itertools.combinations(range(2, 12), k)
+                if sum(debits[i - 2] for i in c) == 1000}
+    assert result["complete"] and result["exact"]
+    assert {tuple(m["debitIds"]) for m in exact} == expected
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_matches_brute_force(seed):
+    r = random.Random(seed)
+    debits = [round(r.choice([r.uniform(1, 500), r.randint(1, 20) * 50]), 2) for _ in range(r.randint(1, 14))]
+    target = round(r.uniform(1, 2000), 2)
+    tolerance = r.choice([0.0, 0.0, 5.0])
+    top_k = r.randint(1, 8)
+    result = reconcile(make_batch(target, debits), 1, tolerance=tolerance, top_k=top_k)
+
+    assert result["method"] == "meet-in-the-middle"
+    assert match_distances(result) == brute_force_distances(target, debits, tolerance, top_k)
+    for m in result["matches"]:
+        total = sum(round(debits[i - 2] * 100) for i in m["debitIds"])
+        assert total == round(m["totalMatched"] * 100)
+        assert total <= round(target * 100) + round(tolerance * 100)
+
+
+def test_ties_broken_by_confidence():
+    batch = make_batch(100.0, [60.0, 40.0, 70.0, 30.0])
+    batch.confidence[3] = 0.5   # debit id 4 (70.0)
+    result = reconcile(batch, 1, top_k=1)
+    assert result["matches"][0]["debitIds"] == [2, 3]
+
+
+def test_coarse_dp_is_reported_inexact():
+    r = random.Random(1)
+    debits = [round(r.uniform(10, 3000), 2) for _ in range(60)]
+    result = reconcile(make_batch(12345.67, debits), 1)
+    assert result["method"] == "dp"
+    assert not result["exact"] and result["resolution"] > 0.01
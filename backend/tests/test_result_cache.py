@@ -0,0 +1,47 @@
+import os
+import time
+from services.result_cache import ResultCache
+
+
+def disk_files(cache):
+    return sorted(name for _, _, files in os.walk(cache.disk_dir) for name in files)
+
+
+def age(cache, key, seconds):
+    # Backdate an entry's file instead of sleeping through the TTL
+    path = cache._path(key)
+    stamp = time.time() - seconds
+    os.utime(path, (stamp, stamp))
+
+
+def test_expired_files_are_swept_on_put(tmp_path):
+    cache = ResultCache(1 << 20, str(tmp_path), ttl=60)
+    cache.put_payload("aa-old", b"x" * 100)
+    age(cache, "aa-old", 120)
+    cache._next_sweep = 0
+    for key in ("bb-1", "cc-2", "dd-3"):
+        cache.put_payload(key, b"y" * 100)
+    assert disk_files(cache) == ["bb-1.json", "cc-2.json", "dd-3.json"]
+    assert cache.stats["disk_expired"] == 1
+
+
+def test_disk_tier_stays_within_its_bound(tmp_path):
+    cache = ResultCache(0, str(tmp_path), ttl=60, disk_max_bytes=1000)
+    for i in range(10):
+        key = f"{i:02d}-key"
+        cache.put_payload(key, b"z" * 300)
+        # Distinct mtimes, oldest first
+        age(cache, key, 30 - i)
+    cache.put_payload("99-last", b"z" * 300)
+    assert cache.snapshot()["disk_bytes"] <= 1000
+    assert disk_files(cache) == ["08-key.json", "09-key.json", "99-last.json"]
+    assert cache.stats["disk_evictions"] == 8
+
+
+def test_disk_only_cache_serves_hits(tmp_path):
+    cache = ResultCache(0, str(tmp_path), ttl=60)
+    assert cache.enabled
+    cache.put_payload("ab-key", b'{"bank": "SIB"}')
+    assert cache.get_payload("ab-key") == b'{"bank": "SIB"}'
+    assert cache.stats["disk_hits"] == 1
+    assert not ResultCache(0).enabled
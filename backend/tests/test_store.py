@@ -0,0 +1,63 @@
+import pytest
+from db.store import TransactionStore, UnknownOwner
+
+
+def transactions(description, n=3):
+    return [
+        {"id": i + 1, "txn_date": f"0{i + 1}-01-24", "description": f"{description} {i}", "ref_no": None,
+         "debit": 10.0, "credit": None, "balance": 100.0 - 10 * (i + 1), "confidence": 1.0,
+         "is_flagged": False, "category": None}
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TransactionStore(str(tmp_path / "store.db"))
+    yield store
+    store.close()
+
+
+def test_owners_only_see_their_own_statements(store):
+    a_id, a = store.add_statement("savings", "SIB", transactions("UPI ACME"), "a.pdf")
+    b_id, b = store.add_statement("savings", "SIB", transactions("UPI ACME"), "b.pdf")
+    assert a != b
+    assert [s["id"] for s in store.statements(a)] == [a_id]
+    assert [s["id"] for s in store.statements(b, account="savings")] == [b_id]
+    assert {t["statementId"] for t in store.query(a)["transactions"]} == {a_id}
+    assert {t["statementId"] for t in store.query(b, text="acme")["transactions"]} == {b_id}
+    assert {t["statementId"] for t in store.search(a, "ac", prefix=True)["transactions"]} == {a_id}
+    assert store.search(a, "u")["total"] == 3
+
+
+def test_a_token_adds_to_its_owners_history(store):
+    first, token = store.add_statement("savings", "SIB", transactions("NEFT"))
+    second, same = store.add_statement("current", "SBI", transactions("NEFT"), owner_token=token)
+    assert same == token
+    assert [s["id"] for s in store.statements(token)] == [first, second]
+
+
+def test_unknown_tokens_are_refused(store):
+    store.add_statement("savings", "SIB", transactions("NEFT"))
+    assert not store.has_owner("guessed")
+    with pytest.raises(UnknownOwner):
+        store.add_statement("savings", "SIB", transactions("NEFT"), owner_token="guessed")
+    assert store.statements("guessed") == []
+    assert store.query("guessed")["total"] == 0
+
+
+def test_delete_needs_the_owners_token(store):
+    statement_id, token = store.add_statement("savings", "SIB", transactions("NEFT"))
+    _, other = store.add_statement("savings", "SIB", transactions("NEFT"))
+    assert not store.delete_statement(other, statement_id)
+    assert store.delete_statement(token, statement_id)
+    assert store.statements(token) == []
+
+
+def test_export_rows_are_the_owners_only(store):
+    a_id, a = store.add_statement("savings", "SIB", transactions("NEFT", n=5))
+    store.add_statement("savings", "SIB", transactions("NEFT", n=7))
+    rows = list(store.iter_transactions(a, chunk_size=2))
+    assert len(rows) == 5
+    assert {row["statementId"] for row in rows} == {a_id}
+    assert list(store.iter_transactions("guessed")) == []
@@ -20,6 +20,8 @@ interface FileQueueItem {
   file: File;
   status: 'pending' | 'processing' | 'needs-password' | 'success' | 'error';
   password?: string;
+  // Server-side upload session: password retries go there instead of re-uploading the file
+  sessionId?: string;
   error?: string;
   data?: BackendResponse;
 }
@@ -88,7 +90,7 @@ export const UploadZone = ({ onUploadComplete, uploadState, setUploadState }: Up
     }
   }, [onUploadComplete]);
 
-  const processFile = useCallback(async (file: File, filePassword?: string): Promise<{status: 'success' | 'needs-password' | 'error', data?: BackendResponse, error?: string}> => {
+  const processFile = useCallback(async (file: File, filePassword?: string, sessionId?: string): Promise<{status: 'success' | 'needs-password' | 'error', data?: BackendResponse, error?: string, sessionId?: string}> => {
     if (!file.name.toLowerCase().endsWith('.pdf')) {
       const errorMsg = 'Only PDF files are accepted.';
       setTimeout(() => {
@@ -128,7 +130,9 @@ export const UploadZone = ({ onUploadComplete, uploadState, setUploadState }: Up
     }, 0);
 
     const formData = new FormData();
-    formData.append('file', file);
+    if (!sessionId) {
+      formData.append('file', file);
+    }
     formData.append('password', filePassword || '');
 
     try {
@@ -142,11 +146,16 @@ export const UploadZone = ({ onUploadComplete, uploadState, setUploadState }: Up
           throw new Error("VITE_API_BASE_URL is not configured");
         }
 
-      const response = await fetch(`${API_BASE_URL}/parse`, {
+      const response = await fetch(sessionId ? `${API_BASE_URL}/sessions/${sessionId}/parse` : `${API_BASE_URL}/parse`, {
           method: 'POST',
           body: formData,
         });
 
+      if (sessionId && response.status === 404) {
+        // Session expired on the server: upload the file again
+        return processFile(file, filePassword);
+      }
+
       // const response = await fetch('http://127.0.0.1:8000/parse', {
       //   method: 'POST',
       //   body: formData,
@@ -157,7 +166,11 @@ export const UploadZone = ({ onUploadComplete, uploadState, setUploadState }: Up
       if (!response.ok) {
         if (response.status === 422 && 
             (data.detail?.code === 'PASSWORD_REQUIRED' || data.detail?.message?.toLowerCase().includes('password'))) {
-          return { status: 'needs-password' };
+          return { status: 'needs-password', sessionId: data.detail?.sessionId ?? sessionId };
+        }
+        if (response.status === 429 && data.detail?.code === 'TOO_MANY_ATTEMPTS') {
+          // The server has dropped the held upload; the file has to be sent again
+          throw new Error('Too many incorrect password attempts. Please upload the file again.');
         }
         throw new Error('Currently this file is not supported. Only SBI and South Indian Bank statements are supported.');
       }
@@ -217,12 +230,12 @@ export const UploadZone = ({ onUploadComplete, uploadState, setUploadState }: Up
           updatedQueue[i] = { ...updatedQueue[i], status: 'processing' };
           setFileQueue([...updatedQueue]);
 
-          const result = await processFile(item.file, item.password);
+          const result = await processFile(item.file, item.password, item.sessionId);
           
           console.log(`[QUEUE] File ${i} result: ${result.status}`);
 
           if (result.status === 'needs-password') {
-            updatedQueue[i] = { ...updatedQueue[i], status: 'needs-password' };
+            updatedQueue[i] = { ...updatedQueue[i], status: 'needs-password', sessionId: result.sessionId };
             setFileQueue([...updatedQueue]);
             console.log(`[QUEUE] Paused at file ${i} - needs password`);
             return;